@@ -0,0 +1,67 @@
+"""Add created_at to asset and user, cursor pagination indexes for list endpoints
+
+Revision ID: a2c5e8f1b3d7
+Revises: f1b7d4e9a2c6
+Create Date: 2025-10-16 15:08:42.371905
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2c5e8f1b3d7'
+down_revision = 'f1b7d4e9a2c6'
+branch_labels = None
+depends_on = None
+
+
+# Tables that had no creation timestamp; existing rows get the migration time
+CREATED_AT_TABLES = ['asset', 'user']
+
+# (index name, table, columns) backing ORDER BY (created_at, id) DESC on list endpoints
+CURSOR_INDEXES = [
+    ('ix_asset_created_at_id', 'asset', ['created_at', 'id']),
+    ('ix_asset_company_id_created_at_id', 'asset', ['company_id', 'created_at', 'id']),
+    ('ix_user_created_at_id', 'user', ['created_at', 'id']),
+    ('ix_user_company_id_created_at_id', 'user', ['company_id', 'created_at', 'id']),
+    ('ix_style_created_at_id', 'style', ['created_at', 'id']),
+    ('ix_trainingfeedback_created_at_id', 'trainingfeedback', ['created_at', 'id']),
+    ('ix_evaluationresult_created_at_id', 'evaluationresult', ['created_at', 'id']),
+    ('ix_evaluationreport_generated_at_id', 'evaluationreport', ['generated_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+    inspector = inspect(op.get_bind())
+
+    for table in CREATED_AT_TABLES:
+        columns = [column['name'] for column in inspector.get_columns(table)]
+        if 'created_at' not in columns:
+            op.add_column(table, sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()))
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in CURSOR_INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(CURSOR_INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True
+            )
+
+    for table in reversed(CREATED_AT_TABLES):
+        op.drop_column(table, 'created_at')
@@ -0,0 +1,51 @@
+"""Add job table for background jobs
+
+Revision ID: b3d6f9a2c5e8
+Revises: a2c5e8f1b3d7
+Create Date: 2025-10-16 16:31:05.418263
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d6f9a2c5e8'
+down_revision = 'a2c5e8f1b3d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Table may already exist when init_db's create_all ran first
+    from sqlalchemy import inspect
+    inspector = inspect(op.get_bind())
+    if 'job' in inspector.get_table_names():
+        return
+
+    op.create_table('job',
+        sa.Column('id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('kind', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('payload_json', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('result_json', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('error', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('error_status', sa.Integer(), nullable=True),
+        sa.Column('progress', sa.Float(), nullable=False),
+        sa.Column('progress_message', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('user_id', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_job_status_created_at', 'job', ['status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_job_status_created_at', table_name='job')
+    op.drop_table('job')
@@ -0,0 +1,43 @@
+"""Add section_id to InteractionMessage
+
+Revision ID: b7c2d9e4f1a3
+Revises: fda175a6da75, fcfb2db8523f
+Create Date: 2025-10-16 10:12:41.518302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c2d9e4f1a3'
+down_revision = ('fda175a6da75', 'fcfb2db8523f')
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('interactionmessage', sa.Column('section_id', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+
+    # Backfill from metadata_json; a regex avoids failing on rows whose metadata is not valid JSON
+    op.execute(
+        """
+        UPDATE interactionmessage
+        SET section_id = NULLIF(substring(metadata_json from '"section_id"\\s*:\\s*"([^"]*)"'), '')
+        WHERE section_id IS NULL
+          AND metadata_json LIKE '%section_id%'
+        """
+    )
+
+    op.create_index(
+        'ix_interactionmessage_session_section_timestamp',
+        'interactionmessage',
+        ['session_id', 'section_id', 'timestamp'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_interactionmessage_session_section_timestamp', table_name='interactionmessage')
+    op.drop_column('interactionmessage', 'section_id')
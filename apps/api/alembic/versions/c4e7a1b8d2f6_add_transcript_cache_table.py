@@ -0,0 +1,41 @@
+"""Add transcript cache table
+
+Revision ID: c4e7a1b8d2f6
+Revises: b3d6f9a2c5e8
+Create Date: 2025-10-16 17:12:44.903517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e7a1b8d2f6'
+down_revision = 'b3d6f9a2c5e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Table may already exist when init_db's create_all ran first
+    from sqlalchemy import inspect
+    inspector = inspect(op.get_bind())
+    if 'transcriptcache' in inspector.get_table_names():
+        return
+
+    op.create_table('transcriptcache',
+        sa.Column('id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('source_fingerprint', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('language', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('model', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('transcript', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('srt', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('segments_json', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('transcriptcache')
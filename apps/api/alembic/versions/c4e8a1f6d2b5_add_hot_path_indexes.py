@@ -0,0 +1,53 @@
+"""Add hot path indexes
+
+Revision ID: c4e8a1f6d2b5
+Revises: b7c2d9e4f1a3
+Create Date: 2025-10-16 11:03:27.904615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a1f6d2b5'
+down_revision = 'b7c2d9e4f1a3'
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns)
+HOT_PATH_INDEXES = [
+    ('ix_training_access_code', 'training', ['access_code']),
+    ('ix_trainingsection_training_id_order_index', 'trainingsection', ['training_id', 'order_index']),
+    ('ix_overlay_training_section_id_time_stamp', 'overlay', ['training_section_id', 'time_stamp']),
+    ('ix_userinteraction_training_id_timestamp', 'userinteraction', ['training_id', 'timestamp']),
+    ('ix_chatmessage_session_id_timestamp', 'chatmessage', ['session_id', 'timestamp']),
+    ('ix_evaluationresult_session_id', 'evaluationresult', ['session_id']),
+    ('ix_trainingprogress_user_id_training_id', 'trainingprogress', ['user_id', 'training_id']),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside a transaction; build without locking writes on live tables
+    with op.get_context().autocommit_block():
+        for name, table, columns in HOT_PATH_INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(HOT_PATH_INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True
+            )
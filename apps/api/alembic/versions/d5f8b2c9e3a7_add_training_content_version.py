@@ -0,0 +1,31 @@
+"""Add content_version to training
+
+Revision ID: d5f8b2c9e3a7
+Revises: c4e7a1b8d2f6
+Create Date: 2025-10-16 18:40:12.331904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f8b2c9e3a7'
+down_revision = 'c4e7a1b8d2f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Column may already exist when init_db's create_all ran first
+    from sqlalchemy import inspect
+    inspector = inspect(op.get_bind())
+    if 'content_version' in [column['name'] for column in inspector.get_columns('training')]:
+        return
+
+    op.add_column('training', sa.Column('content_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('training', 'content_version')
@@ -0,0 +1,142 @@
+"""Unique progress rows per learner/training and session/section
+
+Revision ID: d5f9b2a7c3e8
+Revises: c4e8a1f6d2b5
+Create Date: 2025-10-16 12:21:45.063118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f9b2a7c3e8'
+down_revision = 'c4e8a1f6d2b5'
+branch_labels = None
+depends_on = None
+
+
+# Collapse duplicates left by the old read-then-insert logic. The most advanced row
+# survives; TrainingProgress counters are recomputed by the reconciliation job.
+DEDUPE_TRAININGPROGRESS = [
+    """
+    UPDATE trainingprogress AS tp
+    SET first_accessed_at = d.first_accessed_at,
+        sections_attempted = d.sections_attempted
+    FROM (
+        SELECT user_id, training_id,
+               min(first_accessed_at) AS first_accessed_at,
+               max(sections_attempted) AS sections_attempted
+        FROM trainingprogress
+        GROUP BY user_id, training_id
+        HAVING count(*) > 1
+    ) AS d
+    WHERE tp.user_id = d.user_id AND tp.training_id = d.training_id
+    """,
+    """
+    DELETE FROM trainingprogress
+    WHERE id IN (
+        SELECT id FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY user_id, training_id
+                ORDER BY is_completed DESC, last_accessed_at DESC, id
+            ) AS rn
+            FROM trainingprogress
+        ) AS ranked
+        WHERE rn > 1
+    )
+    """,
+]
+
+DEDUPE_SECTIONPROGRESS = [
+    """
+    DELETE FROM sectionprogress
+    WHERE id IN (
+        SELECT id FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY session_id, section_id
+                ORDER BY (status = 'completed') DESC, last_accessed_at DESC, id
+            ) AS rn
+            FROM sectionprogress
+        ) AS ranked
+        WHERE rn > 1
+    )
+    """,
+]
+
+
+def _create_unique_index(name: str, table: str, columns: list, dedupe: list) -> None:
+    """Build a unique index CONCURRENTLY (inside an autocommit block)
+
+    A failed concurrent build leaves an INVALID index behind, which `if_not_exists`
+    would skip on the next run; drop it first. Duplicates are collapsed right before
+    the build so rows written since an earlier attempt do not fail it.
+    """
+    invalid = op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name}
+    ).first()
+    if invalid:
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+    for statement in dedupe:
+        op.execute(statement)
+
+    op.create_index(
+        name,
+        table,
+        columns,
+        unique=True,
+        postgresql_concurrently=True,
+        if_not_exists=True
+    )
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        _create_unique_index(
+            'uq_trainingprogress_user_id_training_id',
+            'trainingprogress',
+            ['user_id', 'training_id'],
+            DEDUPE_TRAININGPROGRESS
+        )
+        _create_unique_index(
+            'uq_sectionprogress_session_id_section_id',
+            'sectionprogress',
+            ['session_id', 'section_id'],
+            DEDUPE_SECTIONPROGRESS
+        )
+        # Superseded by the unique index on the same columns
+        op.drop_index(
+            'ix_trainingprogress_user_id_training_id',
+            table_name='trainingprogress',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_trainingprogress_user_id_training_id',
+            'trainingprogress',
+            ['user_id', 'training_id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.drop_index(
+            'uq_sectionprogress_session_id_section_id',
+            table_name='sectionprogress',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
+        op.drop_index(
+            'uq_trainingprogress_user_id_training_id',
+            table_name='trainingprogress',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
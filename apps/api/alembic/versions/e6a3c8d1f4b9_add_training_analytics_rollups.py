@@ -0,0 +1,122 @@
+"""Add training analytics rollup tables
+
+Revision ID: e6a3c8d1f4b9
+Revises: d5f9b2a7c3e8
+Create Date: 2025-10-16 13:47:09.215834
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6a3c8d1f4b9'
+down_revision = 'd5f9b2a7c3e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Tables may already exist when init_db's create_all ran first
+    from sqlalchemy import inspect
+    inspector = inspect(op.get_bind())
+    existing_tables = inspector.get_table_names()
+
+    if 'trainingdailystats' not in existing_tables:
+        op.create_table('trainingdailystats',
+            sa.Column('id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column('training_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('interaction_count', sa.Integer(), nullable=False),
+            sa.Column('interaction_types_json', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column('success_count', sa.Integer(), nullable=False),
+            sa.Column('response_time_sum', sa.Float(), nullable=False),
+            sa.Column('response_time_count', sa.Integer(), nullable=False),
+            sa.Column('unique_users', sa.Integer(), nullable=False),
+            sa.Column('unique_sessions', sa.Integer(), nullable=False),
+            sa.Column('completions', sa.Integer(), nullable=False),
+            sa.Column('report_count', sa.Integer(), nullable=False),
+            sa.Column('report_score_sum', sa.Float(), nullable=False),
+            sa.Column('report_score_count', sa.Integer(), nullable=False),
+            sa.Column('score_histogram_json', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column('report_status_json', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['training_id'], ['training.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('uq_trainingdailystats_training_id_day', 'trainingdailystats', ['training_id', 'day'], unique=True)
+
+    if 'traininganalyticsmember' not in existing_tables:
+        op.create_table('traininganalyticsmember',
+            sa.Column('training_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column('kind', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column('member_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column('first_day', sa.Date(), nullable=False),
+            sa.ForeignKeyConstraint(['training_id'], ['training.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('training_id', 'kind', 'member_id')
+        )
+
+    if 'trainingdailystatsdirty' not in existing_tables:
+        op.create_table('trainingdailystatsdirty',
+            sa.Column('id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column('training_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('marked_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('uq_trainingdailystatsdirty_training_id_day', 'trainingdailystatsdirty', ['training_id', 'day'], unique=True)
+
+    # Tables created by create_all before the FKs cascaded: recreate their training FK
+    for table in ('trainingdailystats', 'traininganalyticsmember'):
+        if table not in existing_tables:
+            continue
+        for fk in inspector.get_foreign_keys(table):
+            if fk['referred_table'] == 'training' and (fk.get('options') or {}).get('ondelete') != 'CASCADE':
+                op.drop_constraint(fk['name'], table, type_='foreignkey')
+                op.create_foreign_key(fk['name'], table, 'training', ['training_id'], ['id'], ondelete='CASCADE')
+
+    # Queue every existing (training, day) so the aggregator backfills the rollups
+    op.execute(
+        """
+        INSERT INTO trainingdailystatsdirty (id, training_id, day, marked_at)
+        SELECT md5(training_id || ':' || day::text), training_id, day, now()
+        FROM (
+            SELECT DISTINCT training_id, CAST("timestamp" AS date) AS day FROM userinteraction
+            UNION
+            SELECT DISTINCT training_id, CAST(generated_at AS date) AS day FROM evaluationreport
+        ) AS days
+        ON CONFLICT (training_id, day) DO NOTHING
+        """
+    )
+
+    # Read paths of the analytics endpoints
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_evaluationreport_training_id_generated_at',
+            'evaluationreport',
+            ['training_id', 'generated_at'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.create_index(
+            'ix_trainingprogress_training_id',
+            'trainingprogress',
+            ['training_id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_trainingprogress_training_id', table_name='trainingprogress', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_evaluationreport_training_id_generated_at', table_name='evaluationreport', postgresql_concurrently=True, if_exists=True)
+
+    op.drop_index('uq_trainingdailystatsdirty_training_id_day', table_name='trainingdailystatsdirty')
+    op.drop_table('trainingdailystatsdirty')
+    op.drop_table('traininganalyticsmember')
+    op.drop_index('uq_trainingdailystats_training_id_day', table_name='trainingdailystats')
+    op.drop_table('trainingdailystats')
@@ -0,0 +1,47 @@
+"""Add keyset pagination indexes for user interactions
+
+Revision ID: f1b7d4e9a2c6
+Revises: e6a3c8d1f4b9
+Create Date: 2025-10-16 14:22:51.630147
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b7d4e9a2c6'
+down_revision = 'e6a3c8d1f4b9'
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns)
+KEYSET_INDEXES = [
+    ('ix_userinteraction_timestamp_id', 'userinteraction', ['timestamp', 'id']),
+    ('ix_userinteraction_user_id_timestamp_id', 'userinteraction', ['user_id', 'timestamp', 'id']),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in KEYSET_INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(KEYSET_INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True
+            )
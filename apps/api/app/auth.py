@@ -5,9 +5,9 @@ import time
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlmodel import Session, select
-from .db import get_session
-from .models import User
+from .db import async_session_maker
+from .models import Company, User
+from .services.principal_cache import get_principal, store_principal
 
 JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_ALG = "HS256"
@@ -40,38 +40,53 @@ def verify_token(token: str) -> dict | None:
         return None
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    session: Session = Depends(get_session)
-) -> User:
-    token = credentials.credentials
-    payload = verify_token(token)
+def _credentials_error(detail: str = "Invalid authentication credentials") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def _resolve_principal(credentials: HTTPAuthorizationCredentials) -> tuple[User, Company | None]:
+    """Token -> (user, company); the database is only queried on a principal cache miss"""
+    payload = verify_token(credentials.credentials)
     if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_error()
     
     user_id = payload.get("sub")
     if not user_id:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_error()
+    
+    cached = get_principal(user_id)
+    if cached is not None:
+        return cached
     
-    user = session.get(User, user_id)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    async with async_session_maker() as session:
+        user = await session.get(User, user_id)
+        if not user:
+            raise _credentials_error("User not found")
+        company = await session.get(Company, user.company_id) if user.company_id else None
     
+    store_principal(user, company)
+    return user, company
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> User:
+    user, _ = await _resolve_principal(credentials)
     return user
 
 
+async def get_current_company(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> Company | None:
+    """Company of the authenticated user (None for users without a company)"""
+    _, company = await _resolve_principal(credentials)
+    return company
+
+
 def is_super_admin(user: User) -> bool:
     return user.role == "SuperAdmin"
 
@@ -3,11 +3,24 @@ from dotenv import load_dotenv, find_dotenv
 # Load environment variables before importing routers that may read them at import time
 load_dotenv(find_dotenv(usecwd=True))
 
+import os
+
 from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.routing import APIRoute
-from .routers import trainings, assets, sessions, tools, users, companies, auth, uploads, company_trainings, styles, generate, chat, frame_configs, imports, avatars, interactions, llm_agent, interaction_sessions, user_interactions, evaluation_criteria, evaluation_results, evaluation_reports, elevenlabs_webhook, training_feedback, elevenlabs_api
+from .routers import trainings, assets, sessions, tools, users, companies, auth, uploads, company_trainings, styles, generate, chat, frame_configs, imports, avatars, interactions, llm_agent, interaction_sessions, user_interactions, evaluation_criteria, evaluation_results, evaluation_reports, elevenlabs_webhook, training_feedback, elevenlabs_api, health, jobs
 from .db import init_db
+from .routers.health import start_warmup, stop_warmup
+from .services.provider_clients import close_provider_clients
+from .services.telemetry_buffer import start_telemetry_flusher, stop_telemetry_flusher
+from .services.training_progress import start_progress_reconciler, stop_progress_reconciler
+from .services.training_analytics import start_analytics_aggregator, stop_analytics_aggregator
+from .services.jobs import JOB_WORKER_IN_API, start_job_workers, stop_job_workers
+from .services.cache_invalidation import start_invalidation_listener, stop_invalidation_listener
+
+# FAST_BOOT=true: workers skip create_all/Alembic on import; run `python -m app.migrate`
+# once per deploy instead and gate traffic on GET /health/ready
+FAST_BOOT = os.getenv("FAST_BOOT", "false").lower() == "true"
 
 app = FastAPI(title="LXPlayer API")
 
@@ -74,16 +87,21 @@ app.include_router(evaluation_reports.router)
 app.include_router(elevenlabs_webhook.router)
 app.include_router(training_feedback.router)
 app.include_router(elevenlabs_api.router)
+app.include_router(health.router)
+app.include_router(jobs.router)
 
 #print([ (r.path, r.name) for r in app.routes if "/trainings" in getattr(r, "path", "") ])
 
-# Initialize database on module import
-print("Starting database initialization...")
-try:
-    init_db()
-    print("Database initialization completed")
-except Exception as e:
-    print(f"Database initialization warning (this is normal if tables already exist): {e}")
+# Initialize database on module import (skipped in fast-boot mode)
+if FAST_BOOT:
+    print("Fast boot: skipping database initialization, migrations run via `python -m app.migrate`")
+else:
+    print("Starting database initialization...")
+    try:
+        init_db()
+        print("Database initialization completed")
+    except Exception as e:
+        print(f"Database initialization warning (this is normal if tables already exist): {e}")
 
 print("Application startup complete")
 
@@ -92,8 +110,27 @@ print("Application startup complete")
 async def startup_event():
     """Force startup event"""
     print("Startup event triggered")
+    start_telemetry_flusher()
+    start_progress_reconciler()
+    start_analytics_aggregator()
+    start_warmup()
+    start_invalidation_listener()
+    if JOB_WORKER_IN_API:
+        # Normally jobs run in the separate `python -m app.worker` process
+        start_job_workers()
     print("Application startup complete from event")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background jobs and close pooled provider HTTP connections"""
+    await stop_warmup()
+    await stop_invalidation_listener()
+    await stop_job_workers()
+    await stop_telemetry_flusher()
+    await stop_progress_reconciler()
+    await stop_analytics_aggregator()
+    await close_provider_clients()
+
 @app.get("/")
 def root():
     print("🔍 ROOT endpoint çağrıldı!")
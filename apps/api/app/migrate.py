@@ -0,0 +1,32 @@
+"""
+One-shot database migration command.
+
+Creates missing tables and upgrades the schema to the Alembic head, then exits.
+Run it once per deploy before starting the API workers; with FAST_BOOT=true the
+workers no longer migrate on import and report ready only once the schema is at
+head (GET /health/ready).
+
+Usage: python -m app.migrate
+"""
+import sys
+
+from dotenv import load_dotenv, find_dotenv
+
+load_dotenv(find_dotenv(usecwd=True))
+
+from .db import run_migrations  # noqa: E402
+
+
+def main() -> int:
+    print("Running database migrations...")
+    try:
+        run_migrations()
+    except Exception as e:
+        print(f"❌ Database migration failed: {e}")
+        return 1
+    print("✅ Database migrations completed successfully")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
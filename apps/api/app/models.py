@@ -1,7 +1,8 @@
 from __future__ import annotations
 from typing import Optional
-from datetime import datetime
+from datetime import date, datetime
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, ForeignKey, Index, String
 import uuid
 
 
@@ -37,7 +38,7 @@ class User(SQLModel, table=True):
     password: Optional[str] = None
     gpt_prefs: Optional[str] = None
     # is_active: bool = Field(default=True)  # Temporarily disabled due to DB schema mismatch
-    # created_at: datetime = Field(default_factory=datetime.utcnow)  # Temporarily disabled due to DB schema mismatch
+    created_at: datetime = Field(default_factory=datetime.utcnow)
     # updated_at: datetime = Field(default_factory=datetime.utcnow)  # Temporarily disabled due to DB schema mismatch
 
 
@@ -53,6 +54,7 @@ class Asset(SQLModel, table=True):
     # Audio-specific fields for dubbing/translation
     language: Optional[str] = Field(default=None, description="Language code for audio assets")
     original_asset_id: Optional[str] = Field(default=None, foreign_key="asset.id", description="Reference to original video asset for audio dubbing")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
 class Flow(SQLModel, table=True):
@@ -81,13 +83,18 @@ class Training(SQLModel, table=True):
     description: Optional[str] = None
     flow_id: Optional[str] = Field(default=None, foreign_key="flow.id")
     ai_flow: Optional[str] = Field(default=None, description="JSON string for AI flow configuration")
-    access_code: Optional[str] = Field(default=None, description="Access code for interactive player")
+    access_code: Optional[str] = Field(default=None, index=True, description="Access code for interactive player")
     avatar_id: Optional[str] = Field(default=None, foreign_key="avatar.id", description="Avatar for this training")
     company_id: Optional[str] = Field(default=None, foreign_key="company.id")
     show_evaluation_report: bool = Field(default=False, description="Whether to show evaluation report at the end of training")
+    content_version: int = Field(default=0, description="Bumped on every edit of the training or its sections (LLM context cache key)")
 
 
 class TrainingSection(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_trainingsection_training_id_order_index", "training_id", "order_index"),
+    )
+    
     id: str = Field(default_factory=gen_uuid, primary_key=True)
     training_id: str = Field(foreign_key="training.id")
     title: str
@@ -119,6 +126,10 @@ class CompanyTraining(SQLModel, table=True):
 
 
 class Overlay(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_overlay_training_section_id_time_stamp", "training_section_id", "time_stamp"),
+    )
+    
     id: str = Field(default_factory=gen_uuid, primary_key=True)
     training_id: str = Field(foreign_key="training.id")
     training_section_id: Optional[str] = Field(default=None, foreign_key="trainingsection.id")
@@ -199,6 +210,12 @@ class Session(SQLModel, table=True):
 
 
 class UserInteraction(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_userinteraction_training_id_timestamp", "training_id", "timestamp"),
+        Index("ix_userinteraction_timestamp_id", "timestamp", "id"),
+        Index("ix_userinteraction_user_id_timestamp_id", "user_id", "timestamp", "id"),
+    )
+    
     id: str = Field(default_factory=gen_uuid, primary_key=True)
     session_id: str = Field(foreign_key="interactionsession.id")
     user_id: Optional[str] = Field(default=None, foreign_key="user.id")
@@ -225,6 +242,12 @@ class UserInteraction(SQLModel, table=True):
 
 
 class TrainingProgress(SQLModel, table=True):
+    __table_args__ = (
+        # One progress row per learner and training; target of the ON CONFLICT upsert
+        Index("uq_trainingprogress_user_id_training_id", "user_id", "training_id", unique=True),
+        Index("ix_trainingprogress_training_id", "training_id"),
+    )
+    
     id: str = Field(default_factory=gen_uuid, primary_key=True)
     user_id: str = Field(foreign_key="user.id")
     training_id: str = Field(foreign_key="training.id")
@@ -254,6 +277,10 @@ class TrainingProgress(SQLModel, table=True):
 
 
 class ChatMessage(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_chatmessage_session_id_timestamp", "session_id", "timestamp"),
+    )
+    
     id: str = Field(default_factory=gen_uuid, primary_key=True)
     session_id: str = Field(foreign_key="interactionsession.id")
     user_id: Optional[str] = Field(default=None, foreign_key="user.id")
@@ -341,8 +368,13 @@ class InteractionSession(SQLModel, table=True):
 
 class InteractionMessage(SQLModel, table=True):
     """LLM interaction mesajları"""
+    __table_args__ = (
+        Index("ix_interactionmessage_session_section_timestamp", "session_id", "section_id", "timestamp"),
+    )
+    
     id: str = Field(default_factory=gen_uuid, primary_key=True)
     session_id: str = Field(foreign_key="interactionsession.id")
+    section_id: Optional[str] = Field(default=None, description="Training section the message belongs to")
     message: str = Field(description="The actual message content")
     message_type: str = Field(description="user|assistant|system")
     
@@ -365,6 +397,11 @@ class InteractionMessage(SQLModel, table=True):
 
 class SectionProgress(SQLModel, table=True):
     """Bölüm bazlı ilerleme takibi"""
+    __table_args__ = (
+        # One progress row per session and section; target of the ON CONFLICT upsert
+        Index("uq_sectionprogress_session_id_section_id", "session_id", "section_id", unique=True),
+    )
+    
     id: str = Field(default_factory=gen_uuid, primary_key=True)
     session_id: str = Field(foreign_key="interactionsession.id")
     section_id: str = Field(foreign_key="trainingsection.id")
@@ -418,7 +455,7 @@ class EvaluationResult(SQLModel, table=True):
     """LLM tarafından yapılan değerlendirme sonuçları"""
     id: str = Field(default_factory=gen_uuid, primary_key=True)
     criteria_id: str = Field(foreign_key="evaluationcriteria.id", description="Hangi kriter değerlendirildi")
-    session_id: str = Field(foreign_key="interactionsession.id", description="Hangi oturum için değerlendirme")
+    session_id: str = Field(foreign_key="interactionsession.id", index=True, description="Hangi oturum için değerlendirme")
     user_id: str = Field(foreign_key="user.id", description="Değerlendirilen kullanıcı")
     training_id: str = Field(foreign_key="training.id", description="Hangi eğitim")
     
@@ -447,6 +484,10 @@ class EvaluationResult(SQLModel, table=True):
 
 class EvaluationReport(SQLModel, table=True):
     """Değerlendirme sonuç raporları"""
+    __table_args__ = (
+        Index("ix_evaluationreport_training_id_generated_at", "training_id", "generated_at"),
+    )
+    
     id: str = Field(default_factory=gen_uuid, primary_key=True)
     session_id: str = Field(foreign_key="interactionsession.id", description="Hangi oturum için rapor")
     user_id: str = Field(foreign_key="user.id", description="Raporlanan kullanıcı")
@@ -510,3 +551,86 @@ class TrainingFeedback(SQLModel, table=True):
     metadata_json: str = Field(default="{}", description="Ek metadata")
 
 
+class TrainingDailyStats(SQLModel, table=True):
+    """Eğitim bazlı günlük analitik özeti (background aggregator tarafından doldurulur)"""
+    __table_args__ = (
+        Index("uq_trainingdailystats_training_id_day", "training_id", "day", unique=True),
+    )
+    
+    id: str = Field(default_factory=gen_uuid, primary_key=True)
+    training_id: str = Field(sa_column=Column(String, ForeignKey("training.id", ondelete="CASCADE"), nullable=False))
+    day: date = Field(description="UTC day the events happened on")
+    
+    # UserInteraction rollup
+    interaction_count: int = Field(default=0)
+    interaction_types_json: str = Field(default="{}", description="JSON object: interaction_type -> count")
+    success_count: int = Field(default=0)
+    response_time_sum: float = Field(default=0.0)
+    response_time_count: int = Field(default=0, description="Interactions with a response_time")
+    unique_users: int = Field(default=0)
+    unique_sessions: int = Field(default=0)
+    completions: int = Field(default=0, description="training_end interactions")
+    
+    # EvaluationReport rollup
+    report_count: int = Field(default=0)
+    report_score_sum: float = Field(default=0.0)
+    report_score_count: int = Field(default=0)
+    score_histogram_json: str = Field(default="{}", description="JSON object: score bucket -> count")
+    report_status_json: str = Field(default="{}", description="JSON object: status -> count")
+    
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class TrainingAnalyticsMember(SQLModel, table=True):
+    """Bir eğitimde etkileşimi olan kullanıcı ve oturumlar (tüm zamanlar için tekil sayım)"""
+    training_id: str = Field(sa_column=Column(String, ForeignKey("training.id", ondelete="CASCADE"), primary_key=True))
+    kind: str = Field(primary_key=True, description="user|session")
+    member_id: str = Field(primary_key=True)
+    first_day: date
+
+
+class TrainingDailyStatsDirty(SQLModel, table=True):
+    """Yeniden hesaplanması gereken (eğitim, gün) çiftleri"""
+    __table_args__ = (
+        Index("uq_trainingdailystatsdirty_training_id_day", "training_id", "day", unique=True),
+    )
+    
+    id: str = Field(default_factory=gen_uuid, primary_key=True)
+    training_id: str
+    day: date
+    marked_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class Job(SQLModel, table=True):
+    """Arka plan işi (transcript, dublaj, video üretimi); worker süreçleri tarafından çalıştırılır"""
+    __table_args__ = (
+        Index("ix_job_status_created_at", "status", "created_at"),
+    )
+    
+    id: str = Field(default_factory=gen_uuid, primary_key=True)
+    kind: str = Field(description="section_transcript|section_dub_audio|generate_video")
+    status: str = Field(default="queued", description="queued|running|succeeded|failed")
+    payload_json: str = Field(default="{}", description="JSON string with the job arguments")
+    result_json: Optional[str] = Field(default=None, description="JSON string with the job result")
+    error: Optional[str] = None
+    error_status: Optional[int] = Field(default=None, description="HTTP status code the error maps to")
+    progress: float = Field(default=0.0, description="0.0 - 1.0")
+    progress_message: Optional[str] = None
+    attempts: int = Field(default=0)
+    user_id: Optional[str] = Field(default=None, foreign_key="user.id")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class TranscriptCache(SQLModel, table=True):
+    """Video içeriği (ETag) + dil + model bazında transkript önbelleği"""
+    id: str = Field(primary_key=True, description="sha256 of source_fingerprint|language|model")
+    source_fingerprint: str = Field(description="Object ETag and size of the transcribed video")
+    language: str
+    model: str = Field(description="<backend>:<model>")
+    transcript: str = Field(default="")
+    srt: str = Field(default="")
+    segments_json: str = Field(default="[]", description="JSON array of timestamped segments")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
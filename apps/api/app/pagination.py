@@ -0,0 +1,69 @@
+"""
+Keyset (cursor) pagination helpers shared by the list endpoints.
+
+Pages are ordered newest first on (timestamp column, id) and a page is selected
+with `WHERE (ts, id) < (:ts, :id)` (oldest first and `>` for transcripts) instead of OFFSET, so every page costs the same
+index range scan. The cursor handed to clients is an opaque url-safe token of the
+last row's (timestamp, id). List bodies keep their existing shape; the token for
+the next page is returned in the X-Next-Cursor header (absent on the last page).
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(timestamp: datetime, row_id: str) -> str:
+    raw = json.dumps([timestamp.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, str]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), str(row_id)
+    except Exception:
+        raise HTTPException(400, "Invalid pagination cursor")
+
+
+def page_limit(limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)) -> int:
+    """Bounded page size dependency"""
+    return limit
+
+
+def keyset_page(query, timestamp_column, id_column, after: Optional[str], limit: int, ascending: bool = False):
+    """Order `query` newest first on (timestamp, id) and restrict it to the page after `after`.
+
+    `ascending=True` pages oldest first instead (chat transcripts). One extra row is
+    fetched so `finish_page` can tell whether another page exists.
+    """
+    if after:
+        timestamp, row_id = decode_cursor(after)
+        key, cursor = tuple_(timestamp_column, id_column), tuple_(timestamp, row_id)
+        query = query.where(key > cursor if ascending else key < cursor)
+    if ascending:
+        return query.order_by(timestamp_column.asc(), id_column.asc()).limit(limit + 1)
+    return query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def finish_page(
+    rows: Sequence[Any],
+    limit: int,
+    response: Response,
+    timestamp_field: str = "created_at"
+) -> List[Any]:
+    """Trim the look-ahead row and publish the next cursor in the response header"""
+    page = list(rows[:limit])
+    if len(rows) > limit:
+        last = page[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, timestamp_field), last.id)
+    return page
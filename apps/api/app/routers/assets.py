@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from pydantic import BaseModel
 from sqlmodel import Session, select
+from typing import Optional
 from ..db import get_session
 from ..models import Asset, User
 from ..auth import get_current_user, is_super_admin, check_company_access
+from ..pagination import finish_page, keyset_page, page_limit
+from ..services.training_manifest import invalidate_training_manifests
 
 router = APIRouter(prefix="/assets", tags=["assets"])
 
@@ -19,19 +22,24 @@ class AssetIn(BaseModel):
 
 @router.get("")
 def list_assets(
+    response: Response,
+    after: Optional[str] = None,
+    limit: int = Depends(page_limit),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     if is_super_admin(current_user):
         # Süper admin tüm asset'leri görebilir
-        return session.exec(select(Asset)).all()
+        query = select(Asset)
     else:
         # Diğer kullanıcılar sadece kendi şirketlerindeki asset'leri görebilir
         if not current_user.company_id:
             return []
-        return session.exec(
-            select(Asset).where(Asset.company_id == current_user.company_id)
-        ).all()
+        query = select(Asset).where(Asset.company_id == current_user.company_id)
+    
+    # Yeniden eskiye, (created_at, id) üzerinde keyset sayfalama
+    query = keyset_page(query, Asset.created_at, Asset.id, after, limit)
+    return finish_page(session.exec(query).all(), limit, response)
 
 
 @router.get("/{asset_id}")
@@ -113,6 +121,7 @@ def update_asset(
     session.add(asset)
     session.commit()
     session.refresh(asset)
+    invalidate_training_manifests(asset_id=asset_id)
     return asset
 
 
@@ -136,4 +145,5 @@ def delete_asset(
     
     session.delete(asset)
     session.commit()
+    invalidate_training_manifests(asset_id=asset_id)
     return {"ok": True}
@@ -1,21 +1,25 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from datetime import datetime
 import httpx
 import os
 
-from app.db import get_session
+from app.db import get_async_session
 from app.auth import get_current_user
 from app.models import Avatar, User, Company
 from app.schemas import AvatarCreate, AvatarUpdate, AvatarResponse
+from app.services.training_manifest import invalidate_training_manifests
+from app.services.provider_clients import get_async_http_client
+from app.services.llm_context_cache import invalidate_llm_contexts
 
 router = APIRouter(prefix="/avatars", tags=["avatars"])
 
 
 @router.get("/", response_model=List[AvatarResponse])
 async def get_avatars(
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Get all avatars accessible to the current user"""
@@ -32,18 +36,18 @@ async def get_avatars(
         # Regular users can only see default avatars
         statement = select(Avatar).where(Avatar.is_default == True)
     
-    avatars = session.exec(statement).all()
+    avatars = (await session.exec(statement)).all()
     return avatars
 
 
 @router.get("/{avatar_id}", response_model=AvatarResponse)
 async def get_avatar(
     avatar_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Get a specific avatar by ID"""
-    avatar = session.get(Avatar, avatar_id)
+    avatar = await session.get(Avatar, avatar_id)
     if not avatar:
         raise HTTPException(status_code=404, detail="Avatar not found")
     
@@ -59,7 +63,7 @@ async def get_avatar(
 @router.post("/", response_model=AvatarResponse)
 async def create_avatar(
     avatar_data: AvatarCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Create a new avatar"""
@@ -67,12 +71,12 @@ async def create_avatar(
         raise HTTPException(status_code=403, detail="Only SuperAdmin and Admin can create avatars")
     
     # Check if name already exists in the same company
-    existing_avatar = session.exec(
+    existing_avatar = (await session.exec(
         select(Avatar).where(
             Avatar.name == avatar_data.name,
             Avatar.company_id == current_user.company_id
         )
-    ).first()
+    )).first()
     
     if existing_avatar:
         raise HTTPException(status_code=400, detail="Avatar name already exists in your company")
@@ -88,8 +92,8 @@ async def create_avatar(
     )
     
     session.add(avatar)
-    session.commit()
-    session.refresh(avatar)
+    await session.commit()
+    await session.refresh(avatar)
     
     return avatar
 
@@ -98,11 +102,11 @@ async def create_avatar(
 async def update_avatar(
     avatar_id: str,
     avatar_data: AvatarUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Update an existing avatar"""
-    avatar = session.get(Avatar, avatar_id)
+    avatar = await session.get(Avatar, avatar_id)
     if not avatar:
         raise HTTPException(status_code=404, detail="Avatar not found")
     
@@ -117,13 +121,13 @@ async def update_avatar(
     
     # Check if name already exists in the same company (excluding current avatar)
     if avatar_data.name and avatar_data.name != avatar.name:
-        existing_avatar = session.exec(
+        existing_avatar = (await session.exec(
             select(Avatar).where(
                 Avatar.name == avatar_data.name,
                 Avatar.company_id == avatar.company_id,
                 Avatar.id != avatar_id
             )
-        ).first()
+        )).first()
         
         if existing_avatar:
             raise HTTPException(status_code=400, detail="Avatar name already exists in your company")
@@ -136,8 +140,10 @@ async def update_avatar(
     avatar.updated_at = datetime.utcnow()
     
     session.add(avatar)
-    session.commit()
-    session.refresh(avatar)
+    await session.commit()
+    await session.refresh(avatar)
+    invalidate_training_manifests(avatar_id=avatar_id)
+    invalidate_llm_contexts(avatar_id=avatar_id)
     
     return avatar
 
@@ -145,11 +151,11 @@ async def update_avatar(
 @router.delete("/{avatar_id}")
 async def delete_avatar(
     avatar_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Delete an avatar"""
-    avatar = session.get(Avatar, avatar_id)
+    avatar = await session.get(Avatar, avatar_id)
     if not avatar:
         raise HTTPException(status_code=404, detail="Avatar not found")
     
@@ -163,9 +169,9 @@ async def delete_avatar(
     
     # Check if avatar is being used in any trainings
     from app.models import Training
-    training_using_avatar = session.exec(
+    training_using_avatar = (await session.exec(
         select(Training).where(Training.avatar_id == avatar_id)
-    ).first()
+    )).first()
     
     if training_using_avatar:
         raise HTTPException(
@@ -173,8 +179,8 @@ async def delete_avatar(
             detail=f"Avatar is being used in training '{training_using_avatar.title}'. Please remove it from the training first."
         )
     
-    session.delete(avatar)
-    session.commit()
+    await session.delete(avatar)
+    await session.commit()
     
     return {"message": "Avatar deleted successfully"}
 
@@ -182,7 +188,7 @@ async def delete_avatar(
 @router.post("/import")
 async def import_avatars(
     avatars_data: List[AvatarCreate],
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Import multiple avatars"""
@@ -195,12 +201,12 @@ async def import_avatars(
     for i, avatar_data in enumerate(avatars_data):
         try:
             # Check if avatar already exists
-            existing_avatar = session.exec(
+            existing_avatar = (await session.exec(
                 select(Avatar).where(
                     Avatar.name == avatar_data.name,
                     Avatar.company_id == current_user.company_id
                 )
-            ).first()
+            )).first()
             
             if existing_avatar:
                 errors.append(f"Row {i+1}: Avatar name '{avatar_data.name}' already exists")
@@ -223,9 +229,9 @@ async def import_avatars(
             errors.append(f"Row {i+1}: {str(e)}")
     
     if imported_avatars:
-        session.commit()
+        await session.commit()
         for avatar in imported_avatars:
-            session.refresh(avatar)
+            await session.refresh(avatar)
     
     return {
         "imported_count": len(imported_avatars),
@@ -236,7 +242,7 @@ async def import_avatars(
 
 @router.get("/export/company")
 async def export_company_avatars(
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Export company avatars"""
@@ -245,12 +251,12 @@ async def export_company_avatars(
     
     if current_user.role == "SuperAdmin":
         # SuperAdmin can export all avatars
-        avatars = session.exec(select(Avatar)).all()
+        avatars = (await session.exec(select(Avatar))).all()
     else:
         # Admin can export company avatars
-        avatars = session.exec(
+        avatars = (await session.exec(
             select(Avatar).where(Avatar.company_id == current_user.company_id)
-        ).all()
+        )).all()
     
     return {
         "avatars": avatars,
@@ -272,41 +278,41 @@ async def get_elevenlabs_voices(
         raise HTTPException(status_code=500, detail="ElevenLabs API key not configured")
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://api.elevenlabs.io/v1/voices",
-                headers={
-                    "xi-api-key": elevenlabs_api_key,
-                    "Accept": "application/json"
-                }
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"ElevenLabs API error: {response.text}"
-                )
-            
-            voices_data = response.json()
-            voices = voices_data.get("voices", [])
-            
-            # Format voices for frontend
-            formatted_voices = []
-            for voice in voices:
-                formatted_voices.append({
-                    "voice_id": voice.get("voice_id"),
-                    "name": voice.get("name"),
-                    "category": voice.get("category", "Unknown"),
-                    "description": voice.get("description", ""),
-                    "labels": voice.get("labels", {}),
-                    "preview_url": voice.get("preview_url", "")
-                })
-            
-            return {
-                "voices": formatted_voices,
-                "total_count": len(formatted_voices)
+        client = get_async_http_client("elevenlabs")
+        response = await client.get(
+            "https://api.elevenlabs.io/v1/voices",
+            headers={
+                "xi-api-key": elevenlabs_api_key,
+                "Accept": "application/json"
             }
-            
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"ElevenLabs API error: {response.text}"
+            )
+        
+        voices_data = response.json()
+        voices = voices_data.get("voices", [])
+        
+        # Format voices for frontend
+        formatted_voices = []
+        for voice in voices:
+            formatted_voices.append({
+                "voice_id": voice.get("voice_id"),
+                "name": voice.get("name"),
+                "category": voice.get("category", "Unknown"),
+                "description": voice.get("description", ""),
+                "labels": voice.get("labels", {}),
+                "preview_url": voice.get("preview_url", "")
+            })
+        
+        return {
+            "voices": formatted_voices,
+            "total_count": len(formatted_voices)
+        }
+        
     except httpx.RequestError as e:
         raise HTTPException(status_code=500, detail=f"Failed to connect to ElevenLabs API: {str(e)}")
     except Exception as e:
@@ -334,42 +340,42 @@ async def test_elevenlabs_voice(
         raise HTTPException(status_code=400, detail="Text is required")
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}",
-                headers={
-                    "xi-api-key": elevenlabs_api_key,
-                    "Content-Type": "application/json",
-                    "Accept": "audio/mpeg"
-                },
-                json={
-                    "text": text,
-                    "model_id": "eleven_multilingual_v2",
-                    "voice_settings": {
-                        "stability": 0.5,
-                        "similarity_boost": 0.5
-                    }
-                }
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"ElevenLabs TTS error: {response.text}"
-                )
-            
-            # Return the audio data as base64
-            import base64
-            audio_base64 = base64.b64encode(response.content).decode('utf-8')
-            
-            return {
-                "success": True,
-                "audio_data": audio_base64,
-                "voice_id": voice_id,
+        client = get_async_http_client("elevenlabs")
+        response = await client.post(
+            f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}",
+            headers={
+                "xi-api-key": elevenlabs_api_key,
+                "Content-Type": "application/json",
+                "Accept": "audio/mpeg"
+            },
+            json={
                 "text": text,
-                "content_type": "audio/mpeg"
+                "model_id": "eleven_multilingual_v2",
+                "voice_settings": {
+                    "stability": 0.5,
+                    "similarity_boost": 0.5
+                }
             }
-            
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"ElevenLabs TTS error: {response.text}"
+            )
+        
+        # Return the audio data as base64
+        import base64
+        audio_base64 = base64.b64encode(response.content).decode('utf-8')
+        
+        return {
+            "success": True,
+            "audio_data": audio_base64,
+            "voice_id": voice_id,
+            "text": text,
+            "content_type": "audio/mpeg"
+        }
+        
     except httpx.RequestError as e:
         raise HTTPException(status_code=500, detail=f"Failed to connect to ElevenLabs API: {str(e)}")
     except Exception as e:
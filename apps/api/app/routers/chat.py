@@ -1,18 +1,24 @@
 import json
 import logging
+import re
 import base64
 import httpx
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import TYPE_CHECKING, Dict, Any, List
 from fastapi import APIRouter, WebSocket, HTTPException, Depends, File, UploadFile
-from sqlmodel import Session, select
-from app.db import get_session
-from app.models import Training, TrainingSection, Overlay, Asset, Style, CompanyTraining, Avatar, User, Session as DBSession, UserInteraction, ChatMessage
+from sqlmodel import select
+from app.db import async_session_maker
+from app.models import Training, TrainingSection, Overlay, Asset, Style, CompanyTraining, Avatar, User, InteractionSession, UserInteraction, ChatMessage
 from app.storage import get_minio, presign_get_url
 from app.auth import get_current_user
-from openai import AsyncOpenAI
+from app.services.provider_clients import get_async_http_client, get_async_openai
+from app.services.telemetry_buffer import record_telemetry
 import os
 
+if TYPE_CHECKING:
+    # Only for annotations; the SDK is imported lazily by provider_clients on first use
+    from openai import AsyncOpenAI
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
@@ -20,11 +26,108 @@ logger = logging.getLogger(__name__)
 
 # LLM Agent endpoints moved to llm_agent.py router
 
-def get_openai_client():
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+def get_openai_client() -> "AsyncOpenAI":
+    client = get_async_openai()
+    if client is None:
         raise HTTPException(status_code=500, detail="OPENAI_API_KEY is not set")
-    return AsyncOpenAI(api_key=api_key)
+    return client
+
+
+class AssistantDeltaExtractor:
+    """Incrementally extract the user-visible text from a streamed assistant reply.
+
+    The websocket prompt asks the model for a JSON object whose first key is
+    "message"; while tokens arrive only the decoded value of that string is
+    emitted, so the player can render it before the JSON is complete. Replies
+    that do not start as JSON are passed through unchanged.
+    """
+
+    _ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f'}
+
+    def __init__(self):
+        self.buffer = ""
+        self.position: int | None = None
+        self.plain_text: bool | None = None
+        self.finished = False
+
+    def feed(self, chunk: str) -> str:
+        """Add a raw model chunk and return newly available message text"""
+        self.buffer += chunk
+
+        if self.plain_text is None:
+            stripped = self.buffer.lstrip()
+            if not stripped:
+                return ""
+            self.plain_text = stripped[0] not in "{`"
+            if self.plain_text:
+                return self.buffer
+        if self.plain_text:
+            return chunk
+        if self.finished:
+            return ""
+
+        if self.position is None:
+            match = re.search(r'"message"\s*:\s*"', self.buffer)
+            if not match:
+                return ""
+            self.position = match.end()
+
+        out = []
+        i = self.position
+        buffer = self.buffer
+        while i < len(buffer):
+            ch = buffer[i]
+            if ch == '\\':
+                # Wait for the full escape sequence before decoding it
+                if i + 1 >= len(buffer):
+                    break
+                escaped = buffer[i + 1]
+                if escaped == 'u':
+                    if i + 6 > len(buffer):
+                        break
+                    try:
+                        out.append(chr(int(buffer[i + 2:i + 6], 16)))
+                    except ValueError:
+                        pass
+                    i += 6
+                    continue
+                out.append(self._ESCAPES.get(escaped, escaped))
+                i += 2
+                continue
+            if ch == '"':
+                self.finished = True
+                i += 1
+                break
+            out.append(ch)
+            i += 1
+        self.position = i
+        return "".join(out)
+
+
+async def stream_assistant_reply(websocket: WebSocket, openai_client: "AsyncOpenAI", **create_kwargs) -> str:
+    """Stream a chat completion to the websocket as assistant_delta frames.
+
+    Returns the complete raw reply so it can be parsed like a non-streamed one.
+    """
+    extractor = AssistantDeltaExtractor()
+    parts: List[str] = []
+
+    stream = await openai_client.chat.completions.create(stream=True, **create_kwargs)
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        token = chunk.choices[0].delta.content
+        if not token:
+            continue
+        parts.append(token)
+        delta = extractor.feed(token)
+        if delta:
+            await websocket.send_text(json.dumps({
+                "type": "assistant_delta",
+                "content": delta
+            }))
+
+    return "".join(parts)
 
 
 def build_training_json(training: Training, sections: List[TrainingSection], overlays: List[Overlay], assets_map: Dict[str, Asset], styles_map: Dict[str, Style]) -> Dict[str, Any]:
@@ -268,8 +371,20 @@ def build_training_json(training: Training, sections: List[TrainingSection], ove
     return base
 
 
+async def record_chat_message(websocket: WebSocket, chat_message: ChatMessage) -> None:
+    """Record a websocket chat row; a failed write is reported to the client, not dropped"""
+    try:
+        await record_telemetry([chat_message], sessions_verified=True)
+    except Exception as e:
+        logger.error(f"Failed to record chat message {chat_message.id}: {e}")
+        await websocket.send_text(json.dumps({
+            "type": "error",
+            "message": f"Failed to record chat message: {str(e)}"
+        }))
+
+
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket, session: Session = Depends(get_session)):
+async def websocket_endpoint(websocket: WebSocket):
     print("🔌 WebSocket connection attempt...")
     await websocket.accept()
     print("✅ WebSocket connection accepted!")
@@ -289,6 +404,12 @@ async def websocket_endpoint(websocket: WebSocket, session: Session = Depends(ge
         training_context = None
         current_section = None
         current_session = None
+        session_company_id = None
+        # User/assistant turns of this connection; chat rows are written behind, so the
+        # LLM history is kept here instead of read back from chatmessage
+        chat_turns: List[Dict[str, Any]] = []
+        # Streaming protocol mode: assistant_delta frames before the final assistant_message
+        stream_replies = False
         
         while True:
             data = await websocket.receive_text()
@@ -302,6 +423,7 @@ async def websocket_endpoint(websocket: WebSocket, session: Session = Depends(ge
                 context = message.get("context", {})
                 access_code = context.get("accessCode")
                 user_id = context.get("userId")
+                stream_replies = bool(message.get("stream", context.get("stream", False)))
                 
                 if not access_code:
                     await websocket.send_text(json.dumps({
@@ -310,79 +432,86 @@ async def websocket_endpoint(websocket: WebSocket, session: Session = Depends(ge
                     }))
                     continue
                 
-                # Find training by access code
-                training = None
-                company_training = None
-                
-                # First try direct training access code
-                stmt = select(Training).where(Training.access_code == access_code)
-                training = session.exec(stmt).first()
-                
-                if not training:
-                    # Try company training access code
-                    stmt = select(CompanyTraining).where(CompanyTraining.access_code == access_code)
-                    company_training = session.exec(stmt).first()
-                    if company_training:
-                        stmt = select(Training).where(Training.id == company_training.training_id)
-                        training = session.exec(stmt).first()
-                
-                if not training:
-                    await websocket.send_text(json.dumps({
-                        "type": "error",
-                        "message": "Training not found"
-                    }))
-                    continue
-                
-                print(f"📚 Found training: {training.title}")
-                
-                # Load training data
-                sections = session.exec(select(TrainingSection).where(TrainingSection.training_id == training.id)).all()
-                overlays = session.exec(select(Overlay).where(Overlay.training_section_id.in_([s.id for s in sections]))).all()
-                
-                print(f"📚 Loaded {len(sections)} sections and {len(overlays)} overlays")
-                
-                # Load assets and styles
-                asset_ids = set()
-                style_ids = set()
-                for section in sections:
-                    if section.asset_id:
-                        asset_ids.add(section.asset_id)
-                for overlay in overlays:
-                    if overlay.content_id:
-                        asset_ids.add(overlay.content_id)
-                    if overlay.style_id:
-                        style_ids.add(overlay.style_id)
-                
-                assets = session.exec(select(Asset).where(Asset.id.in_(asset_ids))).all() if asset_ids else []
-                styles = session.exec(select(Style).where(Style.id.in_(style_ids))).all() if style_ids else []
-                
-                assets_map = {a.id: a for a in assets}
-                styles_map = {s.id: s for s in styles}
-                
-                print(f"📚 Loaded {len(assets)} assets and {len(styles)} styles")
-                
-                # Build training context
-                training_context = build_training_json(training, sections, overlays, assets_map, styles_map)
-                
-                # Create session for interaction tracking
-                current_session = Session(
-                    user_id=user_id,
-                    training_id=training.id,
-                    company_id=training.company_id,
-                    started_at=datetime.utcnow(),
-                    status="active"
-                )
-                session.add(current_session)
-                session.commit()
-                session.refresh(current_session)
-                print(f"📝 Created session: {current_session.id}")
-                
-                print(f"🎭 Training avatar_id: {training.avatar_id}")
-                if training.avatar_id:
-                    avatar = session.get(Avatar, training.avatar_id)
-                    print(f"🎭 Avatar from DB: {avatar}")
-                    if avatar:
-                        print(f"🎭 Avatar voice_id: {avatar.elevenlabs_voice_id}")
+                # Short-lived DB session: the websocket must not hold a pooled connection between messages
+                async with async_session_maker() as db:
+                    # Find training by access code
+                    training = None
+                    company_training = None
+                    
+                    # First try direct training access code
+                    stmt = select(Training).where(Training.access_code == access_code)
+                    training = (await db.exec(stmt)).first()
+                    
+                    if not training:
+                        # Try company training access code
+                        stmt = select(CompanyTraining).where(CompanyTraining.access_code == access_code)
+                        company_training = (await db.exec(stmt)).first()
+                        if company_training:
+                            stmt = select(Training).where(Training.id == company_training.training_id)
+                            training = (await db.exec(stmt)).first()
+                    
+                    if not training:
+                        await websocket.send_text(json.dumps({
+                            "type": "error",
+                            "message": "Training not found"
+                        }))
+                        continue
+                    
+                    print(f"📚 Found training: {training.title}")
+                    
+                    # Load training data
+                    sections = (await db.exec(select(TrainingSection).where(TrainingSection.training_id == training.id))).all()
+                    overlays = (await db.exec(select(Overlay).where(Overlay.training_section_id.in_([s.id for s in sections])))).all()
+                    
+                    print(f"📚 Loaded {len(sections)} sections and {len(overlays)} overlays")
+                    
+                    # Load assets and styles
+                    asset_ids = set()
+                    style_ids = set()
+                    for section in sections:
+                        if section.asset_id:
+                            asset_ids.add(section.asset_id)
+                    for overlay in overlays:
+                        if overlay.content_id:
+                            asset_ids.add(overlay.content_id)
+                        if overlay.style_id:
+                            style_ids.add(overlay.style_id)
+                    
+                    assets = (await db.exec(select(Asset).where(Asset.id.in_(asset_ids)))).all() if asset_ids else []
+                    styles = (await db.exec(select(Style).where(Style.id.in_(style_ids)))).all() if style_ids else []
+                    
+                    assets_map = {a.id: a for a in assets}
+                    styles_map = {s.id: s for s in styles}
+                    
+                    print(f"📚 Loaded {len(assets)} assets and {len(styles)} styles")
+                    
+                    # Build training context
+                    training_context = build_training_json(training, sections, overlays, assets_map, styles_map)
+                    
+                    # Create session for interaction tracking (chat rows reference interactionsession,
+                    # whose user_id is required); anonymous connections are not recorded
+                    current_session = None
+                    session_company_id = training.company_id
+                    if user_id and await db.get(User, user_id):
+                        current_session = InteractionSession(
+                            training_id=training.id,
+                            user_id=user_id,
+                            access_code=access_code
+                        )
+                        db.add(current_session)
+                        await db.commit()
+                        await db.refresh(current_session)
+                        print(f"📝 Created session: {current_session.id}")
+                    else:
+                        print("📝 No known user, chat messages of this connection are not recorded")
+                    chat_turns = []
+                    
+                    print(f"🎭 Training avatar_id: {training.avatar_id}")
+                    if training.avatar_id:
+                        avatar = await db.get(Avatar, training.avatar_id)
+                        print(f"🎭 Avatar from DB: {avatar}")
+                        if avatar:
+                            print(f"🎭 Avatar voice_id: {avatar.elevenlabs_voice_id}")
                 
                 print("🚀 Sending training context to frontend")
                 await websocket.send_text(json.dumps({
@@ -434,22 +563,17 @@ async def websocket_endpoint(websocket: WebSocket, session: Session = Depends(ge
                 
                 # Add system message to chat history for LLM context
                 if current_session:
-                    try:
-                        system_message = ChatMessage(
-                            session_id=current_session.id,
-                            user_id=user_id,
-                            training_id=current_session.training_id,
-                            company_id=current_session.company_id,
-                            message_type="system",
-                            content=content,
-                            section_id=current_section.get('id') if current_section else None,
-                            timestamp=datetime.utcnow()
-                        )
-                        session.add(system_message)
-                        session.commit()
-                        print(f"📝 Recorded system message: {system_message.id}")
-                    except Exception as e:
-                        print(f"⚠️ Failed to record system message: {e}")
+                    system_message = ChatMessage(
+                        session_id=current_session.id,
+                        user_id=user_id,
+                        training_id=current_session.training_id,
+                        company_id=session_company_id,
+                        message_type="system",
+                        content=content,
+                        section_id=current_section.get('id') if current_section else None,
+                        timestamp=datetime.utcnow()
+                    )
+                    await record_chat_message(websocket, system_message)
                 
                 # System messages are handled by the LLM context, no response needed
                 
@@ -472,22 +596,17 @@ async def websocket_endpoint(websocket: WebSocket, session: Session = Depends(ge
                 
                 # Record video ended event (but don't add to chat history for LLM context)
                 if current_session:
-                    try:
-                        video_ended_message = ChatMessage(
-                            session_id=current_session.id,
-                            user_id=user_id,
-                            training_id=current_session.training_id,
-                            company_id=current_session.company_id,
-                            message_type="system",
-                            content=f"VIDEO_ENDED: {content}",
-                            section_id=section_id,
-                            timestamp=datetime.utcnow()
-                        )
-                        session.add(video_ended_message)
-                        session.commit()
-                        print(f"📝 Recorded video ended message: {video_ended_message.id}")
-                    except Exception as e:
-                        print(f"⚠️ Failed to record video ended message: {e}")
+                    video_ended_message = ChatMessage(
+                        session_id=current_session.id,
+                        user_id=user_id,
+                        training_id=current_session.training_id,
+                        company_id=session_company_id,
+                        message_type="system",
+                        content=f"VIDEO_ENDED: {content}",
+                        section_id=section_id,
+                        timestamp=datetime.utcnow()
+                    )
+                    await record_chat_message(websocket, video_ended_message)
                 
             elif message.get("type") == "user_message":
                 print("💬 User message received")
@@ -498,24 +617,26 @@ async def websocket_endpoint(websocket: WebSocket, session: Session = Depends(ge
                 # Check if this is a video ended response
                 is_video_ended_response = any(keyword in content.lower() for keyword in ['devam et', 'sonraki', 'tekrar et'])
                 
+                chat_turns.append({
+                    "role": "user",
+                    "content": content,
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "section_id": current_section.get('id') if current_section else None
+                })
+                
                 # Record user chat message
                 if current_session:
-                    try:
-                        user_message = ChatMessage(
-                            session_id=current_session.id,
-                            user_id=user_id,
-                            training_id=current_session.training_id,
-                            company_id=current_session.company_id,
-                            message_type="user",
-                            content=content,
-                            section_id=current_section.get('id') if current_section else None,
-                            timestamp=datetime.utcnow()
-                        )
-                        session.add(user_message)
-                        session.commit()
-                        print(f"📝 Recorded user message: {user_message.id}")
-                    except Exception as e:
-                        print(f"⚠️ Failed to record user message: {e}")
+                    user_message = ChatMessage(
+                        session_id=current_session.id,
+                        user_id=user_id,
+                        training_id=current_session.training_id,
+                        company_id=session_company_id,
+                        message_type="user",
+                        content=content,
+                        section_id=current_section.get('id') if current_section else None,
+                        timestamp=datetime.utcnow()
+                    )
+                    await record_chat_message(websocket, user_message)
                 
                 # If this is a video ended response, handle specially
                 if is_video_ended_response:
@@ -544,31 +665,8 @@ async def websocket_endpoint(websocket: WebSocket, session: Session = Depends(ge
                 # Get current context from message if available
                 current_context = message.get("context", {})
                 
-                # Get chat history for context
-                chat_history = []
-                if current_session:
-                    try:
-                        # Get recent chat messages for context (last 10 messages)
-                        recent_messages = session.exec(
-                            select(ChatMessage)
-                            .where(ChatMessage.session_id == current_session.id)
-                            .order_by(ChatMessage.timestamp.desc())
-                            .limit(10)
-                        ).all()
-                        
-                        # Reverse to get chronological order and filter out system messages
-                        for msg in reversed(recent_messages):
-                            # Skip system messages (VIDEO_ENDED, LLM_INTERACTION_WAITING, etc.)
-                            if msg.message_type == "system":
-                                continue
-                            chat_history.append({
-                                "role": "user" if msg.message_type == "user" else "assistant",
-                                "content": msg.content,
-                                "timestamp": msg.timestamp.isoformat(),
-                                "section_id": msg.section_id
-                            })
-                    except Exception as e:
-                        print(f"⚠️ Failed to get chat history: {e}")
+                # Chat history for context (last 10 messages, this one included)
+                chat_history = chat_turns[-10:]
 
                 # Build system prompt with training context
                 training_data = training_context or {}
@@ -684,7 +782,7 @@ Mevcut bölümün tipine göre davran:
                     print(f"🤖 System prompt length: {len(system_prompt)}")
                     print(f"🤖 User message: {content}")
                     
-                    response = await openai_client.chat.completions.create(
+                    completion_kwargs = dict(
                         model="gpt-4o",
                         messages=[
                             {"role": "system", "content": system_prompt},
@@ -694,7 +792,11 @@ Mevcut bölümün tipine göre davran:
                         temperature=0.7
                     )
                     
-                    llm_response = response.choices[0].message.content
+                    if message.get("stream", stream_replies):
+                        llm_response = await stream_assistant_reply(websocket, openai_client, **completion_kwargs)
+                    else:
+                        response = await openai_client.chat.completions.create(**completion_kwargs)
+                        llm_response = response.choices[0].message.content
                     print(f"🤖 LLM Response: {llm_response}")
                     
                     # Try to parse JSON response
@@ -719,7 +821,8 @@ Mevcut bölümün tipine göre davran:
                             avatar_id = training_context["training"]["avatar_id"]
                             print(f"🎤 Avatar ID from context: {avatar_id}")
                             try:
-                                avatar = session.get(Avatar, avatar_id)
+                                async with async_session_maker() as db:
+                                    avatar = await db.get(Avatar, avatar_id)
                                 print(f"🎤 Avatar from DB: {avatar}")
                                 if avatar and avatar.elevenlabs_voice_id:
                                     print(f"🎤 Generating TTS audio with voice_id: {avatar.elevenlabs_voice_id}")
@@ -746,31 +849,33 @@ Mevcut bölümün tipine göre davran:
                             except Exception as e:
                                 print(f"⚠️ Default TTS generation failed: {e}")
                         
+                        chat_turns.append({
+                            "role": "assistant",
+                            "content": parsed_response.get("message", llm_response),
+                            "timestamp": datetime.utcnow().isoformat(),
+                            "section_id": current_section.get('id') if current_section else None
+                        })
+                        
                         # Record assistant chat message
                         if current_session:
-                            try:
-                                assistant_message = ChatMessage(
-                                    session_id=current_session.id,
-                                    user_id=user_id,
-                                    training_id=current_session.training_id,
-                                    company_id=current_session.company_id,
-                                    message_type="assistant",
-                                    content=parsed_response.get("message", llm_response),
-                                    section_id=current_section.get('id') if current_section else None,
-                                    llm_model="gpt-4o",
-                                    audio_data=audio_data,
-                                    has_audio=bool(audio_data),
-                                    timestamp=datetime.utcnow(),
-                                    message_metadata=json.dumps({
-                                        "suggestions": parsed_response.get("suggestions", []),
-                                        "actions": parsed_response.get("actions", [])
-                                    })
-                                )
-                                session.add(assistant_message)
-                                session.commit()
-                                print(f"📝 Recorded assistant message: {assistant_message.id}")
-                            except Exception as e:
-                                print(f"⚠️ Failed to record assistant message: {e}")
+                            assistant_message = ChatMessage(
+                                session_id=current_session.id,
+                                user_id=user_id,
+                                training_id=current_session.training_id,
+                                company_id=session_company_id,
+                                message_type="assistant",
+                                content=parsed_response.get("message", llm_response),
+                                section_id=current_section.get('id') if current_section else None,
+                                llm_model="gpt-4o",
+                                audio_data=audio_data,
+                                has_audio=bool(audio_data),
+                                timestamp=datetime.utcnow(),
+                                message_metadata=json.dumps({
+                                    "suggestions": parsed_response.get("suggestions", []),
+                                    "actions": parsed_response.get("actions", [])
+                                })
+                            )
+                            await record_chat_message(websocket, assistant_message)
                         
                         # Send structured response
                         await websocket.send_text(json.dumps({
@@ -818,34 +923,34 @@ async def generate_tts_audio(text: str, voice_id: str) -> str:
         raise HTTPException(status_code=500, detail="ELEVENLABS_API_KEY is not set")
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}",
-                headers={
-                    "xi-api-key": elevenlabs_api_key,
-                    "Content-Type": "application/json",
-                    "Accept": "audio/mpeg"
-                },
-                json={
-                    "text": text,
-                    "model_id": "eleven_multilingual_v2",
-                    "voice_settings": {
-                        "stability": 0.5,
-                        "similarity_boost": 0.7
-                    }
+        client = get_async_http_client("elevenlabs")
+        response = await client.post(
+            f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}",
+            headers={
+                "xi-api-key": elevenlabs_api_key,
+                "Content-Type": "application/json",
+                "Accept": "audio/mpeg"
+            },
+            json={
+                "text": text,
+                "model_id": "eleven_multilingual_v2",
+                "voice_settings": {
+                    "stability": 0.5,
+                    "similarity_boost": 0.7
                 }
+            }
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"ElevenLabs TTS error: {response.text}"
             )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"ElevenLabs TTS error: {response.text}"
-                )
-            
-            # Return the audio data as base64
-            audio_base64 = base64.b64encode(response.content).decode('utf-8')
-            return audio_base64
-            
+        
+        # Return the audio data as base64
+        audio_base64 = base64.b64encode(response.content).decode('utf-8')
+        return audio_base64
+        
     except httpx.RequestError as e:
         raise HTTPException(status_code=500, detail=f"Failed to connect to ElevenLabs API: {str(e)}")
     except Exception as e:
@@ -3,7 +3,9 @@ from pydantic import BaseModel
 from sqlmodel import Session, select
 from ..db import get_session
 from ..models import Company, CompanyTraining, User
-from ..auth import get_current_user, is_super_admin, check_company_access
+from ..auth import get_current_user, get_current_company, is_super_admin, check_company_access
+from ..services.principal_cache import invalidate_company_principals
+from ..services.training_manifest import invalidate_training_manifests
 import secrets
 
 router = APIRouter(prefix="/companies", tags=["companies"])
@@ -27,17 +29,16 @@ class CompanyTrainingIn(BaseModel):
 @router.get("")
 def list_companies(
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    current_company: Company | None = Depends(get_current_company)
 ):
     if is_super_admin(current_user):
         # Süper admin tüm firmaları görebilir
         return session.exec(select(Company)).all()
     else:
         # Admin kullanıcılar sadece kendi firmalarını görebilir
-        if not current_user.company_id:
-            return []
-        company = session.get(Company, current_user.company_id)
-        return [company] if company else []
+        # Şirket bilgisi principal cache'ten gelir, ek sorgu gerekmez
+        return [current_company] if current_company else []
 
 
 @router.get("/{company_id}")
@@ -94,6 +95,8 @@ def update_company(
     session.add(company)
     session.commit()
     session.refresh(company)
+    invalidate_training_manifests(company_id=company_id)
+    invalidate_company_principals(company_id)
     return company
 
 
@@ -113,6 +116,7 @@ def delete_company(
     
     session.delete(company)
     session.commit()
+    invalidate_company_principals(company_id)
     return {"ok": True}
 
 
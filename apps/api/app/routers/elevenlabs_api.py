@@ -8,6 +8,7 @@ import logging
 
 from ..db import get_session
 from ..models import InteractionSession
+from ..services.provider_clients import get_async_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -26,10 +27,10 @@ async def get_elevenlabs_conversation(conversation_id: str) -> Dict[str, Any]:
     }
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-            return response.json()
+        client = get_async_http_client("elevenlabs")
+        response = await client.get(url, headers=headers)
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as e:
         logger.error(f"ElevenLabs API error: {e.response.status_code} - {e.response.text}")
         raise HTTPException(status_code=e.response.status_code, detail=f"ElevenLabs API error: {e.response.text}")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlmodel import Session, select, and_
 from typing import List, Optional, Dict, Any
 from datetime import datetime
@@ -8,6 +8,9 @@ import json
 
 from app.db import get_session
 from app.auth import get_current_user
+from app.pagination import finish_page, keyset_page, page_limit
+from app.services.provider_clients import get_sync_http_client
+from app.services.training_analytics import daily_stats_query, mark_rollups_dirty_sync, summarize_daily_stats
 from app.models import User, EvaluationReport, InteractionSession, Training
 from app.schemas import (
     EvaluationReportCreate, 
@@ -20,15 +23,18 @@ router = APIRouter(prefix="/evaluation-reports", tags=["evaluation-reports"])
 
 @router.get("/", response_model=List[EvaluationReportResponse])
 def get_evaluation_reports(
+    response: Response,
     session_id: Optional[str] = None,
     user_id: Optional[str] = None,
     training_id: Optional[str] = None,
     status: Optional[str] = None,
     is_public: Optional[bool] = None,
+    after: Optional[str] = None,
+    limit: int = Depends(page_limit),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Değerlendirme raporlarını listele"""
+    """Değerlendirme raporlarını listele (yeniden eskiye, `after` cursor'ı ile sayfalı)"""
     query = select(EvaluationReport)
     
     # Kullanıcı yetkisi kontrolü
@@ -60,11 +66,10 @@ def get_evaluation_reports(
     if is_public is not None:
         query = query.where(EvaluationReport.is_public == is_public)
     
-    # Sıralama
-    query = query.order_by(EvaluationReport.generated_at.desc())
+    # Sıralama ve sayfalama: (generated_at, id) üzerinde keyset
+    query = keyset_page(query, EvaluationReport.generated_at, EvaluationReport.id, after, limit)
     
-    reports = session.exec(query).all()
-    return reports
+    return finish_page(session.exec(query).all(), limit, response, timestamp_field="generated_at")
 
 
 @router.get("/{report_id}", response_model=EvaluationReportResponse)
@@ -147,6 +152,7 @@ def create_evaluation_report(
     )
     
     session.add(report)
+    mark_rollups_dirty_sync(session, [report], "generated_at")
     session.commit()
     session.refresh(report)
     
@@ -192,6 +198,7 @@ def update_evaluation_report(
         setattr(report, field, value)
     
     session.add(report)
+    mark_rollups_dirty_sync(session, [report], "generated_at")
     session.commit()
     session.refresh(report)
     
@@ -220,6 +227,7 @@ def delete_evaluation_report(
         )
     
     session.delete(report)
+    mark_rollups_dirty_sync(session, [report], "generated_at")
     session.commit()
     
     return {"message": "Değerlendirme raporu başarıyla silindi"}
@@ -280,14 +288,10 @@ def get_training_evaluation_analytics(
             detail="Bu eğitimin analitiklerine erişim yetkiniz yok"
         )
     
-    # Bu eğitim için tüm raporları getir
-    reports = session.exec(
-        select(EvaluationReport)
-        .where(EvaluationReport.training_id == training_id)
-        .order_by(EvaluationReport.generated_at.desc())
-    ).all()
+    # Sayılar günlük özet tablosundan; yalnızca son 5 rapor ham tablodan okunur
+    summary = summarize_daily_stats(session.exec(daily_stats_query(training_id)).all())
     
-    if not reports:
+    if not summary["total_reports"]:
         return {
             "training_id": training_id,
             "total_reports": 0,
@@ -297,26 +301,6 @@ def get_training_evaluation_analytics(
             "recent_reports": []
         }
     
-    # İstatistikleri hesapla
-    total_reports = len(reports)
-    scores = [r.overall_score for r in reports if r.overall_score is not None]
-    average_score = sum(scores) / len(scores) if scores else None
-    
-    # Puan dağılımı
-    score_distribution = {
-        "0-20": len([s for s in scores if 0 <= s < 20]),
-        "20-40": len([s for s in scores if 20 <= s < 40]),
-        "40-60": len([s for s in scores if 40 <= s < 60]),
-        "60-80": len([s for s in scores if 60 <= s < 80]),
-        "80-100": len([s for s in scores if 80 <= s <= 100])
-    }
-    
-    # Durum dağılımı
-    status_distribution = {}
-    for report in reports:
-        status = report.status
-        status_distribution[status] = status_distribution.get(status, 0) + 1
-    
     # Son 5 rapor
     recent_reports = [
         {
@@ -327,15 +311,20 @@ def get_training_evaluation_analytics(
             "generated_at": r.generated_at,
             "report_title": r.report_title
         }
-        for r in reports[:5]
+        for r in session.exec(
+            select(EvaluationReport)
+            .where(EvaluationReport.training_id == training_id)
+            .order_by(EvaluationReport.generated_at.desc())
+            .limit(5)
+        ).all()
     ]
     
     return {
         "training_id": training_id,
-        "total_reports": total_reports,
-        "average_score": average_score,
-        "score_distribution": score_distribution,
-        "status_distribution": status_distribution,
+        "total_reports": summary["total_reports"],
+        "average_score": summary["average_score"],
+        "score_distribution": summary["score_distribution"],
+        "status_distribution": summary["status_distribution"],
         "recent_reports": recent_reports
     }
 
@@ -436,36 +425,28 @@ def get_elevenlabs_conversation_data(
         
         conversation_id = interaction_session.elevenlabs_conversation_id
         
-        async def fetch_conversation_data():
-            async with httpx.AsyncClient() as client:
-                headers = {
-                    "xi-api-key": elevenlabs_api_key,
-                    "Content-Type": "application/json"
-                }
-                
-                url = f"https://api.elevenlabs.io/v1/convai/conversations/{conversation_id}"
-                
-                response = await client.get(url, headers=headers)
-                
-                if response.status_code == 200:
-                    return response.json()
-                elif response.status_code == 404:
-                    return None  # Conversation not found
-                else:
-                    raise HTTPException(
-                        status_code=status.HTTP_502_BAD_GATEWAY,
-                        detail=f"ElevenLabs API hatası: {response.status_code}"
-                    )
-        
-        # Sync wrapper for async function
-        import asyncio
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+        def fetch_conversation_data():
+            client = get_sync_http_client("elevenlabs")
+            headers = {
+                "xi-api-key": elevenlabs_api_key,
+                "Content-Type": "application/json"
+            }
+            
+            url = f"https://api.elevenlabs.io/v1/convai/conversations/{conversation_id}"
+            
+            response = client.get(url, headers=headers)
+            
+            if response.status_code == 200:
+                return response.json()
+            elif response.status_code == 404:
+                return None  # Conversation not found
+            else:
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail=f"ElevenLabs API hatası: {response.status_code}"
+                )
         
-        conversation_data = loop.run_until_complete(fetch_conversation_data())
+        conversation_data = fetch_conversation_data()
         
         if conversation_data is None:
             raise HTTPException(
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlmodel import Session, select, and_
 from typing import List, Optional
 from datetime import datetime
 
 from app.db import get_session
 from app.auth import get_current_user
+from app.pagination import finish_page, keyset_page, page_limit
 from app.models import User, EvaluationResult, EvaluationCriteria, InteractionSession, Training
 from app.schemas import (
     EvaluationResultCreate, 
@@ -17,14 +18,17 @@ router = APIRouter(prefix="/evaluation-results", tags=["evaluation-results"])
 
 @router.get("/", response_model=List[EvaluationResultResponse])
 def get_evaluation_results(
+    response: Response,
     session_id: Optional[str] = None,
     user_id: Optional[str] = None,
     training_id: Optional[str] = None,
     criteria_id: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Depends(page_limit),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Değerlendirme sonuçlarını listele"""
+    """Değerlendirme sonuçlarını listele (yeniden eskiye, `after` cursor'ı ile sayfalı)"""
     query = select(EvaluationResult)
     
     # Kullanıcı yetkisi kontrolü
@@ -50,11 +54,10 @@ def get_evaluation_results(
     if criteria_id:
         query = query.where(EvaluationResult.criteria_id == criteria_id)
     
-    # Sıralama
-    query = query.order_by(EvaluationResult.evaluated_at.desc())
+    # Sıralama ve sayfalama: (created_at, id) üzerinde keyset
+    query = keyset_page(query, EvaluationResult.created_at, EvaluationResult.id, after, limit)
     
-    results = session.exec(query).all()
-    return results
+    return finish_page(session.exec(query).all(), limit, response)
 
 
 @router.get("/{result_id}", response_model=EvaluationResultResponse)
@@ -1,13 +1,20 @@
+import asyncio
 import base64
 import io
 import os
 import uuid
 from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlmodel import Session
 
+from ..db import get_session
+from ..models import User
+from ..auth import get_current_user
 from ..storage import get_minio, ensure_bucket, MINIO_BUCKET
+from ..services.jobs import JobContext, enqueue_job, job_handler, job_status
+from ..services.provider_clients import get_async_http_client, get_async_openai, get_sync_http_client
 
 # Providers:
 # - OpenAI (images via gpt-image-1)
@@ -106,13 +113,11 @@ async def generate_image(body: GenerateImageBody):
 
     if provider == "openai":
         try:
-            from openai import AsyncOpenAI
-
             api_key = os.getenv("OPENAI_API_KEY")
             if not api_key:
                 raise HTTPException(status_code=400, detail="OPENAI_API_KEY is not set")
 
-            client = AsyncOpenAI(api_key=api_key)
+            client = get_async_openai(api_key)
             # OpenAI Images API supports limited sizes for gpt-image-1
             # Per API: supported sizes are 1024x1024, 1024x1536, 1536x1024, and 'auto'
             allowed_sizes = {"1024x1024", "1536x1024", "1024x1536"}
@@ -137,7 +142,7 @@ async def generate_image(body: GenerateImageBody):
     elif provider == "luma":
         # Use Luma REST API for image generation
         try:
-            import requests
+            http = get_async_http_client("luma")
             api_key = os.getenv("LUMAAI_API_KEY")
             if not api_key:
                 raise HTTPException(status_code=400, detail="LUMAAI_API_KEY is not set")
@@ -165,13 +170,13 @@ async def generate_image(body: GenerateImageBody):
                 "aspect_ratio": ar,
                 "model": model_id,
             }
-            r_create = requests.post(
+            r_create = await http.post(
                 "https://api.lumalabs.ai/dream-machine/v1/generations/image",
                 json=payload,
                 headers=headers,
                 timeout=60,
             )
-            if not r_create.ok:
+            if not r_create.is_success:
                 raise HTTPException(status_code=500, detail=f"Luma image create failed: {r_create.status_code} {r_create.text}")
             gen = r_create.json()
             gen_id = gen.get("id")
@@ -181,14 +186,13 @@ async def generate_image(body: GenerateImageBody):
             # Poll for completion
             image_url = None
             for _ in range(120):
-                r_get = requests.get(
+                r_get = await http.get(
                     f"https://api.lumalabs.ai/dream-machine/v1/generations/{gen_id}",
                     headers=headers,
                     timeout=30,
                 )
-                if not r_get.ok:
-                    import time as _t
-                    _t.sleep(2)
+                if not r_get.is_success:
+                    await asyncio.sleep(2)
                     continue
                 j = r_get.json()
                 state = j.get("state")
@@ -207,15 +211,14 @@ async def generate_image(body: GenerateImageBody):
                     break
                 if state in ("failed", "error"):
                     raise HTTPException(status_code=502, detail=f"Luma image generation failed: {j.get('error')}")
-                import time as _t
-                _t.sleep(2)
+                await asyncio.sleep(2)
 
             if not image_url:
                 raise HTTPException(status_code=504, detail="Luma image generation timed out or missing image URL")
 
             # Download and upload to MinIO
-            r_img = requests.get(image_url, timeout=60)
-            if not r_img.ok:
+            r_img = await http.get(image_url, timeout=60)
+            if not r_img.is_success:
                 raise HTTPException(status_code=502, detail=f"Failed to fetch Luma image: {r_img.status_code}")
             image_bytes = r_img.content
             # Guess content type
@@ -394,8 +397,28 @@ async def generate_image(body: GenerateImageBody):
     return {"uri": saved_key, "content_type": content_type}
 
 
-@router.post("/video")
-async def generate_video(body: GenerateVideoBody):
+VIDEO_PROVIDERS = {"luma", "heygen"}
+
+
+# Video generation polls the provider for minutes: queue a job, poll GET /jobs/{job_id} for the result
+@router.post("/video", status_code=202)
+def generate_video(
+    body: GenerateVideoBody,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    if body.provider.lower() not in VIDEO_PROVIDERS:
+        raise HTTPException(status_code=400, detail="Unsupported provider for video generation. Use 'luma' or 'heygen'.")
+    job = enqueue_job(session, "generate_video", body.model_dump(), user_id=current_user.id)
+    return job_status(job)
+
+
+@job_handler("generate_video")
+def run_generate_video_job(ctx: JobContext, payload: dict) -> dict:
+    return _generate_video(GenerateVideoBody(**payload), ctx)
+
+
+def _generate_video(body: GenerateVideoBody, ctx: JobContext) -> dict:
     provider = body.provider.lower()
     model = body.model
 
@@ -411,16 +434,16 @@ async def generate_video(body: GenerateVideoBody):
     # Currently supported providers for video: luma, heygen
     if provider == "luma":
         try:
-            from lumaai import LumaAI  # type: ignore
             import time
             import logging
-            import requests
+            http = get_sync_http_client("luma")
+            from lumaai import LumaAI  # type: ignore
 
             api_key = os.getenv("LUMAAI_API_KEY")
             if not api_key:
                 raise HTTPException(status_code=400, detail="LUMAAI_API_KEY is not set")
 
-            client = LumaAI(auth_token=api_key)
+            client = LumaAI(auth_token=api_key, http_client=http)
 
             # Map requested size to aspect ratio string
             w, h = body.width, body.height
@@ -451,6 +474,7 @@ async def generate_video(body: GenerateVideoBody):
             )
 
             gen_id = gen.id
+            ctx.report_progress(0.1, "Luma generation started")
             # Poll for completion
             for _ in range(150):  # poll up to ~5 minutes
                 g = client.generations.get(id=gen_id)
@@ -491,8 +515,8 @@ async def generate_video(body: GenerateVideoBody):
                             api_key = os.getenv("LUMAAI_API_KEY")
                             headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
                             url = f"https://api.lumalabs.ai/dream-machine/v1/generations/{gen_id}"
-                            r = requests.get(url, headers=headers, timeout=60)
-                            if r.ok:
+                            r = http.get(url, headers=headers, timeout=60)
+                            if r.is_success:
                                 j = r.json()
                                 assets_j = j.get("assets")
                                 if isinstance(assets_j, dict):
@@ -514,7 +538,7 @@ async def generate_video(body: GenerateVideoBody):
                         raise HTTPException(status_code=502, detail="Luma returned no video URL")
 
                     # Download and upload to MinIO
-                    resp = requests.get(video_url, timeout=120)
+                    resp = http.get(video_url, timeout=120)
                     if resp.status_code != 200:
                         raise HTTPException(status_code=502, detail=f"Failed to fetch Luma video: {resp.status_code}")
                     data = resp.content
@@ -549,8 +573,8 @@ async def generate_video(body: GenerateVideoBody):
                     "aspect_ratio": ar,
                     "loop": False,
                 }
-                r_create = requests.post("https://api.lumalabs.ai/dream-machine/v1/generations", json=payload, headers=headers, timeout=60)
-                if not r_create.ok:
+                r_create = http.post("https://api.lumalabs.ai/dream-machine/v1/generations", json=payload, headers=headers, timeout=60)
+                if not r_create.is_success:
                     raise HTTPException(status_code=500, detail=f"Luma REST create failed: {r_create.status_code} {r_create.text}")
                 gen_j = r_create.json()
                 gen_id = gen_j.get("id")
@@ -558,8 +582,8 @@ async def generate_video(body: GenerateVideoBody):
                     raise HTTPException(status_code=502, detail="Luma REST response missing id")
                 # poll
                 for _ in range(150):
-                    r = requests.get(f"https://api.lumalabs.ai/dream-machine/v1/generations/{gen_id}", headers=headers, timeout=60)
-                    if not r.ok:
+                    r = http.get(f"https://api.lumalabs.ai/dream-machine/v1/generations/{gen_id}", headers=headers, timeout=60)
+                    if not r.is_success:
                         time.sleep(2)
                         continue
                     j = r.json()
@@ -581,7 +605,7 @@ async def generate_video(body: GenerateVideoBody):
                             video_url = j.get("video") or j.get("url")
                         if not video_url:
                             raise HTTPException(status_code=502, detail="Luma returned no video URL (REST)")
-                        resp = requests.get(video_url, timeout=120)
+                        resp = http.get(video_url, timeout=120)
                         if resp.status_code != 200:
                             raise HTTPException(status_code=502, detail=f"Failed to fetch Luma video: {resp.status_code}")
                         data = resp.content
@@ -599,8 +623,8 @@ async def generate_video(body: GenerateVideoBody):
 
     if provider == "heygen":
         try:
-            import requests
             import time
+            http = get_sync_http_client("heygen")
             api_key = os.getenv("HEYGEN_API_KEY") or os.getenv("HEYGEN_APIKEY") or os.getenv("HEYGEN_KEY")
             if not api_key:
                 raise HTTPException(status_code=400, detail="HEYGEN_API_KEY is not set")
@@ -631,8 +655,8 @@ async def generate_video(body: GenerateVideoBody):
             }
 
             headers = {"X-Api-Key": api_key, "Content-Type": "application/json", "Accept": "application/json"}
-            r_create = requests.post("https://api.heygen.com/v2/video/generate", json=payload, headers=headers, timeout=60)
-            if not r_create.ok:
+            r_create = http.post("https://api.heygen.com/v2/video/generate", json=payload, headers=headers, timeout=60)
+            if not r_create.is_success:
                 raise HTTPException(status_code=500, detail=f"HeyGen create failed: {r_create.status_code} {r_create.text}")
             gen = r_create.json()
             video_id = gen.get("data", {}).get("video_id") or gen.get("video_id")
@@ -640,11 +664,12 @@ async def generate_video(body: GenerateVideoBody):
                 raise HTTPException(status_code=502, detail="HeyGen response missing video_id")
 
             # Poll status
+            ctx.report_progress(0.1, "HeyGen generation started")
             status_url = f"https://api.heygen.com/v1/video_status.get?video_id={video_id}"
             video_url = None
             for _ in range(180):
-                r_stat = requests.get(status_url, headers={"X-Api-Key": api_key, "Accept": "application/json"}, timeout=30)
-                if r_stat.ok:
+                r_stat = http.get(status_url, headers={"X-Api-Key": api_key, "Accept": "application/json"}, timeout=30)
+                if r_stat.is_success:
                     js = r_stat.json()
                     status = js.get("data", {}).get("status") or js.get("status")
                     if status in ("completed", "completed_success", "success", "succeeded"):
@@ -658,7 +683,7 @@ async def generate_video(body: GenerateVideoBody):
                 raise HTTPException(status_code=504, detail="HeyGen generation timed out or missing video_url")
 
             # Download and upload to MinIO
-            resp = requests.get(video_url, timeout=120)
+            resp = http.get(video_url, timeout=120)
             if resp.status_code != 200:
                 raise HTTPException(status_code=502, detail=f"Failed to fetch HeyGen video: {resp.status_code}")
             data = resp.content
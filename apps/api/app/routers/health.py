@@ -0,0 +1,102 @@
+"""
+Liveness / readiness probes for the container platform.
+
+/health/live answers as soon as the process serves requests. /health/ready
+answers 200 only after the worker finished warming up: the database pools hold
+a live connection and the schema is at the Alembic head (so with FAST_BOOT the
+workers stay out of rotation until the one-shot migration has run).
+"""
+import asyncio
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Response
+from sqlalchemy import text
+
+from ..db import async_engine, engine
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+WARMUP_RETRY_INTERVAL = float(os.getenv("WARMUP_RETRY_INTERVAL", "2"))
+
+_state = {"ready": False, "reason": "warming up"}
+_alembic_head: Optional[str] = None
+_warmup_task: Optional[asyncio.Task] = None
+
+
+def _expected_head() -> str:
+    """Alembic head revision of the code this worker runs (read once)"""
+    global _alembic_head
+    if _alembic_head is None:
+        from alembic.config import Config
+        from alembic.script import ScriptDirectory
+
+        _alembic_head = ScriptDirectory.from_config(Config("alembic.ini")).get_current_head()
+    return _alembic_head
+
+
+def _warm_sync_pool() -> None:
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+
+async def _check_once() -> Optional[str]:
+    """None when the worker is warm, otherwise why it is not ready yet"""
+    async with async_engine.connect() as connection:
+        revision = (await connection.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+    await asyncio.to_thread(_warm_sync_pool)
+
+    head = await asyncio.to_thread(_expected_head)
+    if revision != head:
+        return f"schema at {revision}, expected {head}"
+    return None
+
+
+async def warm_up() -> None:
+    """Retry until the database is reachable and migrated, then mark the worker ready"""
+    while True:
+        try:
+            reason = await _check_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            reason = f"database unavailable: {e}"
+
+        if reason is None:
+            _state.update(ready=True, reason="ok")
+            print("✅ Worker warm, ready to serve")
+            return
+        _state["reason"] = reason
+        print(f"⏳ Worker not ready: {reason}")
+        await asyncio.sleep(WARMUP_RETRY_INTERVAL)
+
+
+def start_warmup() -> None:
+    """Start warming up in the background so the event loop serves /health/live meanwhile"""
+    global _warmup_task
+    if _warmup_task is None:
+        _warmup_task = asyncio.create_task(warm_up())
+
+
+async def stop_warmup() -> None:
+    global _warmup_task
+    if _warmup_task is not None:
+        _warmup_task.cancel()
+        try:
+            await _warmup_task
+        except asyncio.CancelledError:
+            pass
+        _warmup_task = None
+
+
+@router.get("/live")
+def liveness():
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+def readiness(response: Response):
+    if not _state["ready"]:
+        response.status_code = 503
+        return {"status": "starting", "reason": _state["reason"]}
+    return {"status": "ready"}
@@ -3,9 +3,10 @@ Import endpoints for companies to import default content from system company
 """
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List
-from app.db import get_session
+from app.db import get_async_session
 from app.models import User, Company, Style, FrameConfig, Asset, Training, CompanyTraining, TrainingSection, Overlay, Avatar
 from app.auth import get_current_user, is_admin, is_super_admin
 from app.schemas import StyleResponse, FrameConfigResponse
@@ -13,11 +14,11 @@ from app.schemas import StyleResponse, FrameConfigResponse
 router = APIRouter(prefix="/imports", tags=["imports"])
 
 
-def get_system_company(session: Session) -> Company:
+async def get_system_company(session: AsyncSession) -> Company:
     """Get the system company"""
-    system_company = session.exec(
+    system_company = (await session.exec(
         select(Company).where(Company.is_system == True)
-    ).first()
+    )).first()
     
     if not system_company:
         raise HTTPException(404, "System company not found")
@@ -27,19 +28,19 @@ def get_system_company(session: Session) -> Company:
 
 @router.get("/styles", response_model=List[StyleResponse])
 async def get_system_styles(
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Get all styles from system company that can be imported"""
     if not is_admin(current_user):
         raise HTTPException(403, "Only admins can import content")
     
-    system_company = get_system_company(session)
+    system_company = await get_system_company(session)
     
     # Get all styles from system company
-    styles = session.exec(
+    styles = (await session.exec(
         select(Style).where(Style.company_id == system_company.id)
-    ).all()
+    )).all()
     
     return [StyleResponse.model_validate(style.model_dump()) for style in styles]
 
@@ -47,7 +48,7 @@ async def get_system_styles(
 @router.post("/styles/{style_id}")
 async def import_style(
     style_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Import a specific style from system company to current user's company"""
@@ -57,10 +58,10 @@ async def import_style(
     if not current_user.company_id:
         raise HTTPException(400, "User must be associated with a company")
     
-    system_company = get_system_company(session)
+    system_company = await get_system_company(session)
     
     # Get the style from system company
-    system_style = session.get(Style, style_id)
+    system_style = await session.get(Style, style_id)
     if not system_style:
         raise HTTPException(404, "Style not found")
     
@@ -68,12 +69,12 @@ async def import_style(
         raise HTTPException(400, "Style is not from system company")
     
     # Check if style already exists in user's company
-    existing_style = session.exec(
+    existing_style = (await session.exec(
         select(Style).where(
             Style.name == system_style.name,
             Style.company_id == current_user.company_id
         )
-    ).first()
+    )).first()
     
     if existing_style:
         raise HTTPException(409, "Style with this name already exists in your company")
@@ -89,8 +90,8 @@ async def import_style(
     )
     
     session.add(new_style)
-    session.commit()
-    session.refresh(new_style)
+    await session.commit()
+    await session.refresh(new_style)
     
     return {
         "message": f"Style '{system_style.name}' imported successfully",
@@ -100,7 +101,7 @@ async def import_style(
 
 @router.post("/styles/bulk")
 async def import_all_styles(
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Import all styles from system company to current user's company"""
@@ -110,12 +111,12 @@ async def import_all_styles(
     if not current_user.company_id:
         raise HTTPException(400, "User must be associated with a company")
     
-    system_company = get_system_company(session)
+    system_company = await get_system_company(session)
     
     # Get all styles from system company
-    system_styles = session.exec(
+    system_styles = (await session.exec(
         select(Style).where(Style.company_id == system_company.id)
-    ).all()
+    )).all()
     
     imported_count = 0
     skipped_count = 0
@@ -123,12 +124,12 @@ async def import_all_styles(
     
     for system_style in system_styles:
         # Check if style already exists in user's company
-        existing_style = session.exec(
+        existing_style = (await session.exec(
             select(Style).where(
                 Style.name == system_style.name,
                 Style.company_id == current_user.company_id
             )
-        ).first()
+        )).first()
         
         if existing_style:
             skipped_count += 1
@@ -148,11 +149,11 @@ async def import_all_styles(
         imported_count += 1
         imported_styles.append(new_style)
     
-    session.commit()
+    await session.commit()
     
     # Refresh all imported styles
     for style in imported_styles:
-        session.refresh(style)
+        await session.refresh(style)
     
     return {
         "message": f"Import completed: {imported_count} styles imported, {skipped_count} skipped",
@@ -164,19 +165,19 @@ async def import_all_styles(
 
 @router.get("/frame-configs", response_model=List[FrameConfigResponse])
 async def get_system_frame_configs(
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Get all frame configs from system company that can be imported"""
     if not is_admin(current_user):
         raise HTTPException(403, "Only admins can import content")
     
-    system_company = get_system_company(session)
+    system_company = await get_system_company(session)
     
     # Get all frame configs from system company
-    frame_configs = session.exec(
+    frame_configs = (await session.exec(
         select(FrameConfig).where(FrameConfig.company_id == system_company.id)
-    ).all()
+    )).all()
     
     return [FrameConfigResponse.model_validate(config.model_dump()) for config in frame_configs]
 
@@ -184,7 +185,7 @@ async def get_system_frame_configs(
 @router.post("/frame-configs/{config_id}")
 async def import_frame_config(
     config_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Import a specific frame config from system company to current user's company"""
@@ -194,10 +195,10 @@ async def import_frame_config(
     if not current_user.company_id:
         raise HTTPException(400, "User must be associated with a company")
     
-    system_company = get_system_company(session)
+    system_company = await get_system_company(session)
     
     # Get the frame config from system company
-    system_config = session.get(FrameConfig, config_id)
+    system_config = await session.get(FrameConfig, config_id)
     if not system_config:
         raise HTTPException(404, "Frame config not found")
     
@@ -205,12 +206,12 @@ async def import_frame_config(
         raise HTTPException(400, "Frame config is not from system company")
     
     # Check if config already exists in user's company
-    existing_config = session.exec(
+    existing_config = (await session.exec(
         select(FrameConfig).where(
             FrameConfig.name == system_config.name,
             FrameConfig.company_id == current_user.company_id
         )
-    ).first()
+    )).first()
     
     if existing_config:
         raise HTTPException(409, "Frame config with this name already exists in your company")
@@ -232,8 +233,8 @@ async def import_frame_config(
     )
     
     session.add(new_config)
-    session.commit()
-    session.refresh(new_config)
+    await session.commit()
+    await session.refresh(new_config)
     
     return {
         "message": f"Frame config '{system_config.name}' imported successfully",
@@ -243,31 +244,31 @@ async def import_frame_config(
 
 @router.get("/available-content")
 async def get_available_content(
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Get summary of available content in system company"""
     if not is_admin(current_user) and not is_super_admin(current_user):
         raise HTTPException(403, "Only admins can view available content")
     
-    system_company = get_system_company(session)
+    system_company = await get_system_company(session)
     
     # Count available content
-    styles_count = session.exec(
-        select(Style).where(Style.company_id == system_company.id)
-    ).count()
+    styles_count = (await session.exec(
+        select(func.count()).select_from(Style).where(Style.company_id == system_company.id)
+    )).one()
     
-    frame_configs_count = session.exec(
-        select(FrameConfig).where(FrameConfig.company_id == system_company.id)
-    ).count()
+    frame_configs_count = (await session.exec(
+        select(func.count()).select_from(FrameConfig).where(FrameConfig.company_id == system_company.id)
+    )).one()
     
-    assets_count = session.exec(
-        select(Asset).where(Asset.company_id == system_company.id)
-    ).count()
+    assets_count = (await session.exec(
+        select(func.count()).select_from(Asset).where(Asset.company_id == system_company.id)
+    )).one()
     
-    trainings_count = session.exec(
-        select(Training).where(Training.company_id == system_company.id)
-    ).count()
+    trainings_count = (await session.exec(
+        select(func.count()).select_from(Training).where(Training.company_id == system_company.id)
+    )).one()
     
     return {
         "system_company": {
@@ -286,7 +287,7 @@ async def get_available_content(
 
 @router.get("/assigned-trainings")
 async def get_assigned_trainings(
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Get all trainings assigned to current user's company that can be imported"""
@@ -297,13 +298,13 @@ async def get_assigned_trainings(
         raise HTTPException(400, "User must be associated with a company")
     
     # Get all company trainings for current user's company
-    company_trainings = session.exec(
+    company_trainings = (await session.exec(
         select(CompanyTraining).where(CompanyTraining.company_id == current_user.company_id)
-    ).all()
+    )).all()
     
     assigned_trainings = []
     for ct in company_trainings:
-        training = session.get(Training, ct.training_id)
+        training = await session.get(Training, ct.training_id)
         if training:
             assigned_trainings.append({
                 "id": training.id,
@@ -317,15 +318,15 @@ async def get_assigned_trainings(
     return assigned_trainings
 
 
-def copy_style_to_company(source_style: Style, target_company_id: str, current_user_id: str, session: Session) -> Style:
+async def copy_style_to_company(source_style: Style, target_company_id: str, current_user_id: str, session: AsyncSession) -> Style:
     """Copy a style to target company"""
     # Check if style with same name already exists in target company
-    existing_style = session.exec(
+    existing_style = (await session.exec(
         select(Style).where(
             Style.name == source_style.name,
             Style.company_id == target_company_id
         )
-    ).first()
+    )).first()
     
     if existing_style:
         return existing_style
@@ -341,20 +342,20 @@ def copy_style_to_company(source_style: Style, target_company_id: str, current_u
     )
     
     session.add(new_style)
-    session.commit()
-    session.refresh(new_style)
+    await session.commit()
+    await session.refresh(new_style)
     return new_style
 
 
-def copy_frame_config_to_company(source_config: FrameConfig, target_company_id: str, current_user_id: str, session: Session) -> FrameConfig:
+async def copy_frame_config_to_company(source_config: FrameConfig, target_company_id: str, current_user_id: str, session: AsyncSession) -> FrameConfig:
     """Copy a frame config to target company"""
     # Check if frame config with same name already exists in target company
-    existing_config = session.exec(
+    existing_config = (await session.exec(
         select(FrameConfig).where(
             FrameConfig.name == source_config.name,
             FrameConfig.company_id == target_company_id
         )
-    ).first()
+    )).first()
     
     if existing_config:
         return existing_config
@@ -376,20 +377,20 @@ def copy_frame_config_to_company(source_config: FrameConfig, target_company_id:
     )
     
     session.add(new_config)
-    session.commit()
-    session.refresh(new_config)
+    await session.commit()
+    await session.refresh(new_config)
     return new_config
 
 
-def copy_avatar_to_company(source_avatar: Avatar, target_company_id: str, current_user_id: str, session: Session) -> Avatar:
+async def copy_avatar_to_company(source_avatar: Avatar, target_company_id: str, current_user_id: str, session: AsyncSession) -> Avatar:
     """Copy an avatar to target company"""
     # Check if avatar with same name already exists in target company
-    existing_avatar = session.exec(
+    existing_avatar = (await session.exec(
         select(Avatar).where(
             Avatar.name == source_avatar.name,
             Avatar.company_id == target_company_id
         )
-    ).first()
+    )).first()
     
     if existing_avatar:
         return existing_avatar
@@ -406,15 +407,15 @@ def copy_avatar_to_company(source_avatar: Avatar, target_company_id: str, curren
     )
     
     session.add(new_avatar)
-    session.commit()
-    session.refresh(new_avatar)
+    await session.commit()
+    await session.refresh(new_avatar)
     return new_avatar
 
 
 @router.post("/trainings/{training_id}")
 async def import_assigned_training(
     training_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Import an assigned training to current user's company as a new training with all dependencies"""
@@ -425,28 +426,28 @@ async def import_assigned_training(
         raise HTTPException(400, "User must be associated with a company")
     
     # Check if this training is assigned to user's company
-    company_training = session.exec(
+    company_training = (await session.exec(
         select(CompanyTraining).where(
             CompanyTraining.company_id == current_user.company_id,
             CompanyTraining.training_id == training_id
         )
-    ).first()
+    )).first()
     
     if not company_training:
         raise HTTPException(404, "Training is not assigned to your company")
     
     # Get the source training
-    source_training = session.get(Training, training_id)
+    source_training = await session.get(Training, training_id)
     if not source_training:
         raise HTTPException(404, "Source training not found")
     
     # Check if training with same title already exists in company
-    existing_training = session.exec(
+    existing_training = (await session.exec(
         select(Training).where(
             Training.title == source_training.title,
             Training.company_id == current_user.company_id
         )
-    ).first()
+    )).first()
     
     if existing_training:
         raise HTTPException(409, "Training with this title already exists in your company")
@@ -454,9 +455,9 @@ async def import_assigned_training(
     # Copy avatar if exists
     new_avatar_id = None
     if source_training.avatar_id:
-        source_avatar = session.get(Avatar, source_training.avatar_id)
+        source_avatar = await session.get(Avatar, source_training.avatar_id)
         if source_avatar:
-            new_avatar = copy_avatar_to_company(source_avatar, current_user.company_id, current_user.id, session)
+            new_avatar = await copy_avatar_to_company(source_avatar, current_user.company_id, current_user.id, session)
             new_avatar_id = new_avatar.id
     
     # Create new training for user's company
@@ -471,13 +472,13 @@ async def import_assigned_training(
     )
     
     session.add(new_training)
-    session.commit()
-    session.refresh(new_training)
+    await session.commit()
+    await session.refresh(new_training)
     
     # Copy training sections
-    source_sections = session.exec(
+    source_sections = (await session.exec(
         select(TrainingSection).where(TrainingSection.training_id == training_id)
-    ).all()
+    )).all()
     
     sections_copied = 0
     overlays_copied = 0
@@ -511,23 +512,23 @@ async def import_assigned_training(
         )
         
         session.add(new_section)
-        session.commit()
-        session.refresh(new_section)
+        await session.commit()
+        await session.refresh(new_section)
         sections_copied += 1
         
         # Copy overlays for this section
-        source_overlays = session.exec(
+        source_overlays = (await session.exec(
             select(Overlay).where(Overlay.training_section_id == section.id)
-        ).all()
+        )).all()
         
         for overlay in source_overlays:
             # Copy style if referenced
             new_style_id = None
             if overlay.style_id:
                 if overlay.style_id not in copied_styles:
-                    source_style = session.get(Style, overlay.style_id)
+                    source_style = await session.get(Style, overlay.style_id)
                     if source_style:
-                        new_style = copy_style_to_company(source_style, current_user.company_id, current_user.id, session)
+                        new_style = await copy_style_to_company(source_style, current_user.company_id, current_user.id, session)
                         copied_styles[overlay.style_id] = new_style.id
                         styles_copied += 1
                 new_style_id = copied_styles.get(overlay.style_id)
@@ -536,9 +537,9 @@ async def import_assigned_training(
             new_icon_style_id = None
             if overlay.icon_style_id:
                 if overlay.icon_style_id not in copied_styles:
-                    source_icon_style = session.get(Style, overlay.icon_style_id)
+                    source_icon_style = await session.get(Style, overlay.icon_style_id)
                     if source_icon_style:
-                        new_icon_style = copy_style_to_company(source_icon_style, current_user.company_id, current_user.id, session)
+                        new_icon_style = await copy_style_to_company(source_icon_style, current_user.company_id, current_user.id, session)
                         copied_styles[overlay.icon_style_id] = new_icon_style.id
                         styles_copied += 1
                 new_icon_style_id = copied_styles.get(overlay.icon_style_id)
@@ -547,9 +548,9 @@ async def import_assigned_training(
             new_frame_config_id = None
             if overlay.frame_config_id:
                 if overlay.frame_config_id not in copied_frame_configs:
-                    source_frame_config = session.get(FrameConfig, overlay.frame_config_id)
+                    source_frame_config = await session.get(FrameConfig, overlay.frame_config_id)
                     if source_frame_config:
-                        new_frame_config = copy_frame_config_to_company(source_frame_config, current_user.company_id, current_user.id, session)
+                        new_frame_config = await copy_frame_config_to_company(source_frame_config, current_user.company_id, current_user.id, session)
                         copied_frame_configs[overlay.frame_config_id] = new_frame_config.id
                         frame_configs_copied += 1
                 new_frame_config_id = copied_frame_configs.get(overlay.frame_config_id)
@@ -577,7 +578,7 @@ async def import_assigned_training(
             session.add(new_overlay)
             overlays_copied += 1
     
-    session.commit()
+    await session.commit()
     
     return {
         "message": f"Training '{source_training.title}' imported successfully with all dependencies",
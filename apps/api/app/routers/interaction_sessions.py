@@ -2,22 +2,35 @@
 LLM Interaction Session Management API Endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request, Body
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, Request, Body
+from fastapi.responses import StreamingResponse
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List, Optional
 from datetime import datetime
 import json
 
-from app.db import get_session
+from app.db import get_async_session, async_session_maker
+from app.pagination import MAX_PAGE_SIZE, finish_page, keyset_page
 from app.models import (
+    Avatar,
     InteractionSession, 
     InteractionMessage, 
     SectionProgress,
     Training,
     TrainingSection,
-    User
+    User,
+    gen_uuid
+)
+from app.services.flow_analyzer import FlowAnalyzer, compile_training_flow
+from app.services.provider_clients import get_async_openai
+from app.services.llm_context_cache import (
+    StaticLLMContext,
+    get_cached_llm_context,
+    invalidate_llm_contexts,
+    store_llm_context
 )
-from app.services.flow_analyzer import FlowAnalyzer
 from app.schemas import (
     InteractionSessionCreate,
     InteractionSessionUpdate,
@@ -40,7 +53,7 @@ router = APIRouter(prefix="/interaction-sessions", tags=["interaction-sessions"]
 @router.post("/")
 async def create_interaction_session(
     request: Request,
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     """Create a new interaction session - supports anonymous access"""
     try:
@@ -58,9 +71,9 @@ async def create_interaction_session(
         print(f"🔍 Session data object: {session_data}")
         
         # Verify training exists by access code
-        training = db.exec(
+        training = (await db.exec(
             select(Training).where(Training.access_code == session_data.access_code)
-        ).first()
+        )).first()
         
         if not training:
             raise HTTPException(
@@ -74,7 +87,7 @@ async def create_interaction_session(
         # For anonymous users, create a temporary user or use anonymous
         user = None
         if session_data.user_id and session_data.user_id != 'anonymous':
-            user = db.get(User, session_data.user_id)
+            user = await db.get(User, session_data.user_id)
         
         # If user not found or is anonymous, use anonymous user_id
         if not user:
@@ -90,12 +103,12 @@ async def create_interaction_session(
         )
     
     # Check if user already has an active session for this training
-    existing_session = db.exec(
+    existing_session = (await db.exec(
         select(InteractionSession)
         .where(InteractionSession.training_id == session_data.training_id)
         .where(InteractionSession.user_id == session_data.user_id)
         .where(InteractionSession.status == "active")
-    ).first()
+    )).first()
     
     if existing_session:
         # Return existing session instead of creating new one
@@ -126,8 +139,8 @@ async def create_interaction_session(
     )
     
     db.add(new_session)
-    db.commit()
-    db.refresh(new_session)
+    await db.commit()
+    await db.refresh(new_session)
     
     return InteractionSessionResponse.model_validate({
       "id": new_session.id,
@@ -149,13 +162,13 @@ async def create_interaction_session(
 
 
 @router.get("/{session_id}", response_model=InteractionSessionResponse)
-def get_interaction_session(
+async def get_interaction_session(
     session_id: str,
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     """Get interaction session by ID - supports anonymous access"""
     
-    session = db.get(InteractionSession, session_id)
+    session = await db.get(InteractionSession, session_id)
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -166,14 +179,14 @@ def get_interaction_session(
 
 
 @router.put("/{session_id}", response_model=InteractionSessionResponse)
-def update_interaction_session(
+async def update_interaction_session(
     session_id: str,
     session_update: InteractionSessionUpdate,
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     """Update interaction session"""
     
-    session = db.get(InteractionSession, session_id)
+    session = await db.get(InteractionSession, session_id)
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -188,20 +201,20 @@ def update_interaction_session(
     session.last_activity_at = datetime.utcnow()
     
     db.add(session)
-    db.commit()
-    db.refresh(session)
+    await db.commit()
+    await db.refresh(session)
     
     return InteractionSessionResponse.model_validate(session.__dict__)
 
 
 @router.delete("/{session_id}")
-def delete_interaction_session(
+async def delete_interaction_session(
     session_id: str,
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     """Delete interaction session"""
     
-    session = db.get(InteractionSession, session_id)
+    session = await db.get(InteractionSession, session_id)
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -213,20 +226,16 @@ def delete_interaction_session(
     session.updated_at = datetime.utcnow()
     
     db.add(session)
-    db.commit()
+    await db.commit()
+    invalidate_llm_contexts(session_id=session_id)
     
     return {"message": "Session abandoned successfully"}
 
 
 # ===== MESSAGE MANAGEMENT =====
 
-@router.post("/{session_id}/messages", response_model=LLMMessageResponse)
-async def send_message_to_llm(
-    session_id: str,
-    request: Request,
-    db: Session = Depends(get_session)
-):
-    """Send message to LLM and get response"""
+async def _prepare_llm_turn(session_id: str, request: Request, db: AsyncSession):
+    """Parse the message request, resolve the active session and store the user message"""
     
     try:
         # Parse request body
@@ -242,7 +251,7 @@ async def send_message_to_llm(
         )
     
     # Get session
-    session = db.get(InteractionSession, session_id)
+    session = await db.get(InteractionSession, session_id)
     if not session:
         print(f"❌ Session not found: {session_id}")
         # Try to find session by user_id and training_id if session_id is invalid
@@ -250,16 +259,15 @@ async def send_message_to_llm(
             # Parse message request to get additional context
             if hasattr(message_request, 'training_id') and message_request.training_id:
                 print(f"🔍 Trying to find session by training_id: {message_request.training_id}")
-                session = db.exec(
+                session = (await db.exec(
                     select(InteractionSession)
                     .where(InteractionSession.training_id == message_request.training_id)
                     .where(InteractionSession.status == "active")
                     .order_by(InteractionSession.created_at.desc())
-                ).first()
+                )).first()
                 
                 if session:
                     print(f"✅ Found alternative session: {session.id}")
-                    session_id = session.id  # Update session_id
                 else:
                     print(f"❌ No alternative session found")
                     raise HTTPException(
@@ -291,22 +299,27 @@ async def send_message_to_llm(
     }
     
     user_message = InteractionMessage(
-        session_id=session_id,
+        session_id=session.id,
+        section_id=session.current_section_id,
         message=message_request.message,
         message_type=message_request.message_type,
         metadata_json=json.dumps(message_metadata)
     )
     db.add(user_message)
-    db.commit()
-    db.refresh(user_message)
-    
-    # Build LLM context
-    llm_context = build_llm_context(session, db)
+    await db.commit()
+    await db.refresh(user_message)
     
-    # Send to LLM (placeholder - will implement actual LLM integration)
-    start_time = datetime.utcnow()
-    llm_response = call_llm_api(message_request.message, llm_context)
-    processing_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+    return session, message_request
+
+
+async def _save_assistant_message(
+    db: AsyncSession,
+    session: InteractionSession,
+    llm_context: dict,
+    llm_response: dict,
+    processing_time: float
+) -> InteractionMessage:
+    """Persist the assistant reply and bump session activity counters"""
     
     # Save LLM response to database with section metadata
     response_metadata = {
@@ -317,12 +330,13 @@ async def send_message_to_llm(
     }
     
     assistant_message = InteractionMessage(
-        session_id=session_id,
+        session_id=session.id,
+        section_id=session.current_section_id,
         message=llm_response["message"],
         message_type="assistant",
         llm_context_json=json.dumps(llm_context),
         llm_response_json=json.dumps(llm_response),
-        llm_model="gpt-4o",
+        llm_model=LLM_MODEL,
         processing_time_ms=int(processing_time),
         suggestions_json=json.dumps(llm_response.get("suggestions", [])),
         actions_json=json.dumps(llm_response.get("actions", [])),
@@ -336,43 +350,142 @@ async def send_message_to_llm(
     session.updated_at = datetime.utcnow()
     
     db.add(session)
-    db.commit()
-    db.refresh(assistant_message)
+    await db.commit()
+    await db.refresh(assistant_message)
+    
+    return assistant_message
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/{session_id}/messages", response_model=LLMMessageResponse)
+async def send_message_to_llm(
+    session_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_session)
+):
+    """Send message to LLM and get response"""
+    
+    session, message_request = await _prepare_llm_turn(session_id, request, db)
+    
+    # Build LLM context
+    llm_context = await build_llm_context(session, db)
+    
+    start_time = datetime.utcnow()
+    llm_response = await call_llm_api(message_request.message, llm_context)
+    processing_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+    
+    assistant_message = await _save_assistant_message(db, session, llm_context, llm_response, processing_time)
     
     return LLMMessageResponse(
         message=llm_response["message"],
         suggestions=llm_response.get("suggestions", []),
         actions=llm_response.get("actions", []),
-        session_id=session_id,
+        session_id=session.id,
         timestamp=assistant_message.timestamp,
         processing_time_ms=int(processing_time),
         canProceedToNext=llm_response.get("canProceedToNext", False)
     )
 
 
+@router.post("/{session_id}/messages/stream")
+async def stream_message_to_llm(
+    session_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_session)
+):
+    """Send message to LLM and stream the reply as Server-Sent Events.
+    
+    Emits `delta` events ({"content": "..."}) while the model is generating and a
+    final `done` event carrying the same payload as POST /messages. `done` is
+    authoritative: when the final message differs from the concatenated deltas
+    (explicit navigation overrides the reply, or the provider failed mid-stream)
+    a `replace` event ({"content": "..."}) with the full text is sent first.
+    The assistant message is persisted once the stream has completed; a reply
+    cut off by a provider error is not persisted.
+    """
+    
+    session, message_request = await _prepare_llm_turn(session_id, request, db)
+    llm_context = await build_llm_context(session, db)
+    
+    async def event_stream():
+        start_time = datetime.utcnow()
+        chunks: List[str] = []
+        
+        interrupted = False
+        
+        try:
+            async for delta in stream_llm_api(message_request.message, llm_context):
+                chunks.append(delta)
+                yield _sse_event("delta", {"content": delta})
+        except LLMStreamInterrupted:
+            interrupted = True
+        
+        streamed = "".join(chunks)
+        if interrupted:
+            llm_response = dict(LLM_ERROR_RESPONSE)
+        else:
+            llm_response = finalize_llm_response(message_request.message, streamed, llm_context)
+        processing_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+        
+        if llm_response["message"] != streamed:
+            yield _sse_event("replace", {"content": llm_response["message"]})
+        
+        timestamp = datetime.utcnow()
+        if not interrupted:
+            # The request-scoped session is already closed once streaming starts,
+            # so the reply is stored through a session owned by the stream itself
+            try:
+                async with async_session_maker() as stream_db:
+                    stream_session = await stream_db.get(InteractionSession, session.id)
+                    assistant_message = await _save_assistant_message(
+                        stream_db, stream_session, llm_context, llm_response, processing_time
+                    )
+                    timestamp = assistant_message.timestamp
+            except Exception as e:
+                print(f"❌ Error saving streamed assistant message: {e}")
+        
+        final = LLMMessageResponse(
+            message=llm_response["message"],
+            suggestions=llm_response.get("suggestions", []),
+            actions=llm_response.get("actions", []),
+            session_id=session.id,
+            timestamp=timestamp,
+            processing_time_ms=int(processing_time),
+            canProceedToNext=llm_response.get("canProceedToNext", False)
+        )
+        yield _sse_event("done", final.model_dump(mode="json"))
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/{session_id}/messages", response_model=List[InteractionMessageResponse])
-def get_session_messages(
+async def get_session_messages(
     session_id: str,
-    limit: int = 50,
-    offset: int = 0,
-    db: Session = Depends(get_session)
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_session)
 ):
-    """Get messages for a session"""
+    """Get messages for a session, oldest first (next page cursor in X-Next-Cursor)"""
     
-    session = db.get(InteractionSession, session_id)
+    session = await db.get(InteractionSession, session_id)
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Session not found"
         )
     
-    messages = db.exec(
-        select(InteractionMessage)
-        .where(InteractionMessage.session_id == session_id)
-        .order_by(InteractionMessage.timestamp.asc())  # En eski mesajlar önce
-        .offset(offset)
-        .limit(limit)
-    ).all()
+    query = select(InteractionMessage).where(InteractionMessage.session_id == session_id)
+    # En eski mesajlar önce
+    query = keyset_page(query, InteractionMessage.timestamp, InteractionMessage.id, after, limit, ascending=True)
+    messages = finish_page((await db.exec(query)).all(), limit, response, timestamp_field="timestamp")
     
     return [InteractionMessageResponse.model_validate(msg.__dict__) for msg in messages]
 
@@ -380,13 +493,13 @@ def get_session_messages(
 # ===== PROGRESS MANAGEMENT =====
 
 @router.get("/{session_id}/progress", response_model=TrainingProgressResponse)
-def get_training_progress(
+async def get_training_progress(
     session_id: str,
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     """Get training progress for a session"""
     
-    session = db.get(InteractionSession, session_id)
+    session = await db.get(InteractionSession, session_id)
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -394,35 +507,55 @@ def get_training_progress(
         )
     
     # Get all sections for this training
-    sections = db.exec(
+    sections = (await db.exec(
         select(TrainingSection)
         .where(TrainingSection.training_id == session.training_id)
         .order_by(TrainingSection.order_index)
-    ).all()
+    )).all()
+    
+    # Get progress for each section; missing rows are created in one INSERT ... ON CONFLICT
+    progress_by_section = {
+        progress.section_id: progress
+        for progress in (await db.exec(
+            select(SectionProgress).where(SectionProgress.session_id == session_id)
+        )).all()
+    }
+    missing_sections = [section.id for section in sections if section.id not in progress_by_section]
+    if missing_sections:
+        now = datetime.utcnow()
+        created = (await db.execute(
+            pg_insert(SectionProgress)
+            .values([
+                {
+                    "id": gen_uuid(),
+                    "session_id": session_id,
+                    "section_id": section_id,
+                    "user_id": session.user_id,
+                    "status": "not_started",
+                    "last_accessed_at": now
+                }
+                for section_id in missing_sections
+            ])
+            .on_conflict_do_nothing(index_elements=["session_id", "section_id"])
+            .returning(SectionProgress)
+        )).scalars().all()
+        await db.commit()
+        for progress in created:
+            progress_by_section[progress.section_id] = progress
+        if len(created) < len(missing_sections):
+            # Created concurrently by another request
+            for progress in (await db.exec(
+                select(SectionProgress)
+                .where(SectionProgress.session_id == session_id)
+                .where(SectionProgress.section_id.in_(missing_sections))
+            )).all():
+                progress_by_section.setdefault(progress.section_id, progress)
     
-    # Get progress for each section
     sections_progress = []
     completed_count = 0
     
     for section in sections:
-        progress = db.exec(
-            select(SectionProgress)
-            .where(SectionProgress.session_id == session_id)
-            .where(SectionProgress.section_id == section.id)
-        ).first()
-        
-        if not progress:
-            # Create default progress
-            progress = SectionProgress(
-                session_id=session_id,
-                section_id=section.id,
-                user_id=session.user_id,
-                status="not_started"
-            )
-            db.add(progress)
-            db.commit()
-            db.refresh(progress)
-        
+        progress = progress_by_section[section.id]
         sections_progress.append(SectionProgressResponse.model_validate(progress.__dict__))
         
         if progress.status == "completed":
@@ -450,7 +583,7 @@ async def update_section_progress(
     session_id: str,
     section_id: str,
     request: Request,
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     """Update progress for a specific section"""
     
@@ -468,59 +601,56 @@ async def update_section_progress(
         )
     
     # Verify session exists
-    session = db.get(InteractionSession, session_id)
+    session = await db.get(InteractionSession, session_id)
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Session not found"
         )
     
-    # Get or create section progress
-    progress = db.exec(
-        select(SectionProgress)
-        .where(SectionProgress.session_id == session_id)
-        .where(SectionProgress.section_id == section_id)
-    ).first()
-    
-    if not progress:
-        progress = SectionProgress(
+    # Create or update section progress in a single INSERT ... ON CONFLICT ... RETURNING
+    changes = progress_update.model_dump(exclude_unset=True)
+    changes["last_accessed_at"] = datetime.utcnow()
+    progress = (await db.execute(
+        pg_insert(SectionProgress)
+        .values(
+            id=gen_uuid(),
             session_id=session_id,
             section_id=section_id,
-            user_id=session.user_id
+            user_id=session.user_id,
+            **changes
         )
-        db.add(progress)
-    
-    # Update progress
-    for field, value in progress_update.model_dump(exclude_unset=True).items():
-        setattr(progress, field, value)
-    
-    progress.last_accessed_at = datetime.utcnow()
-    
-    db.add(progress)
-    db.commit()
-    db.refresh(progress)
+        .on_conflict_do_update(
+            index_elements=["session_id", "section_id"],
+            set_=changes
+        )
+        .returning(SectionProgress)
+        .execution_options(populate_existing=True)
+    )).scalar_one()
+    await db.commit()
     
     return SectionProgressResponse.model_validate(progress.__dict__)
 
 
 @router.get("/{session_id}/flow-analysis")
-def get_flow_analysis(
+async def get_flow_analysis(
     session_id: str,
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     """Get flow analysis for current session - supports anonymous access"""
     
     # Verify session exists
-    session = db.get(InteractionSession, session_id)
+    session = await db.get(InteractionSession, session_id)
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Session not found"
         )
     
-    # Get flow analysis
-    flow_analyzer = FlowAnalyzer(db)
-    flow_analysis = flow_analyzer.analyze_flow(session.training_id, session_id)
+    # Get flow analysis (FlowAnalyzer is sync; run it on the session's sync facade)
+    flow_analysis = await db.run_sync(
+        lambda sync_db: FlowAnalyzer(sync_db).analyze_flow(session.training_id, session_id)
+    )
     
     return flow_analysis
 
@@ -528,15 +658,15 @@ def get_flow_analysis(
 # ===== SECTION CHAT HISTORY MANAGEMENT =====
 
 @router.get("/{session_id}/sections/{section_id}/chat-history")
-def get_section_chat_history(
+async def get_section_chat_history(
     session_id: str,
     section_id: str,
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     """Get chat history for a specific section"""
     
     # Verify session exists
-    session = db.get(InteractionSession, session_id)
+    session = await db.get(InteractionSession, session_id)
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -544,12 +674,12 @@ def get_section_chat_history(
         )
     
     # Get section-specific messages
-    messages = db.exec(
+    messages = (await db.exec(
         select(InteractionMessage)
         .where(InteractionMessage.session_id == session_id)
-        .where(InteractionMessage.metadata_json.contains(f'"section_id":"{section_id}"'))
+        .where(InteractionMessage.section_id == section_id)
         .order_by(InteractionMessage.timestamp.asc())
-    ).all()
+    )).all()
     
     # Convert to chat format
     chat_messages = []
@@ -576,7 +706,7 @@ async def save_section_chat_history(
     session_id: str,
     section_id: str,
     request: Request,
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     """Save chat history for a specific section"""
     
@@ -587,7 +717,7 @@ async def save_section_chat_history(
         messages = data.get('messages', [])
         
         # Verify session exists
-        session = db.get(InteractionSession, session_id)
+        session = await db.get(InteractionSession, session_id)
         if not session:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -595,14 +725,14 @@ async def save_section_chat_history(
             )
         
         # Clear existing section messages
-        existing_messages = db.exec(
+        existing_messages = (await db.exec(
             select(InteractionMessage)
             .where(InteractionMessage.session_id == session_id)
-            .where(InteractionMessage.metadata_json.contains(f'"section_id":"{section_id}"'))
-        ).all()
+            .where(InteractionMessage.section_id == section_id)
+        )).all()
         
         for msg in existing_messages:
-            db.delete(msg)
+            await db.delete(msg)
         
         # Save new messages
         for msg_data in messages:
@@ -614,6 +744,7 @@ async def save_section_chat_history(
             
             message = InteractionMessage(
                 session_id=session_id,
+                section_id=section_id,
                 message=msg_data.get('content', ''),
                 message_type=msg_data.get('type', 'user'),
                 suggestions_json=json.dumps(msg_data.get('suggestions', [])),
@@ -622,7 +753,7 @@ async def save_section_chat_history(
             
             db.add(message)
         
-        db.commit()
+        await db.commit()
         
         return {
             "success": True,
@@ -639,41 +770,91 @@ async def save_section_chat_history(
 
 # ===== HELPER FUNCTIONS =====
 
-def build_llm_context(session: InteractionSession, db: Session) -> dict:
-    """Build comprehensive LLM context from session data with flow analysis"""
+async def load_static_llm_context(session: InteractionSession, db: AsyncSession) -> StaticLLMContext:
+    """Training, sections, avatar and compiled flow for a session, cached per content version"""
+    
+    # Versiyon DB'den okunur: başka bir worker'daki düzenlemeler de bir sonraki turda görünür
+    version_row = (await db.exec(
+        select(Training.content_version, Avatar.updated_at)
+        .outerjoin(Avatar, Avatar.id == Training.avatar_id)
+        .where(Training.id == session.training_id)
+    )).first()
+    version = tuple(version_row) if version_row is not None else ()
+    
+    cached = get_cached_llm_context(session.id, session.training_id, version)
+    if cached is not None:
+        return cached
     
     # Get training and sections
-    training = db.get(Training, session.training_id)
-    sections = db.exec(
+    training = await db.get(Training, session.training_id)
+    sections = (await db.exec(
         select(TrainingSection)
         .where(TrainingSection.training_id == session.training_id)
         .order_by(TrainingSection.order_index)
-    ).all()
+    )).all()
     
     # Get training avatar for voice_id and personality
     training_avatar = None
     if training and training.avatar_id:
-        from app.models import Avatar
-        training_avatar = db.get(Avatar, training.avatar_id)
+        training_avatar = await db.get(Avatar, training.avatar_id)
+    
+    static_context = StaticLLMContext(
+        training={
+            "id": training.id if training else None,
+            "title": training.title if training else "Unknown Training",
+            "description": training.description if training else None,
+            "ai_flow": training.ai_flow if training else None
+        },
+        avatar={
+            "id": training_avatar.id if training_avatar else None,
+            "name": training_avatar.name if training_avatar else "Asistan",
+            "personality": training_avatar.personality if training_avatar else None,
+            "elevenlabs_voice_id": training_avatar.elevenlabs_voice_id if training_avatar else None,
+            "description": training_avatar.description if training_avatar else None
+        },
+        sections=[
+            {
+                "id": section.id,
+                "title": section.title,
+                "type": section.type,
+                "order_index": section.order_index,
+                "description": section.description,
+                "script": section.script,
+                "duration": section.duration
+            }
+            for section in sections
+        ],
+        flow=compile_training_flow(training),
+        avatar_id=training_avatar.id if training_avatar else None
+    )
+    store_llm_context(session.id, session.training_id, version, static_context)
+    return static_context
+
+
+async def build_llm_context(session: InteractionSession, db: AsyncSession) -> dict:
+    """Build comprehensive LLM context from session data with flow analysis"""
+    
+    static_context = await load_static_llm_context(session, db)
     
     # Get recent messages for current section only
-    recent_messages = db.exec(
+    recent_messages = (await db.exec(
         select(InteractionMessage)
         .where(InteractionMessage.session_id == session.id)
-        .where(InteractionMessage.metadata_json.contains(f'"section_id":"{session.current_section_id}"'))
+        .where(InteractionMessage.section_id == session.current_section_id)
         .order_by(InteractionMessage.timestamp.asc())  # En eski mesajlar önce
         .limit(10)
-    ).all()
+    )).all()
     
     # Get current section
     current_section = None
     if session.current_section_id:
-        current_section = db.get(TrainingSection, session.current_section_id)
+        current_section = static_context.sections_by_id.get(session.current_section_id)
     
     # Flow analyzer ile flow-aware context oluştur
-    flow_analyzer = FlowAnalyzer(db)
     try:
-        flow_analysis = flow_analyzer.analyze_flow(session.training_id, session.id)
+        flow_analysis = await db.run_sync(
+            lambda sync_db: FlowAnalyzer(sync_db).analyze_session_flow(static_context.flow, session)
+        )
         print(f"🔍 Flow analysis result: {type(flow_analysis)} - {flow_analysis is not None}")
     except Exception as e:
         print(f"❌ Error in flow analysis: {e}")
@@ -689,37 +870,15 @@ def build_llm_context(session: InteractionSession, db: Session) -> dict:
             "interactions_count": session.interactions_count,
             "completion_percentage": session.completion_percentage
         },
-        "training": {
-            "id": training.id if training else None,
-            "title": training.title if training else "Unknown Training",
-            "description": training.description if training else None,
-            "ai_flow": training.ai_flow if training else None
-        },
-        "avatar": {
-            "id": training_avatar.id if training_avatar else None,
-            "name": training_avatar.name if training_avatar else "Asistan",
-            "personality": training_avatar.personality if training_avatar else None,
-            "elevenlabs_voice_id": training_avatar.elevenlabs_voice_id if training_avatar else None,
-            "description": training_avatar.description if training_avatar else None
-        },
-        "sections": [
-            {
-                "id": section.id,
-                "title": section.title,
-                "type": section.type,
-                "order_index": section.order_index,
-                "description": section.description,
-                "script": section.script,
-                "duration": section.duration
-            }
-            for section in sections
-        ],
+        "training": static_context.training,
+        "avatar": static_context.avatar,
+        "sections": static_context.sections,
         "current_section": {
-            "id": current_section.id if current_section else None,
-            "title": current_section.title if current_section else None,
-            "type": current_section.type if current_section else None,
-            "description": current_section.description if current_section else None,
-            "script": current_section.script if current_section else None
+            "id": current_section["id"],
+            "title": current_section["title"],
+            "type": current_section["type"],
+            "description": current_section["description"],
+            "script": current_section["script"]
         } if current_section else None,
         "recent_messages": [
             {
@@ -735,172 +894,230 @@ def build_llm_context(session: InteractionSession, db: Session) -> dict:
     return context
 
 
-def call_llm_api(message: str, context: dict) -> dict:
-    """Call real LLM API with message and comprehensive context"""
-    
-    import openai
-    import os
+LLM_MODEL = "gpt-4o-mini"  # Daha hızlı ve ucuz model
+
+LLM_UNAVAILABLE_RESPONSE = {
+    "message": "Üzgünüm, şu anda AI servisi kullanılamıyor. Lütfen daha sonra tekrar deneyin.",
+    "suggestions": ["Tekrar denemek istiyorum", "Manuel olarak devam etmek istiyorum"],
+    "actions": []
+}
+
+LLM_ERROR_RESPONSE = {
+    "message": "Üzgünüm, bir hata oluştu. Lütfen tekrar deneyin.",
+    "suggestions": ["Tekrar denemek istiyorum"],
+    "actions": [],
+    "canProceedToNext": False
+}
+
+
+def get_async_llm_client():
+    """Return the shared AsyncOpenAI client, or None when no API key is configured"""
     
-    # OpenAI API key'ini al
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+    client = get_async_openai()
+    if client is None:
         print("❌ OpenAI API key not found")
-        return {
-            "message": "Üzgünüm, şu anda AI servisi kullanılamıyor. Lütfen daha sonra tekrar deneyin.",
-            "suggestions": ["Tekrar denemek istiyorum", "Manuel olarak devam etmek istiyorum"],
-            "actions": []
-        }
+    return client
+
+
+def build_llm_messages(message: str, context: dict) -> list:
+    """Build the chat completion message list from context and the user message"""
     
-    try:
-        # Context'i sistem prompt'una dönüştür
-        print(f"🔍 Context type: {type(context)} - {context is not None}")
-        print(f"🔍 Context keys: {list(context.keys()) if context else 'None'}")
-        system_prompt = build_system_prompt(context)
-        
-        # OpenAI API çağrısı
-        client = openai.OpenAI(api_key=api_key)
-        
-        # Konuşma geçmişini hazırla
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Konuşma geçmişini ekle
-        recent_messages = context.get('recent_messages', [])
-        for msg in recent_messages:
-            if msg and isinstance(msg, dict):
-                role = "user" if msg.get('message_type') == 'user' else "assistant"
-                messages.append({
-                    "role": role,
-                    "content": msg.get('message', '')
-                })
-        
-        # Mevcut kullanıcı mesajını ekle - overlay response kontrolü
-        if message.startswith('[OVERLAY_RESPONSE]'):
-            # Overlay response mesajı - kullanıcı overlay sorusuna cevap verdi
-            overlay_response = message.replace('[OVERLAY_RESPONSE]', '').strip()
-            messages.append({"role": "user", "content": overlay_response})
-        elif message.startswith('[LLM_INTERACTION_OVERLAY]'):
-            # LLM interaction overlay mesajı - özel işlem
-            overlay_message = message.replace('[LLM_INTERACTION_OVERLAY]', '').strip()
-            messages.append({"role": "user", "content": f"Overlay'den gelen soru: {overlay_message}"})
+    # Context'i sistem prompt'una dönüştür
+    print(f"🔍 Context type: {type(context)} - {context is not None}")
+    print(f"🔍 Context keys: {list(context.keys()) if context else 'None'}")
+    system_prompt = build_system_prompt(context)
+    
+    # Konuşma geçmişini hazırla
+    messages = [{"role": "system", "content": system_prompt}]
+
+    # Konuşma geçmişini ekle
+    recent_messages = context.get('recent_messages', [])
+    for msg in recent_messages:
+        if msg and isinstance(msg, dict):
+            role = "user" if msg.get('message_type') == 'user' else "assistant"
+            messages.append({
+                "role": role,
+                "content": msg.get('message', '')
+            })
+
+    # Mevcut kullanıcı mesajını ekle - overlay response kontrolü
+    if message.startswith('[OVERLAY_RESPONSE]'):
+        # Overlay response mesajı - kullanıcı overlay sorusuna cevap verdi
+        overlay_response = message.replace('[OVERLAY_RESPONSE]', '').strip()
+        messages.append({"role": "user", "content": overlay_response})
+    elif message.startswith('[LLM_INTERACTION_OVERLAY]'):
+        # LLM interaction overlay mesajı - özel işlem
+        overlay_message = message.replace('[LLM_INTERACTION_OVERLAY]', '').strip()
+        messages.append({"role": "user", "content": f"Overlay'den gelen soru: {overlay_message}"})
+    else:
+        messages.append({"role": "user", "content": message})
+
+    print(f"🔍 Sending {len(messages)} messages to LLM")
+    return messages
+
+
+def finalize_llm_response(message: str, llm_message: str, context: dict) -> dict:
+    """Derive suggestions, actions and navigation state from the completed LLM reply"""
+    
+    # Basit suggestion'lar oluştur
+    suggestions = [
+        "Daha fazla bilgi almak istiyorum",
+        "Bu konuyu tekrar etmek istiyorum"
+    ]
+
+    # Flow analysis'dan suggestion ekle
+    flow_analysis = context.get('flow_analysis', {})
+    print(f"🔍 Flow analysis in finalize_llm_response: {type(flow_analysis)} - {flow_analysis is not None}")
+    if flow_analysis and isinstance(flow_analysis, dict):
+        recommendations = flow_analysis.get('recommendations', {})
+        suggested_action = recommendations.get('suggested_next_action', '') if recommendations else ''
+    else:
+        suggested_action = ''
+
+    if suggested_action and suggested_action != "complete_training":
+        suggestions.append("Sonraki bölüme geçmek istiyorum")
+
+    # Determine if user can proceed to next section - section tipine göre farklı davranış
+    canProceedToNext = False
+    current_section = context.get('current_section')
+    section_type = current_section.get('type', '') if current_section else ''
+
+    # Sadece llm_interaction ve llm_agent section'lar için navigation kontrolü
+    if current_section and section_type in ['llm_interaction', 'llm_agent']:
+        # Check if user explicitly requested to proceed to next section
+        user_message_lower = message.lower()
+        explicit_navigation_keywords = ["sonraki bölüm", "next section", "devam et", "geç", "tamamlandı", "sonraki", "devam", "ilerle", "next"]
+        if any(keyword in user_message_lower for keyword in explicit_navigation_keywords):
+            canProceedToNext = True
+            print(f"✅ User explicitly requested to proceed to next section: '{message}'")
+            # Override LLM response for explicit navigation requests
+            llm_message = "Anladım! Beklentilerinizi öğrendim. Sonraki bölüme geçebilirsiniz."
+            suggestions = ["Sonraki bölüme geçmek istiyorum"]
         else:
-            messages.append({"role": "user", "content": message})
-        
-        print(f"🔍 Sending {len(messages)} messages to LLM")
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # Daha hızlı ve ucuz model
-            messages=messages,
+            # Check if tasks are completed based on interaction count and content
+            recent_messages = context.get('recent_messages', [])
+            user_messages = [msg for msg in recent_messages if msg and isinstance(msg, dict) and msg.get('message_type') == 'user']
+
+            # Check if user indicated completion with more comprehensive keywords
+            completion_keywords = [
+                "başka yok", "yeterli", "tamamlandı", "bitti", "hazırım", "devam", "tamam", 
+                "anladım", "öğrendim", "kavradım", "bitirdim", "tamam", "ok", "iyi", 
+                "memnunum", "sorun yok", "anlaşıldı", "tamamlandı", "hazır", "ready"
+            ]
+            if any(keyword in user_message_lower for keyword in completion_keywords):
+                canProceedToNext = True
+                print(f"✅ User indicated completion: '{message}'")
+
+            # For LLM interaction sections, be more lenient - allow proceeding after 2 meaningful interactions
+            elif len(user_messages) >= 2:
+                canProceedToNext = True
+                print(f"✅ Sufficient interactions completed ({len(user_messages)} user messages)")
+
+            # Check if LLM response indicates completion or satisfaction
+            elif any(completion_indicator in llm_message.lower() for completion_indicator in [
+                "anladınız", "öğrendiniz", "kavradınız", "memnun", "başarılı", "tamamlandı", 
+                "hazır", "devam edebilir", "sonraki", "ilerleyebilir"
+            ]):
+                canProceedToNext = True
+                print(f"✅ LLM response indicates completion: '{llm_message}'")
+
+            # Check if section script mentions specific tasks and they seem completed
+            section_script = current_section.get('script', '')
+            if section_script and any(task_keyword in llm_message.lower() for task_keyword in ["tamamlandı", "anladım", "öğrendim", "hazırım", "devam"]):
+                canProceedToNext = True
+                print(f"✅ Section tasks appear to be completed based on script")
+
+    # Video section'lar için navigation kontrolü YOK - sadece video ile ilgili soruları yanıtla
+    elif section_type == 'video':
+        print(f"🎥 Video section - navigation kontrolü yapılmıyor, sadece video ile ilgili sorular yanıtlanıyor")
+
+    # LLM'in navigation action'ları gönderebilmesi için actions ekle
+    actions = []
+
+    # REMOVED: Automatic navigation action generation for video sections
+    # Video sections should not automatically navigate based on chat content
+    # Navigation should only be triggered explicitly by user clicking navigation buttons
+    # 
+    # if "sonraki bölüm" in llm_message.lower() or "next section" in llm_message.lower():
+    #     actions.append({
+    #         "type": "navigate_next",
+    #         "target": "next_section"
+    #     })
+    # elif "önceki bölüm" in llm_message.lower() or "previous section" in llm_message.lower():
+    #     actions.append({
+    #         "type": "navigate_previous", 
+    #         "target": "previous_section"
+    #     })
+
+    return {
+        "message": llm_message,
+        "suggestions": suggestions,
+        "actions": actions,
+        "canProceedToNext": canProceedToNext
+    }
+
+
+async def call_llm_api(message: str, context: dict) -> dict:
+    """Call real LLM API with message and comprehensive context"""
+    
+    client = get_async_llm_client()
+    if client is None:
+        return dict(LLM_UNAVAILABLE_RESPONSE)
+    
+    try:
+        response = await client.chat.completions.create(
+            model=LLM_MODEL,
+            messages=build_llm_messages(message, context),
             temperature=0.7,
             max_tokens=500
         )
         
         llm_message = response.choices[0].message.content
-        
-        # Basit suggestion'lar oluştur
-        suggestions = [
-            "Daha fazla bilgi almak istiyorum",
-            "Bu konuyu tekrar etmek istiyorum"
-        ]
-        
-        # Flow analysis'dan suggestion ekle
-        flow_analysis = context.get('flow_analysis', {})
-        print(f"🔍 Flow analysis in call_llm_api: {type(flow_analysis)} - {flow_analysis is not None}")
-        if flow_analysis and isinstance(flow_analysis, dict):
-            recommendations = flow_analysis.get('recommendations', {})
-            suggested_action = recommendations.get('suggested_next_action', '') if recommendations else ''
-        else:
-            suggested_action = ''
-        
-        if suggested_action and suggested_action != "complete_training":
-            suggestions.append("Sonraki bölüme geçmek istiyorum")
-        
-        # Determine if user can proceed to next section - section tipine göre farklı davranış
-        canProceedToNext = False
-        current_section = context.get('current_section')
-        section_type = current_section.get('type', '') if current_section else ''
-        
-        # Sadece llm_interaction ve llm_agent section'lar için navigation kontrolü
-        if current_section and section_type in ['llm_interaction', 'llm_agent']:
-            # Check if user explicitly requested to proceed to next section
-            user_message_lower = message.lower()
-            explicit_navigation_keywords = ["sonraki bölüm", "next section", "devam et", "geç", "tamamlandı", "sonraki", "devam", "ilerle", "next"]
-            if any(keyword in user_message_lower for keyword in explicit_navigation_keywords):
-                canProceedToNext = True
-                print(f"✅ User explicitly requested to proceed to next section: '{message}'")
-                # Override LLM response for explicit navigation requests
-                llm_message = "Anladım! Beklentilerinizi öğrendim. Sonraki bölüme geçebilirsiniz."
-                suggestions = ["Sonraki bölüme geçmek istiyorum"]
-            else:
-                # Check if tasks are completed based on interaction count and content
-                recent_messages = context.get('recent_messages', [])
-                user_messages = [msg for msg in recent_messages if msg and isinstance(msg, dict) and msg.get('message_type') == 'user']
-                
-                # Check if user indicated completion with more comprehensive keywords
-                completion_keywords = [
-                    "başka yok", "yeterli", "tamamlandı", "bitti", "hazırım", "devam", "tamam", 
-                    "anladım", "öğrendim", "kavradım", "bitirdim", "tamam", "ok", "iyi", 
-                    "memnunum", "sorun yok", "anlaşıldı", "tamamlandı", "hazır", "ready"
-                ]
-                if any(keyword in user_message_lower for keyword in completion_keywords):
-                    canProceedToNext = True
-                    print(f"✅ User indicated completion: '{message}'")
-                
-                # For LLM interaction sections, be more lenient - allow proceeding after 2 meaningful interactions
-                elif len(user_messages) >= 2:
-                    canProceedToNext = True
-                    print(f"✅ Sufficient interactions completed ({len(user_messages)} user messages)")
-                
-                # Check if LLM response indicates completion or satisfaction
-                elif any(completion_indicator in llm_message.lower() for completion_indicator in [
-                    "anladınız", "öğrendiniz", "kavradınız", "memnun", "başarılı", "tamamlandı", 
-                    "hazır", "devam edebilir", "sonraki", "ilerleyebilir"
-                ]):
-                    canProceedToNext = True
-                    print(f"✅ LLM response indicates completion: '{llm_message}'")
-                
-                # Check if section script mentions specific tasks and they seem completed
-                section_script = current_section.get('script', '')
-                if section_script and any(task_keyword in llm_message.lower() for task_keyword in ["tamamlandı", "anladım", "öğrendim", "hazırım", "devam"]):
-                    canProceedToNext = True
-                    print(f"✅ Section tasks appear to be completed based on script")
-        
-        # Video section'lar için navigation kontrolü YOK - sadece video ile ilgili soruları yanıtla
-        elif section_type == 'video':
-            print(f"🎥 Video section - navigation kontrolü yapılmıyor, sadece video ile ilgili sorular yanıtlanıyor")
-        
-        # LLM'in navigation action'ları gönderebilmesi için actions ekle
-        actions = []
-        
-        # REMOVED: Automatic navigation action generation for video sections
-        # Video sections should not automatically navigate based on chat content
-        # Navigation should only be triggered explicitly by user clicking navigation buttons
-        # 
-        # if "sonraki bölüm" in llm_message.lower() or "next section" in llm_message.lower():
-        #     actions.append({
-        #         "type": "navigate_next",
-        #         "target": "next_section"
-        #     })
-        # elif "önceki bölüm" in llm_message.lower() or "previous section" in llm_message.lower():
-        #     actions.append({
-        #         "type": "navigate_previous", 
-        #         "target": "previous_section"
-        #     })
-        
-        return {
-            "message": llm_message,
-            "suggestions": suggestions,
-            "actions": actions,
-            "canProceedToNext": canProceedToNext
-        }
+        return finalize_llm_response(message, llm_message, context)
         
     except Exception as e:
         print(f"❌ OpenAI API error: {e}")
-        return {
-            "message": "Üzgünüm, bir hata oluştu. Lütfen tekrar deneyin.",
-            "suggestions": ["Tekrar denemek istiyorum"],
-            "actions": [],
-            "canProceedToNext": False
-        }
+        return dict(LLM_ERROR_RESPONSE)
+
+
+class LLMStreamInterrupted(Exception):
+    """The provider failed after part of the reply had already been streamed"""
+
+
+async def stream_llm_api(message: str, context: dict):
+    """Stream the LLM reply token by token; yields text deltas.
+    
+    On a missing key or an API error before the first token the fallback message is
+    yielded instead. An error after tokens were yielded raises LLMStreamInterrupted,
+    since the deltas so far are not a complete reply.
+    """
+    
+    client = get_async_llm_client()
+    if client is None:
+        yield LLM_UNAVAILABLE_RESPONSE["message"]
+        return
+    
+    emitted = False
+    try:
+        stream = await client.chat.completions.create(
+            model=LLM_MODEL,
+            messages=build_llm_messages(message, context),
+            temperature=0.7,
+            max_tokens=500,
+            stream=True
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                emitted = True
+                yield delta
+    except Exception as e:
+        print(f"❌ OpenAI streaming error: {e}")
+        if emitted:
+            raise LLMStreamInterrupted(str(e)) from e
+        yield LLM_ERROR_RESPONSE["message"]
 
 
 def build_system_prompt(context: dict) -> str:
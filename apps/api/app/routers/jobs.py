@@ -0,0 +1,75 @@
+import asyncio
+import json
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+
+from ..db import async_session_maker, get_session
+from ..models import Job, User
+from ..auth import get_current_user, is_admin
+from ..services.jobs import TERMINAL_STATUSES, job_status
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+JOB_EVENTS_POLL_INTERVAL = float(os.getenv("JOB_EVENTS_POLL_INTERVAL", "1"))
+
+
+def _check_job_access(current_user: User, job: Job) -> None:
+    # Sahipsiz job'lar (ör. eski kayıtlar) yalnızca admin'e açık
+    if job.user_id != current_user.id and not is_admin(current_user):
+        raise HTTPException(403, "Access denied")
+
+
+@router.get("/{job_id}", operation_id="get_job")
+def get_job(
+    job_id: str,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Job durumu, ilerlemesi ve (bittiyse) sonucu"""
+    job = session.get(Job, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    _check_job_access(current_user, job)
+    return job_status(job)
+
+
+@router.get("/{job_id}/events", operation_id="stream_job_events")
+async def stream_job_events(
+    job_id: str,
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    """Server-Sent Events: job her değiştiğinde bir `progress` olayı, bitince `done` olayı"""
+    async with async_session_maker() as db:
+        job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    _check_job_access(current_user, job)
+
+    async def events():
+        last_payload = None
+        while not await request.is_disconnected():
+            async with async_session_maker() as db:
+                current = await db.get(Job, job_id)
+            if current is None:
+                yield f"event: error\ndata: {json.dumps({'detail': 'Job not found'})}\n\n"
+                return
+
+            payload = json.dumps(jsonable_encoder(job_status(current)), ensure_ascii=False)
+            finished = current.status in TERMINAL_STATUSES
+            if payload != last_payload:
+                yield f"event: {'done' if finished else 'progress'}\ndata: {payload}\n\n"
+                last_payload = payload
+            if finished:
+                return
+            await asyncio.sleep(JOB_EVENTS_POLL_INTERVAL)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,7 +1,6 @@
 import json
 import logging
 import asyncio
-import httpx
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, WebSocket, HTTPException, Depends, BackgroundTasks
@@ -9,6 +8,8 @@ from sqlmodel import Session, select
 from app.db import get_session
 from app.models import Training, TrainingSection, User, Session as DBSession, UserInteraction, ChatMessage
 from app.auth import get_current_user
+from app.services.provider_clients import get_async_http_client
+from app.services.telemetry_buffer import record_telemetry
 import os
 
 router = APIRouter()
@@ -57,18 +58,18 @@ class ElevenLabsRealtimeClient:
             }
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/realtime/sessions",
-                headers=headers,
-                json=payload
-            )
+        client = get_async_http_client("elevenlabs")
+        response = await client.post(
+            f"{self.base_url}/realtime/sessions",
+            headers=headers,
+            json=payload
+        )
+        
+        if response.status_code != 200:
+            logger.error(f"ElevenLabs session creation failed: {response.text}")
+            raise HTTPException(status_code=500, detail="Failed to create ElevenLabs session")
             
-            if response.status_code != 200:
-                logger.error(f"ElevenLabs session creation failed: {response.text}")
-                raise HTTPException(status_code=500, detail="Failed to create ElevenLabs session")
-                
-            return response.json()
+        return response.json()
     
     async def get_session_token(self, session_id: str):
         """Get WebSocket token for ElevenLabs session"""
@@ -85,17 +86,17 @@ class ElevenLabsRealtimeClient:
             "Content-Type": "application/json"
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/realtime/sessions/{session_id}/token",
-                headers=headers
-            )
+        client = get_async_http_client("elevenlabs")
+        response = await client.post(
+            f"{self.base_url}/realtime/sessions/{session_id}/token",
+            headers=headers
+        )
+        
+        if response.status_code != 200:
+            logger.error(f"ElevenLabs token creation failed: {response.text}")
+            raise HTTPException(status_code=500, detail="Failed to get ElevenLabs token")
             
-            if response.status_code != 200:
-                logger.error(f"ElevenLabs token creation failed: {response.text}")
-                raise HTTPException(status_code=500, detail="Failed to get ElevenLabs token")
-                
-            return response.json()
+        return response.json()
 
 @router.websocket("/ws/llm-agent/{training_id}/{section_id}")
 async def llm_agent_websocket(
@@ -402,8 +403,7 @@ async def start_llm_agent_session(
             content=f"Started LLM Agent session for section: {section.title}",
             success=True
         )
-        session.add(interaction)
-        session.commit()
+        await record_telemetry([interaction])
         logger.info("✅ Interaction logged")
         
         # Check ElevenLabs API key
@@ -452,6 +452,7 @@ async def end_llm_agent_session(
         # Update session status
         user_session.status = "completed"
         session.add(user_session)
+        session.commit()
         
         # Log the interaction
         interaction = UserInteraction(
@@ -462,8 +463,7 @@ async def end_llm_agent_session(
             content="Ended LLM Agent session",
             success=True
         )
-        session.add(interaction)
-        session.commit()
+        await record_telemetry([interaction])
         
         return {"success": True, "message": "Session ended successfully"}
         
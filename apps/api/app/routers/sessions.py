@@ -4,6 +4,7 @@ from pydantic import BaseModel
 from sqlmodel import Session, select
 from ..db import get_session
 from ..models import Session as DbSession, InteractionLog
+from ..services.telemetry_buffer import UnknownSessionError, enqueue_records_sync, require_known_sessions_sync
 
 
 class CreateSessionRequest(BaseModel):
@@ -42,6 +43,11 @@ def add_log(session_id: str, payload: LogEventRequest, session: Session = Depend
     if not dbs:
         raise HTTPException(status_code=404, detail="Session not found")
     log = InteractionLog(session_id=dbs.id, event=payload.event, data_json=str(payload.data_json or {}))
-    session.add(log)
-    session.commit()
+    try:
+        require_known_sessions_sync(session, [log])
+    except UnknownSessionError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if not enqueue_records_sync([log]):
+        session.add(log)
+        session.commit()
     return {"ok": True}
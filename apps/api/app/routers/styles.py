@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
 from datetime import datetime
 
-from ..db import get_session
+from ..db import get_async_session
 from ..models import Style, User
 from ..schemas import StyleCreate, StyleUpdate, StyleResponse
 from ..auth import get_current_user, is_super_admin, check_company_access
+from ..pagination import finish_page, keyset_page, page_limit
 
 router = APIRouter(prefix="/styles", tags=["styles"])
 
@@ -14,24 +16,28 @@ router = APIRouter(prefix="/styles", tags=["styles"])
 @router.get("", response_model=List[StyleResponse])
 @router.get("/", response_model=List[StyleResponse])
 async def list_styles(
-    session: Session = Depends(get_session),
+    response: Response,
+    after: Optional[str] = None,
+    limit: int = Depends(page_limit),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
-    """List available styles based on user permissions"""
+    """List available styles based on user permissions (newest first, cursor paginated via `after`)"""
     try:
         print(f"DEBUG: list_styles called by user {current_user.id} with role {current_user.role}")
         
         if is_super_admin(current_user):
             print("DEBUG: User is super admin, getting all styles")
             # Süper admin tüm stilleri görebilir
-            styles = session.exec(select(Style).order_by(Style.name)).all()
+            query = select(Style)
         else:
             print("DEBUG: User is not super admin")
             # Geçici olarak tüm kullanıcılar default stilleri görebilir
             print("DEBUG: Getting default styles for non-super admin")
-            styles = session.exec(
-                select(Style).where(Style.is_default == True).order_by(Style.name)
-            ).all()
+            query = select(Style).where(Style.is_default == True)
+        
+        query = keyset_page(query, Style.created_at, Style.id, after, limit)
+        styles = finish_page((await session.exec(query)).all(), limit, response)
         
         print(f"DEBUG: Found {len(styles)} styles")
         
@@ -62,11 +68,11 @@ async def list_styles(
 @router.get("/{style_id}", response_model=StyleResponse)
 async def get_style(
     style_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Get a specific style by ID"""
-    style = session.get(Style, style_id)
+    style = await session.get(Style, style_id)
     if not style:
         raise HTTPException(status_code=404, detail="Style not found")
     
@@ -80,7 +86,7 @@ async def get_style(
 @router.post("/", response_model=StyleResponse)
 async def create_style(
     style_data: StyleCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Create a new style"""
@@ -89,9 +95,9 @@ async def create_style(
         raise HTTPException(status_code=403, detail="Only admins can create styles")
     
     # Check if style name already exists
-    existing_style = session.exec(
+    existing_style = (await session.exec(
         select(Style).where(Style.name == style_data.name)
-    ).first()
+    )).first()
     
     if existing_style:
         raise HTTPException(
@@ -107,8 +113,8 @@ async def create_style(
     )
     
     session.add(style)
-    session.commit()
-    session.refresh(style)
+    await session.commit()
+    await session.refresh(style)
     
     return StyleResponse.model_validate(style.model_dump())
 
@@ -117,11 +123,11 @@ async def create_style(
 async def update_style(
     style_id: str,
     style_data: StyleUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Update an existing style"""
-    style = session.get(Style, style_id)
+    style = await session.get(Style, style_id)
     if not style:
         raise HTTPException(status_code=404, detail="Style not found")
     
@@ -143,12 +149,12 @@ async def update_style(
     
     # Check if new name conflicts with existing style in the same company
     if style_data.name and style_data.name != style.name:
-        existing_style = session.exec(
+        existing_style = (await session.exec(
             select(Style).where(
                 Style.name == style_data.name,
                 Style.company_id == style.company_id
             )
-        ).first()
+        )).first()
         
         if existing_style:
             raise HTTPException(
@@ -169,8 +175,8 @@ async def update_style(
     style.updated_at = datetime.utcnow()
     
     session.add(style)
-    session.commit()
-    session.refresh(style)
+    await session.commit()
+    await session.refresh(style)
     
     return StyleResponse.model_validate(style.model_dump())
 
@@ -178,11 +184,11 @@ async def update_style(
 @router.delete("/{style_id}")
 async def delete_style(
     style_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Delete a style"""
-    style = session.get(Style, style_id)
+    style = await session.get(Style, style_id)
     if not style:
         raise HTTPException(status_code=404, detail="Style not found")
     
@@ -201,27 +207,27 @@ async def delete_style(
     if current_user.role not in ["Admin", "SuperAdmin"]:
         raise HTTPException(status_code=403, detail="Only admins can delete styles")
     
-    session.delete(style)
-    session.commit()
+    await session.delete(style)
+    await session.commit()
     
     return {"message": "Style deleted successfully"}
 
 
 @router.get("/default", response_model=List[StyleResponse])
 async def list_default_styles(
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """List all default styles (no authentication required)"""
-    styles = session.exec(
+    styles = (await session.exec(
         select(Style).where(Style.is_default == True).order_by(Style.name)
-    ).all()
+    )).all()
     
     return [StyleResponse.model_validate(style.model_dump()) for style in styles]
 
 
 @router.post("/seed-defaults")
 async def seed_default_styles(
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     """Create default styles for the system"""
@@ -230,9 +236,9 @@ async def seed_default_styles(
         raise HTTPException(status_code=403, detail="Only super admin can seed default styles")
     
     # Check if default styles already exist
-    existing_defaults = session.exec(
+    existing_defaults = (await session.exec(
         select(Style).where(Style.is_default == True)
-    ).all()
+    )).all()
     
     if existing_defaults:
         return {"message": "Default styles already exist"}
@@ -266,6 +272,6 @@ async def seed_default_styles(
         style = Style(**style_data)
         session.add(style)
     
-    session.commit()
+    await session.commit()
     
     return {"message": "Default styles created successfully"}
\ No newline at end of file
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlmodel import Session, select, and_
 from typing import List, Optional
 from datetime import datetime
 
 from app.db import get_session
 from app.auth import get_current_user
+from app.pagination import finish_page, keyset_page, page_limit
 from app.models import User, TrainingFeedback, InteractionSession, Training
 from app.schemas import TrainingFeedbackCreate, TrainingFeedbackResponse
 
@@ -13,13 +14,16 @@ router = APIRouter(prefix="/training-feedback", tags=["training-feedback"])
 
 @router.get("/", response_model=List[TrainingFeedbackResponse])
 def get_training_feedback(
+    response: Response,
     session_id: Optional[str] = None,
     user_id: Optional[str] = None,
     training_id: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Depends(page_limit),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Eğitim feedback'lerini listele"""
+    """Eğitim feedback'lerini listele (yeniden eskiye, `after` cursor'ı ile sayfalı)"""
     query = select(TrainingFeedback)
     
     # Kullanıcı yetkisi kontrolü
@@ -42,11 +46,10 @@ def get_training_feedback(
     if training_id:
         query = query.where(TrainingFeedback.training_id == training_id)
     
-    # Sıralama
-    query = query.order_by(TrainingFeedback.created_at.desc())
+    # Sıralama ve sayfalama: (created_at, id) üzerinde keyset
+    query = keyset_page(query, TrainingFeedback.created_at, TrainingFeedback.id, after, limit)
     
-    feedbacks = session.exec(query).all()
-    return feedbacks
+    return finish_page(session.exec(query).all(), limit, response)
 
 
 @router.get("/{feedback_id}", response_model=TrainingFeedbackResponse)
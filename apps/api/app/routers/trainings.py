@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request, Response
 from pydantic import BaseModel
 from sqlmodel import Session, select, text
 from sqlalchemy import text as sql_text
@@ -13,11 +13,20 @@ import json
 import xml.etree.ElementTree as ET
 from datetime import datetime
 import re
-from openai import OpenAI
+import httpx
 from ..db import get_session
 from ..models import Training, TrainingSection, Asset, Overlay, CompanyTraining, User, Style, Avatar, FrameConfig, GlobalFrameConfig, Company, UserInteraction, Session, TrainingProgress, ChatMessage, InteractionSession, InteractionMessage, SectionProgress
 from ..auth import hash_password, get_current_user, is_super_admin, is_admin, check_company_access
 from ..storage import get_minio
+from ..services.batch_loader import count_by, load_by_ids
+from ..services.training_manifest import get_training_manifest, invalidate_training_manifests
+from ..services.provider_clients import get_openai, get_sync_http_client
+from ..services.llm_context_cache import bump_training_content_version, invalidate_llm_contexts
+from ..services.training_analytics import mark_rollups_dirty_sync
+from ..services.jobs import JobContext, enqueue_job, job_handler, job_status, record_completed_job
+from ..services.transcription import asset_source_url, build_srt, extract_audio, get_transcription_backend, transcribe_audio
+from ..services.transcript_cache import get_cached_transcript, store_transcript, transcript_cache_key
+from ..services.tts import SpeechSynthesizer
 
 router = APIRouter(prefix="/trainings", tags=["trainings"])
 
@@ -78,20 +87,22 @@ def list_trainings(
             select(Training).where(Training.company_id == current_user.company_id)
         ).all()
     
-    # Avatar ve Company bilgilerini ekle
+    # Avatar ve Company bilgilerini ekle (tek IN sorgusu ile)
+    avatars = load_by_ids(session, Avatar, (training.avatar_id for training in trainings))
+    companies = load_by_ids(session, Company, (training.company_id for training in trainings))
+    
     result = []
     for training in trainings:
         training_dict = training.model_dump()
         
         # Avatar bilgilerini ekle
-        if training.avatar_id:
-            avatar = session.get(Avatar, training.avatar_id)
-            if avatar:
-                training_dict['avatar'] = avatar.model_dump()
+        avatar = avatars.get(training.avatar_id)
+        if avatar:
+            training_dict['avatar'] = avatar.model_dump()
         
         # Company bilgilerini ekle
         if training.company_id:
-            company = session.get(Company, training.company_id)
+            company = companies.get(training.company_id)
             if company:
                 training_dict['company'] = {
                     'id': company.id,
@@ -339,133 +350,30 @@ def copy_training(
 @router.get("/public/access-code/{access_code}", operation_id="get_training_by_access_code")
 def get_training_by_access_code(
     access_code: str, 
+    request: Request,
     session: Session = Depends(get_session)
 ):
-    """Public endpoint to get training by access code - no authentication required"""
+    """Public endpoint to get training by access code - no authentication required
+    
+    Serves the compiled player manifest with a strong ETag; repeat opens are a cache
+    hit or a 304 when the client sends If-None-Match.
+    """
     try:
-        print(f"🔍 Looking for training with access_code: {access_code}")
-        
-        training = session.exec(
-            select(Training).where(Training.access_code == access_code)
-        ).first()
+        manifest = get_training_manifest(session, access_code)
         
-        if not training:
-            print(f"❌ Training not found for access_code: {access_code}")
+        if not manifest:
             raise HTTPException(status_code=404, detail="Training not found")
         
-        print(f"✅ Found training: {training.title} (ID: {training.id})")
-        
-        # Get training sections with overlays
-        sections = session.exec(
-            select(TrainingSection)
-            .where(TrainingSection.training_id == training.id)
-            .order_by(TrainingSection.order_index)
-        ).all()
-        
-        print(f"📚 Found {len(sections)} sections")
-        
-        # Build training data with sections and overlays
-        training_dict = training.model_dump()
-        
-        # Add sections with overlays
-        sections_data = []
-        for section in sections:
-            try:
-                section_dict = section.model_dump()
-                print(f"🔍 Section {section.id} ({section.title}): type={section.type}, agent_id={section.agent_id}, video_object={section.video_object}")
-                
-                # Get overlays for this section
-                overlays = session.exec(
-                    select(Overlay)
-                    .where(Overlay.section_id == section.id)
-                    .order_by(Overlay.time_stamp)
-                ).all()
-                
-                # Get asset information for section
-                if section.asset_id:
-                    asset = session.get(Asset, section.asset_id)
-                    if asset:
-                        section_dict['asset'] = asset.model_dump()
-                
-                # Process overlays with their asset information
-                overlays_data = []
-                for overlay in overlays:
-                    try:
-                        overlay_dict = overlay.model_dump()
-                        
-                        # Get content asset for overlay
-                        if overlay.content_asset_id:
-                            content_asset = session.get(Asset, overlay.content_asset_id)
-                            if content_asset:
-                                overlay_dict['content_asset'] = content_asset.model_dump()
-                        
-                        overlays_data.append(overlay_dict)
-                    except Exception as e:
-                        print(f"❌ Error processing overlay {overlay.id}: {e}")
-                        # Add overlay without content_asset if there's an error
-                        try:
-                            overlay_dict = overlay.model_dump()
-                            overlays_data.append(overlay_dict)
-                        except Exception as e2:
-                            print(f"❌ Error even with basic overlay dump: {e2}")
-                            continue
-                
-                # Add overlays to section
-                section_dict['overlays'] = overlays_data
-                sections_data.append(section_dict)
-                
-            except Exception as e:
-                print(f"❌ Error processing section {section.id}: {e}")
-                # Add section without overlays if there's an error
-                try:
-                    section_dict = section.model_dump()
-                    section_dict['overlays'] = []
-                    sections_data.append(section_dict)
-                except Exception as e2:
-                    print(f"❌ Error even with basic section dump: {e2}")
-                    continue
+        headers = {"ETag": manifest.etag, "Cache-Control": "no-cache"}
+        if manifest.matches(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
         
-        training_dict['sections'] = sections_data
-        
-        # Avatar bilgilerini ekle
-        if training.avatar_id:
-            try:
-                avatar = session.get(Avatar, training.avatar_id)
-                if avatar:
-                    training_dict['avatar'] = avatar.model_dump()
-            except Exception as e:
-                print(f"❌ Error loading avatar: {e}")
-        
-        # Company bilgilerini ekle
-        if training.company_id:
-            try:
-                company = session.get(Company, training.company_id)
-                if company:
-                    training_dict['company'] = {
-                        'id': company.id,
-                        'name': company.name,
-                        'display_name': company.name
-                    }
-            except Exception as e:
-                print(f"❌ Error loading company: {e}")
-        else:
-            # Sistem eğitimi (SuperAdmin)
-            training_dict['company'] = {
-                'id': None,
-                'name': 'System',
-                'display_name': 'Sistem Eğitimi'
-            }
-        
-        print(f"✅ Successfully built training data with {len(sections_data)} sections")
-        return training_dict
+        return Response(content=manifest.body, media_type="application/json", headers=headers)
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Unexpected error in get_training_by_access_code: {e}")
-        print(f"❌ Error type: {type(e)}")
-        import traceback
-        traceback.print_exc()
+        print(f"❌ Unexpected error in get_training_by_access_code: {type(e).__name__}: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
@@ -560,8 +468,11 @@ def update_training(
         setattr(training, k, v)
     
     session.add(training)
+    bump_training_content_version(session, training_id)
     session.commit()
     session.refresh(training)
+    invalidate_training_manifests(training_id=training_id)
+    invalidate_llm_contexts(training_id=training_id)
     return training
 
 
@@ -642,12 +553,19 @@ def delete_training(
         result = session.execute(sql_text("DELETE FROM companytraining WHERE training_id = :training_id"), {"training_id": training_id})
         print(f"🔍 Deleted {result.rowcount} company trainings")
         
-        # 11. Finally, delete the training itself
+        # 11. Delete analytics rollups (and queued recomputes) of the training
+        for table in ("trainingdailystats", "traininganalyticsmember", "trainingdailystatsdirty"):
+            result = session.execute(sql_text(f"DELETE FROM {table} WHERE training_id = :training_id"), {"training_id": training_id})
+            print(f"🔍 Deleted {result.rowcount} {table} rows")
+        
+        # 12. Finally, delete the training itself
         result = session.execute(sql_text("DELETE FROM training WHERE id = :training_id"), {"training_id": training_id})
         if result.rowcount == 0:
             raise HTTPException(404, "Training not found or already deleted")
         
         session.commit()
+        invalidate_training_manifests(training_id=training_id)
+        invalidate_llm_contexts(training_id=training_id)
         print(f"✅ Successfully deleted training {training_id}")
         return {"ok": True}
     except HTTPException:
@@ -673,35 +591,32 @@ def list_training_sections(training_id: str, session: Session = Depends(get_sess
         .order_by(TrainingSection.order_index)
     ).all()
     
+    # Related rows for all sections at once: assets by IN, overlay counts by GROUP BY
+    assets = load_by_ids(session, Asset, (section.asset_id for section in sections))
+    avatar = session.get(Avatar, training.avatar_id) if training.avatar_id else None
+    overlay_counts = count_by(
+        session,
+        Overlay.training_section_id,
+        (section.id for section in sections if section.type == 'video')
+    )
+    
     # Include asset and avatar information for each section
     result = []
     for section in sections:
         section_dict = section.model_dump()
         
         # Add asset information
-        if section.asset_id:
-            asset = session.get(Asset, section.asset_id)
-            if asset:
-                section_dict["asset"] = asset.model_dump()
+        asset = assets.get(section.asset_id)
+        if asset:
+            section_dict["asset"] = asset.model_dump()
         
         # Add avatar information for LLM sections (always add if training has avatar)
-        if training.avatar_id and (section.type == 'llm_interaction' or section.type == 'llm_agent'):
-            print(f"🔍 Adding avatar for section {section.id} (type: {section.type}), training avatar_id: {training.avatar_id}")
-            avatar = session.get(Avatar, training.avatar_id)
-            if avatar:
-                print(f"✅ Avatar found: {avatar.name}")
-                section_dict["avatar"] = avatar.model_dump()
-            else:
-                print(f"❌ Avatar not found for ID: {training.avatar_id}")
-        else:
-            print(f"🔍 Skipping avatar for section {section.id} - training.avatar_id: {training.avatar_id}, section.type: {section.type}")
+        if avatar and (section.type == 'llm_interaction' or section.type == 'llm_agent'):
+            section_dict["avatar"] = avatar.model_dump()
         
         # Add overlay count for video sections
         if section.type == 'video':
-            overlay_count = session.exec(
-                select(Overlay).where(Overlay.training_section_id == section.id)
-            ).all()
-            section_dict["overlay_count"] = len(overlay_count)
+            section_dict["overlay_count"] = overlay_counts.get(section.id, 0)
         
         result.append(section_dict)
     
@@ -790,8 +705,11 @@ def create_training_section(training_id: str, section: TrainingSectionIn, sessio
     
     obj = TrainingSection(**section_data)
     session.add(obj)
+    bump_training_content_version(session, training_id)
     session.commit()
     session.refresh(obj)
+    invalidate_training_manifests(training_id=training_id)
+    invalidate_llm_contexts(training_id=training_id)
     return obj
 
 
@@ -828,8 +746,11 @@ def update_training_section(training_id: str, section_id: str, section: Training
         setattr(existing_section, k, v)
     
     session.add(existing_section)
+    bump_training_content_version(session, training_id)
     session.commit()
     session.refresh(existing_section)
+    invalidate_training_manifests(training_id=training_id)
+    invalidate_llm_contexts(training_id=training_id)
     return existing_section
 
 
@@ -854,6 +775,8 @@ def delete_training_section(training_id: str, section_id: str, session: Session
         print(f"🔍 Found {len(section_user_interactions)} user interactions to delete for section {section_id}")
         for interaction in section_user_interactions:
             session.delete(interaction)
+        # Silinen etkileşimlerin günlük özetleri (ve tekil kullanıcı sayıları) yeniden hesaplansın
+        mark_rollups_dirty_sync(session, section_user_interactions)
         
         # 2. Delete all ChatMessage records that reference this section
         section_chat_messages = session.exec(
@@ -890,12 +813,16 @@ def delete_training_section(training_id: str, section_id: str, session: Session
             print(f"🔍 Found {len(user_interactions)} user interactions for overlay {overlay.id}")
             for interaction in user_interactions:
                 session.delete(interaction)
+            mark_rollups_dirty_sync(session, user_interactions)
             session.delete(overlay)
         
         # 6. Delete the section itself
         print(f"🔍 Deleting training section {section_id}")
         session.delete(section)
+        bump_training_content_version(session, training_id)
         session.commit()
+        invalidate_training_manifests(training_id=training_id)
+        invalidate_llm_contexts(training_id=training_id)
         print(f"✅ Successfully deleted training section {section_id}")
         return {"ok": True}
     except Exception as e:
@@ -955,7 +882,7 @@ Eğitim Bilgileri:
 
 Açıklama:"""
 
-        response = requests.post(
+        response = get_sync_http_client("openai").post(
             'https://api.openai.com/v1/chat/completions',
             headers={
                 'Authorization': f'Bearer {openai_api_key}',
@@ -979,7 +906,7 @@ Açıklama:"""
             "description": description
         }
         
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(500, f"Error calling OpenAI API: {str(e)}")
     except Exception as e:
         raise HTTPException(500, f"Unexpected error: {str(e)}")
@@ -1014,13 +941,13 @@ def list_section_overlays(training_id: str, section_id: str, session: Session =
             print(f"🔍 WARNING: Duplicate overlay found: {key} (count: {overlay_counts[key]})")
     
     # Include content asset information for each overlay
+    content_assets = load_by_ids(session, Asset, (overlay.content_id for overlay in overlays))
     result = []
     for overlay in overlays:
         overlay_dict = overlay.model_dump()
-        if overlay.content_id:
-            content_asset = session.get(Asset, overlay.content_id)
-            if content_asset:
-                overlay_dict["content_asset"] = content_asset.model_dump()
+        content_asset = content_assets.get(overlay.content_id)
+        if content_asset:
+            overlay_dict["content_asset"] = content_asset.model_dump()
         result.append(overlay_dict)
     
     return result
@@ -1105,6 +1032,7 @@ def create_section_overlay(training_id: str, section_id: str, overlay: OverlayIn
     session.add(obj)
     session.commit()
     session.refresh(obj)
+    invalidate_training_manifests(training_id=training_id)
     return obj
 
 
@@ -1175,6 +1103,7 @@ def update_section_overlay(training_id: str, section_id: str, overlay_id: str, o
     session.add(existing_overlay)
     session.commit()
     session.refresh(existing_overlay)
+    invalidate_training_manifests(training_id=training_id)
     
     print(f"DEBUG: Overlay updated successfully")
     return existing_overlay
@@ -1201,8 +1130,12 @@ def delete_section_overlay(training_id: str, section_id: str, overlay_id: str, s
         
         # Use raw SQL to delete UserInteraction records that reference this overlay
         # This bypasses any ORM-level issues
-        result = session.execute(sql_text("DELETE FROM userinteraction WHERE overlay_id = :overlay_id"), {"overlay_id": overlay_id})
-        deleted_interactions = result.rowcount
+        deleted_rows = session.execute(
+            sql_text('DELETE FROM userinteraction WHERE overlay_id = :overlay_id RETURNING training_id, "timestamp"'),
+            {"overlay_id": overlay_id}
+        ).all()
+        deleted_interactions = len(deleted_rows)
+        mark_rollups_dirty_sync(session, deleted_rows)
         print(f"🔍 Deleted {deleted_interactions} user interactions for overlay {overlay_id}")
         
         # Now delete the overlay using raw SQL as well
@@ -1213,6 +1146,7 @@ def delete_section_overlay(training_id: str, section_id: str, overlay_id: str, s
             raise HTTPException(404, "Overlay not found or already deleted")
         
         session.commit()
+        invalidate_training_manifests(training_id=training_id)
         print(f"✅ Successfully deleted overlay {overlay_id}")
         return {"ok": True}
     except HTTPException:
@@ -1266,10 +1200,12 @@ def cleanup_duplicate_overlays(training_id: str, section_id: str, session: Sessi
                     ).all()
                     for interaction in user_interactions:
                         session.delete(interaction)
+                    mark_rollups_dirty_sync(session, user_interactions)
                     session.delete(overlay)
                     deleted_count += 1
         
         session.commit()
+        invalidate_training_manifests(training_id=training_id)
         
         return {
             "message": f"Cleanup completed. Removed {deleted_count} duplicate overlays.",
@@ -1282,9 +1218,8 @@ def cleanup_duplicate_overlays(training_id: str, section_id: str, session: Sessi
         raise HTTPException(500, f"Error cleaning up duplicates: {str(e)}")
 
 
-# Transcript generation endpoint
-@router.post("/{training_id}/sections/{section_id}/transcript", operation_id="generate_section_transcript")
-def generate_transcript(training_id: str, section_id: str, session: Session = Depends(get_session)):
+def _get_transcript_source(session, training_id: str, section_id: str) -> Asset:
+    """Video asset of a section to transcribe (404/400 when there is none)"""
     section = session.get(TrainingSection, section_id)
     if not section or section.training_id != training_id:
         raise HTTPException(404, "Training section not found")
@@ -1296,121 +1231,86 @@ def generate_transcript(training_id: str, section_id: str, session: Session = De
     asset = session.get(Asset, section.asset_id)
     if not asset or asset.kind != 'video':
         raise HTTPException(400, "Asset is not a video")
+    return asset
+
+
+# Transcript generation endpoint: queues a background job, poll GET /jobs/{job_id} for the result
+@router.post("/{training_id}/sections/{section_id}/transcript", operation_id="generate_section_transcript", status_code=202)
+def generate_transcript(
+    training_id: str,
+    section_id: str,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    asset = _get_transcript_source(session, training_id, section_id)
+    payload = {"training_id": training_id, "section_id": section_id}
+    
+    # Aynı video daha önce transkript edildiyse job'u beklemeden sonucu döndür
+    cached = get_cached_transcript(session, transcript_cache_key(asset.uri))
+    if cached is not None:
+        return job_status(record_completed_job(session, "section_transcript", payload, cached, user_id=current_user.id))
+    
+    job = enqueue_job(session, "section_transcript", payload, user_id=current_user.id)
+    return job_status(job)
+
+
+@job_handler("section_transcript")
+def run_transcript_job(ctx: JobContext, payload: dict) -> dict:
+    with ctx.session() as session:
+        asset = _get_transcript_source(session, payload["training_id"], payload["section_id"])
+    
+    cache_key = transcript_cache_key(asset.uri)
+    with ctx.session() as session:
+        cached = get_cached_transcript(session, cache_key)
+    if cached is not None:
+        return cached
     
     try:
-        # Check if ffmpeg is available
-        ffmpeg_paths = [
-            'ffmpeg',  # PATH'te varsa
-            r'C:\ffmpeg\bin\ffmpeg.exe',  # Tam yol
-            r'C:\Program Files\ffmpeg\bin\ffmpeg.exe',  # Program Files
-        ]
-        
-        ffmpeg_found = False
-        ffmpeg_cmd = None
-        
-        for path in ffmpeg_paths:
-            try:
-                result = subprocess.run([path, '-version'], capture_output=True, text=True, check=True)
-                print(f"FFmpeg found at: {path}")  # Debug log
-                ffmpeg_found = True
-                ffmpeg_cmd = path
-                break
-            except (subprocess.CalledProcessError, FileNotFoundError) as e:
-                print(f"FFmpeg not found at: {path} - {e}")  # Debug log
-                continue
+        # ffmpeg videoyu doğrudan storage'dan okur; diske yalnızca sıkıştırılmış ses yazılır
+        backend = get_transcription_backend()
         
-        if not ffmpeg_found:
-            raise HTTPException(500, "FFmpeg is not installed or not in PATH. Please install FFmpeg and restart the server.")
+        ctx.report_progress(0.05, "Extracting audio")
+        audio_path = extract_audio(asset_source_url(asset.uri))
         
-        # Download video to temporary file
-        video_url = asset.uri
-        if not video_url.startswith('http'):
-            # Assume it's a local file path
-            cdn_url = os.getenv('CDN_URL', 'http://minio:9000/lxplayer')
-            video_url = f"{cdn_url}/{video_url}"
-        
-        # Create temporary file for video
-        with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_video:
-            response = requests.get(video_url, stream=True)
-            response.raise_for_status()
-            for chunk in response.iter_content(chunk_size=8192):
-                temp_video.write(chunk)
-            temp_video_path = temp_video.name
-        
-        # Extract audio using ffmpeg
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_audio:
-            audio_path = temp_audio.name
-        
-        # Extract audio from video
-        subprocess.run([
-            ffmpeg_cmd, '-i', temp_video_path, 
-            '-vn', '-acodec', 'pcm_s16le', 
-            '-ar', '16000', '-ac', '1', 
-            audio_path, '-y'
-        ], check=True)
-        
-        # Use OpenAI Whisper API to transcribe
-        openai_api_key = os.getenv('OPENAI_API_KEY')
-        if not openai_api_key:
-            raise HTTPException(500, "OpenAI API key not configured")
-        
-        with open(audio_path, 'rb') as audio_file:
-            response = requests.post(
-                'https://api.openai.com/v1/audio/transcriptions',
-                headers={
-                    'Authorization': f'Bearer {openai_api_key}'
-                },
-                files={
-                    'file': ('audio.wav', audio_file, 'audio/wav')
-                },
-                data={
-                    'model': 'whisper-1',
-                    'language': 'tr',  # Turkish language
-                    'response_format': 'verbose_json'  # Zaman etiketli çıktı için
-                }
+        try:
+            # Uzun videolar sessizliklerden bölünüp paralel transkript edilir
+            result = transcribe_audio(
+                audio_path,
+                backend=backend,
+                progress=lambda done, message: ctx.report_progress(0.3 + 0.65 * done, message)
             )
-            response.raise_for_status()
-            result = response.json()
-            
-            # Tam transcript
-            transcript = result.get('text', '')
-            
-            # Zaman etiketli segmentler
-            segments = result.get('segments', [])
-            
-            # SRT formatına çevir
-            srt_content = ""
-            for i, segment in enumerate(segments, 1):
-                start_time = segment.get('start', 0)
-                end_time = segment.get('end', 0)
-                text = segment.get('text', '').strip()
-                
-                # Saniyeyi SRT formatına çevir (HH:MM:SS,mmm)
-                start_srt = f"{int(start_time//3600):02d}:{int((start_time%3600)//60):02d}:{int(start_time%60):02d},{int((start_time%1)*1000):03d}"
-                end_srt = f"{int(end_time//3600):02d}:{int((end_time%3600)//60):02d}:{int(end_time%60):02d},{int((end_time%1)*1000):03d}"
-                
-                srt_content += f"{i}\n{start_srt} --> {end_srt}\n{text}\n\n"
+        finally:
+            os.unlink(audio_path)
         
-        # Clean up temporary files
-        os.unlink(temp_video_path)
-        os.unlink(audio_path)
+        # Tam transcript ve zaman etiketli segmentler
+        transcript = result.get('text', '')
+        segments = result.get('segments', [])
         
-        return {
+        # SRT formatına çevir
+        srt_content = build_srt(segments)
+        
+        result = {
             "transcript": transcript,
             "srt": srt_content,
             "segments": segments
         }
+        try:
+            with ctx.session() as session:
+                store_transcript(session, cache_key, result)
+        except Exception as e:
+            print(f"⚠️  Transcript cache write failed: {e}")
+        return result
         
+    except HTTPException:
+        raise
     except subprocess.CalledProcessError as e:
         raise HTTPException(500, f"Error processing video: {str(e)}")
-    except requests.RequestException as e:
+    except (requests.RequestException, httpx.HTTPError) as e:
         raise HTTPException(500, f"Error downloading video or calling OpenAI API: {str(e)}")
     except Exception as e:
         raise HTTPException(500, f"Unexpected error: {str(e)}")
 
 
-# Audio dubbing endpoint
-@router.post("/{training_id}/sections/{section_id}/dub-audio", operation_id="dub_section_audio")
 def parse_srt_content(srt_content: str):
     """SRT formatındaki içeriği parse eder ve segment listesi döndürür"""
     segments = []
@@ -1468,7 +1368,7 @@ def seconds_to_srt_time(seconds: float) -> str:
     ms = int((seconds % 1) * 1000)
     return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
 
-def dub_audio(training_id: str, section_id: str, session: Session = Depends(get_session)):
+def _get_dub_section(session, training_id: str, section_id: str) -> TrainingSection:
     section = session.get(TrainingSection, section_id)
     if not section or section.training_id != training_id:
         raise HTTPException(404, "Training section not found")
@@ -1476,7 +1376,37 @@ def dub_audio(training_id: str, section_id: str, session: Session = Depends(get_
     # Check if script exists
     if not section.script or not section.script.strip():
         raise HTTPException(400, "Script alanı boş. Lütfen seslendirilecek metni script alanına yazın.")
-    
+    return section
+
+
+# Audio dubbing endpoint: queues a background job, poll GET /jobs/{job_id} for the result
+@router.post("/{training_id}/sections/{section_id}/dub-audio", operation_id="dub_section_audio", status_code=202)
+def dub_audio(
+    training_id: str,
+    section_id: str,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    _get_dub_section(session, training_id, section_id)
+    job = enqueue_job(
+        session, "section_dub_audio", {"training_id": training_id, "section_id": section_id},
+        user_id=current_user.id
+    )
+    return job_status(job)
+
+
+@job_handler("section_dub_audio")
+def run_dub_audio_job(ctx: JobContext, payload: dict) -> dict:
+    training_id = payload["training_id"]
+    with ctx.session() as session:
+        section = _get_dub_section(session, training_id, payload["section_id"])
+        video_asset = session.get(Asset, section.asset_id) if section.asset_id else None
+    # Dakikalar süren TTS/ffmpeg boyunca DB bağlantısı boşta açık kalmasın;
+    # sonuç yazılırken yeni bir oturum açılır
+    return _dub_section_audio(ctx, training_id, section, video_asset)
+
+
+def _dub_section_audio(ctx: JobContext, training_id: str, section: TrainingSection, video_asset: Asset | None) -> dict:
     try:
         script_content = section.script.strip()
         
@@ -1493,9 +1423,9 @@ def dub_audio(training_id: str, section_id: str, session: Session = Depends(get_
             video_duration = 10.0  # Default duration
             
             # Try to get video duration from asset
-            if section.asset_id:
-                asset = session.get(Asset, section.asset_id)
-                if asset and asset.kind == 'video':
+            if video_asset:
+                asset = video_asset
+                if asset.kind == 'video':
                     # Try to get duration from video metadata
                     try:
                         # Download video to get duration
@@ -1528,45 +1458,29 @@ def dub_audio(training_id: str, section_id: str, session: Session = Depends(get_
             }]
         
         # Use ElevenLabs to generate new audio in target language
-        eleven_api_key = os.getenv("ELEVENLABS_API_KEY")
-        if not eleven_api_key:
-            raise HTTPException(500, "ELEVENLABS_API_KEY is not set")
-        
         # For now, we'll use the same voice but you can make this configurable
         voice_id = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
         model_id = os.getenv("ELEVENLABS_MODEL_ID", "eleven_multilingual_v2")
+        synthesizer = SpeechSynthesizer(voice_id, model_id, {"stability": 0.5, "similarity_boost": 0.7})
         
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-        headers = {"xi-api-key": eleven_api_key, "Content-Type": "application/json"}
-        
-        # Generate audio for each segment
-        segment_audio_files = []
-        total_duration = 0
-        
-        for segment in segments:
-            payload = {
-                "text": segment['text'],
-                "model_id": model_id,
-                "voice_settings": {"stability": 0.5, "similarity_boost": 0.7},
+        # Generate audio for each segment (paralel; değişmeyen segmentler cache'ten gelir)
+        segment_paths = synthesizer.synthesize_all(
+            [segment['text'] for segment in segments],
+            progress=lambda done, message: ctx.report_progress(0.1 + 0.7 * done, message)
+        )
+        segment_audio_files = [
+            {
+                'file_path': path,
+                'start_time': segment['start_time'],
+                'duration': segment['duration'],
+                'text': segment['text']
             }
-            
-            response = requests.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            segment_audio_bytes = response.content
-            
-            # Save segment audio
-            with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_segment_audio:
-                temp_segment_audio.write(segment_audio_bytes)
-                segment_audio_files.append({
-                    'file_path': temp_segment_audio.name,
-                    'start_time': segment['start_time'],
-                    'duration': segment['duration'],
-                    'text': segment['text']
-                })
-            
-            total_duration = max(total_duration, segment['end_time'])
+            for path, segment in zip(segment_paths, segments)
+        ]
+        total_duration = max((segment['end_time'] for segment in segments), default=0)
         
         # Combine all segments into one audio file using FFmpeg
+        ctx.report_progress(0.85, "Mixing audio")
         if len(segment_audio_files) > 1:
             # Create a filter complex to combine segments with proper timing
             filter_parts = []
@@ -1622,24 +1536,29 @@ def dub_audio(training_id: str, section_id: str, session: Session = Depends(get_
                 bucket_name='lxplayer',
                 object_name=object_name,
                 data=audio_file,
-                length=len(audio_bytes),
+                length=os.path.getsize(new_audio_path),
                 content_type='audio/mpeg'
             )
         
-        # Create asset for the new audio
-        audio_asset = Asset(
-            title=f"{section.title} - Dubbed Audio",
-            kind='audio',
-            uri=object_name
-        )
-        session.add(audio_asset)
-        session.commit()
-        session.refresh(audio_asset)
-        
-        # Update section with audio_asset_id
-        section.audio_asset_id = audio_asset.id
-        session.add(section)
-        session.commit()
+        with ctx.session() as session:
+            # Create asset for the new audio
+            audio_asset = Asset(
+                title=f"{section.title} - Dubbed Audio",
+                kind='audio',
+                uri=object_name
+            )
+            session.add(audio_asset)
+            session.commit()
+            audio_asset_id = audio_asset.id
+            
+            # Update section with audio_asset_id (bölüm iş sürerken silinmiş olabilir)
+            current_section = session.get(TrainingSection, section.id)
+            if not current_section:
+                raise HTTPException(404, "Training section not found")
+            current_section.audio_asset_id = audio_asset_id
+            session.add(current_section)
+            session.commit()
+        invalidate_training_manifests(training_id=training_id)
         
         # Clean up temporary files
         os.unlink(new_audio_path)
@@ -1648,7 +1567,7 @@ def dub_audio(training_id: str, section_id: str, session: Session = Depends(get_
                 os.unlink(seg['file_path'])
         
         return {
-            "audio_asset_id": audio_asset.id,
+            "audio_asset_id": audio_asset_id,
             "transcript": script_content,
             "audio_url": f"{cdn_url}/{object_name}",
             "segments_count": len(segments),
@@ -1656,7 +1575,9 @@ def dub_audio(training_id: str, section_id: str, session: Session = Depends(get_
             "is_srt_format": is_srt
         }
         
-    except requests.RequestException as e:
+    except HTTPException:
+        raise
+    except httpx.HTTPError as e:
         raise HTTPException(500, f"Error calling ElevenLabs API: {str(e)}")
     except Exception as e:
         raise HTTPException(500, f"Unexpected error: {str(e)}")
@@ -2625,7 +2546,7 @@ Lütfen bu komuta göre gerekli overlay işlemlerini JSON formatında belirt.
         
         # Call OpenAI API
         print("🔍 DEBUG: Calling OpenAI API...")
-        client = OpenAI(api_key=openai_api_key)
+        client = get_openai(openai_api_key)
         response = client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[
@@ -2814,7 +2735,7 @@ Lütfen bu komuta göre gerekli overlay işlemlerini JSON formatında belirt.
 """
         
         # Call OpenAI API
-        client = OpenAI(api_key=openai_api_key)
+        client = get_openai(openai_api_key)
         response = client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[
@@ -2899,6 +2820,7 @@ Lütfen bu komuta göre gerekli overlay işlemlerini JSON formatında belirt.
                             ).all()
                             for interaction in user_interactions:
                                 session.delete(interaction)
+                            mark_rollups_dirty_sync(session, user_interactions)
                             session.delete(overlay)
                             session.commit()
                             executed_actions.append({
@@ -2925,6 +2847,7 @@ Lütfen bu komuta göre gerekli overlay işlemlerini JSON formatında belirt.
                         ).all()
                         for interaction in user_interactions:
                             session.delete(interaction)
+                        mark_rollups_dirty_sync(session, user_interactions)
                         session.delete(overlay)
                         executed_actions.append({
                             "action": "delete",
@@ -2971,6 +2894,9 @@ Lütfen bu komuta göre gerekli overlay işlemlerini JSON formatında belirt.
                 error_message = str(e).replace("{", "{{").replace("}", "}}")
                 warnings.append(f"Aksiyon hatası: {error_message}")
         
+        if executed_actions:
+            invalidate_training_manifests(training_id=training_id)
+        
         return LLMOverlayResponse(
             success=True,
             message=llm_data.get("message", f"{len(executed_actions)} overlay işlemi tamamlandı"),
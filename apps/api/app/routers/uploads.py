@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Query, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Query, Depends, HTTPException, Response, UploadFile, File
 from fastapi.responses import RedirectResponse
 from pydantic import BaseModel
 from sqlmodel import Session, select
+from typing import Optional
 from ..storage import get_minio, ensure_bucket, presign_put_url, presign_get_url
 from ..db import get_session
 from ..models import Asset, User
 from ..auth import get_current_user
+from ..pagination import finish_page, keyset_page, page_limit
 import uuid
 import io
 
@@ -307,9 +309,15 @@ def presign_get_object(object_name: str):
 
 
 @router.get("/assets")
-def list_assets(session: Session = Depends(get_session)):
-    """List all assets with their unique IDs"""
-    assets = session.exec(select(Asset)).all()
+def list_assets(
+    response: Response,
+    after: Optional[str] = None,
+    limit: int = Depends(page_limit),
+    session: Session = Depends(get_session)
+):
+    """List assets with their unique IDs (newest first, cursor paginated via `after`)"""
+    query = keyset_page(select(Asset), Asset.created_at, Asset.id, after, limit)
+    assets = finish_page(session.exec(query).all(), limit, response)
     
     # Generate fresh presigned URLs for each asset
     client = get_minio()
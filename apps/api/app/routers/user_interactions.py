@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlmodel import Session, select, func
 from typing import List, Optional
 from datetime import datetime, timedelta
 from ..db import get_session
 from ..models import UserInteraction, User, Training, Session as TrainingSession, Company, TrainingSection, Overlay
 from ..auth import get_current_user, is_super_admin, check_company_access
+from ..pagination import finish_page, keyset_page, page_limit
+from ..services.batch_loader import load_by_ids
+from ..services.training_analytics import daily_stats_query, member_counts_query, summarize_daily_stats
 
 router = APIRouter(prefix="/user-interactions", tags=["user-interactions"])
 
@@ -29,16 +32,17 @@ class SessionInteractionSummary:
 
 @router.get("/", operation_id="list_user_interactions")
 def list_user_interactions(
+    response: Response,
     user_id: Optional[str] = None,
     training_id: Optional[str] = None,
     session_id: Optional[str] = None,
     interaction_type: Optional[str] = None,
-    limit: int = 100,
-    offset: int = 0,
+    after: Optional[str] = None,
+    limit: int = Depends(page_limit),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """List user interactions with filtering options"""
+    """List user interactions with filtering options (newest first, cursor paginated via `after`)"""
     
     # Build query
     query = select(UserInteraction)
@@ -72,15 +76,29 @@ def list_user_interactions(
                 User.company_id == current_user.company_id
             )
     
-    # Apply pagination
-    query = query.offset(offset).limit(limit).order_by(UserInteraction.timestamp.desc())
+    # Keyset pagination on (timestamp, id)
+    query = keyset_page(query, UserInteraction.timestamp, UserInteraction.id, after, limit)
+    interactions = finish_page(session.exec(query).all(), limit, response, timestamp_field="timestamp")
     
-    interactions = session.exec(query).all()
+    # Related rows of the whole page: one IN query per table
+    users = load_by_ids(session, User, (i.user_id for i in interactions))
+    trainings = load_by_ids(session, Training, (i.training_id for i in interactions))
+    training_sessions = load_by_ids(session, TrainingSession, (i.session_id for i in interactions))
+    sections = load_by_ids(session, TrainingSection, (i.section_id for i in interactions))
+    overlays = load_by_ids(session, Overlay, (i.overlay_id for i in interactions))
+    companies = load_by_ids(session, Company, (i.company_id for i in interactions))
     
     # Enrich with related data
     result = []
     for interaction in interactions:
-        interaction_dict = {
+        user = users.get(interaction.user_id)
+        training = trainings.get(interaction.training_id)
+        training_session = training_sessions.get(interaction.session_id)
+        section = sections.get(interaction.section_id)
+        overlay = overlays.get(interaction.overlay_id)
+        company = companies.get(interaction.company_id)
+        
+        result.append({
             "id": interaction.id,
             "user_id": interaction.user_id,
             "training_id": interaction.training_id,
@@ -97,77 +115,39 @@ def list_user_interactions(
             "response_time": interaction.response_time,
             "success": interaction.success,
             # Related data
-            "user": None,
-            "training": None,
-            "session": None,
-            "section": None,
-            "overlay": None,
-            "company": None
-        }
-        
-        # Get user info
-        if interaction.user_id:
-            user = session.get(User, interaction.user_id)
-            if user:
-                interaction_dict["user"] = {
-                    "id": user.id,
-                    "email": user.email,
-                    "username": user.username,
-                    "full_name": user.full_name
-                }
-        
-        # Get training info
-        if interaction.training_id:
-            training = session.get(Training, interaction.training_id)
-            if training:
-                interaction_dict["training"] = {
-                    "id": training.id,
-                    "title": training.title,
-                    "description": training.description
-                }
-        
-        # Get session info
-        if interaction.session_id:
-            training_session = session.get(TrainingSession, interaction.session_id)
-            if training_session:
-                interaction_dict["session"] = {
-                    "id": training_session.id,
-                    "started_at": training_session.started_at,
-                    "ended_at": training_session.ended_at,
-                    "status": training_session.status
-                }
-        
-        # Get section info
-        if interaction.section_id:
-            section = session.get(TrainingSection, interaction.section_id)
-            if section:
-                interaction_dict["section"] = {
-                    "id": section.id,
-                    "title": section.title,
-                    "order_index": section.order_index
-                }
-        
-        # Get overlay info
-        if interaction.overlay_id:
-            overlay = session.get(Overlay, interaction.overlay_id)
-            if overlay:
-                interaction_dict["overlay"] = {
-                    "id": overlay.id,
-                    "type": overlay.type,
-                    "caption": overlay.caption,
-                    "time_stamp": overlay.time_stamp
-                }
-        
-        # Get company info
-        if interaction.company_id:
-            company = session.get(Company, interaction.company_id)
-            if company:
-                interaction_dict["company"] = {
-                    "id": company.id,
-                    "name": company.name
-                }
-        
-        result.append(interaction_dict)
+            "user": {
+                "id": user.id,
+                "email": user.email,
+                "username": user.username,
+                "full_name": user.full_name
+            } if user else None,
+            "training": {
+                "id": training.id,
+                "title": training.title,
+                "description": training.description
+            } if training else None,
+            "session": {
+                "id": training_session.id,
+                "started_at": training_session.started_at,
+                "ended_at": training_session.ended_at,
+                "status": training_session.status
+            } if training_session else None,
+            "section": {
+                "id": section.id,
+                "title": section.title,
+                "order_index": section.order_index
+            } if section else None,
+            "overlay": {
+                "id": overlay.id,
+                "type": overlay.type,
+                "caption": overlay.caption,
+                "time_stamp": overlay.time_stamp
+            } if overlay else None,
+            "company": {
+                "id": company.id,
+                "name": company.name
+            } if company else None
+        })
     
     return result
 
@@ -188,50 +168,9 @@ def get_training_interaction_summary(
     if not check_company_access(current_user, training.company_id):
         raise HTTPException(403, "Access denied")
     
-    # Get interaction counts by type
-    interaction_counts = session.exec(
-        select(
-            UserInteraction.interaction_type,
-            func.count(UserInteraction.id).label('count')
-        ).where(UserInteraction.training_id == training_id)
-        .group_by(UserInteraction.interaction_type)
-    ).all()
-    
-    # Get unique users count
-    unique_users = session.exec(
-        select(func.count(func.distinct(UserInteraction.user_id)))
-        .where(UserInteraction.training_id == training_id)
-    ).first() or 0
-    
-    # Get unique sessions count
-    unique_sessions = session.exec(
-        select(func.count(func.distinct(UserInteraction.session_id)))
-        .where(UserInteraction.training_id == training_id)
-    ).first() or 0
-    
-    # Get total interactions
-    total_interactions = session.exec(
-        select(func.count(UserInteraction.id))
-        .where(UserInteraction.training_id == training_id)
-    ).first() or 0
-    
-    # Get average response time
-    avg_response_time = session.exec(
-        select(func.avg(UserInteraction.response_time))
-        .where(UserInteraction.training_id == training_id)
-    ).first() or 0
-    
-    # Get success rate
-    success_rate = session.exec(
-        select(
-            func.count(UserInteraction.id).label('total'),
-            func.count(UserInteraction.id).filter(UserInteraction.success == True).label('successful')
-        ).where(UserInteraction.training_id == training_id)
-    ).first()
-    
-    success_percentage = 0
-    if success_rate and success_rate.total > 0:
-        success_percentage = (success_rate.successful / success_rate.total) * 100
+    # Served from the daily rollups instead of scanning UserInteraction
+    summary = summarize_daily_stats(session.exec(daily_stats_query(training_id)).all())
+    members = dict(session.exec(member_counts_query(training_id)).all())
     
     return {
         "training": {
@@ -240,15 +179,15 @@ def get_training_interaction_summary(
             "description": training.description
         },
         "summary": {
-            "total_interactions": total_interactions,
-            "unique_users": unique_users,
-            "unique_sessions": unique_sessions,
-            "average_response_time": float(avg_response_time) if avg_response_time else 0,
-            "success_percentage": round(success_percentage, 2)
+            "total_interactions": summary["total_interactions"],
+            "unique_users": members.get("user", 0),
+            "unique_sessions": members.get("session", 0),
+            "average_response_time": float(summary["average_response_time"]),
+            "success_percentage": round(summary["success_percentage"], 2)
         },
         "interaction_types": [
-            {"type": count.interaction_type, "count": count.count}
-            for count in interaction_counts
+            {"type": interaction_type, "count": count}
+            for interaction_type, count in summary["interaction_types"].items()
         ]
     }
 
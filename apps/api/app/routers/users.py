@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from pydantic import BaseModel
 from sqlmodel import Session, select
+from typing import Optional
+from sqlalchemy import delete
 from sqlalchemy.exc import IntegrityError
 import uuid
 from ..db import get_session
-from ..models import User, CompanyTraining, Company, Training, Asset, Style, Avatar
+from ..models import User, CompanyTraining, Company, TrainingAnalyticsMember
 from ..auth import hash_password, get_current_user, is_super_admin, check_same_company, is_admin
 from ..auth import check_company_access, can_manage_user
+from ..pagination import finish_page, keyset_page, page_limit
+from ..services import dashboard_stats
+from ..services.principal_cache import invalidate_principal
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -46,22 +51,27 @@ def redact(u: User) -> dict:
 
 @router.get("")
 def list_users(
+    response: Response,
+    after: Optional[str] = None,
+    limit: int = Depends(page_limit),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     if is_super_admin(current_user):
         # Süper admin tüm kullanıcıları görebilir
-        users = session.exec(select(User)).all()
+        query = select(User)
     elif is_admin(current_user):
         # Admin sadece kendi firmasındaki kullanıcıları görebilir
         if not current_user.company_id:
             raise HTTPException(400, "Admin user must be associated with a company")
-        users = session.exec(
-            select(User).where(User.company_id == current_user.company_id)
-        ).all()
+        query = select(User).where(User.company_id == current_user.company_id)
     else:
         # Normal kullanıcı sadece kendini görebilir
-        users = [current_user]
+        return [redact(current_user)]
+    
+    # Yeniden eskiye, (created_at, id) üzerinde keyset sayfalama
+    query = keyset_page(query, User.created_at, User.id, after, limit)
+    users = finish_page(session.exec(query).all(), limit, response)
     
     return [redact(u) for u in users]
 
@@ -173,6 +183,7 @@ def update_user(
     except IntegrityError:
         session.rollback()
         raise HTTPException(409, "Email already exists")
+    invalidate_principal(user.id)
     session.refresh(user)
     return redact(user)
 
@@ -198,8 +209,13 @@ def delete_user(
     if not is_admin(current_user):
         raise HTTPException(403, "Only admins can delete users")
     
+    # Eğitim analitiğindeki tekil kullanıcı sayıları da düşsün
+    session.execute(delete(TrainingAnalyticsMember).where(
+        (TrainingAnalyticsMember.kind == "user") & (TrainingAnalyticsMember.member_id == user_id)
+    ))
     session.delete(user)
     session.commit()
+    invalidate_principal(user_id)
     return {"ok": True}
 
 
@@ -344,46 +360,16 @@ def get_dashboard_statistics(
     
     if is_super_admin(current_user):
         # SuperAdmin can see all statistics
-        total_users = len(session.exec(select(User)).all())
-        total_trainings = len(session.exec(select(Training)).all())
-        total_assets = len(session.exec(select(Asset)).all())
-        total_styles = len(session.exec(select(Style)).all())
-        total_avatars = len(session.exec(select(Avatar)).all())
-    else:
-        # Admin can only see their company's statistics
-        if not current_user.company_id:
-            return {
-                "totalUsers": 0,
-                "totalTrainings": 0,
-                "totalAssets": 0,
-                "totalStyles": 0,
-                "totalAvatars": 0
-            }
-        
-        total_users = len(session.exec(
-            select(User).where(User.company_id == current_user.company_id)
-        ).all())
-        total_trainings = len(session.exec(
-            select(Training).where(Training.company_id == current_user.company_id)
-        ).all())
-        total_assets = len(session.exec(
-            select(Asset).where(Asset.company_id == current_user.company_id)
-        ).all())
-        total_styles = len(session.exec(
-            select(Style).where(Style.company_id == current_user.company_id)
-        ).all())
-        # Avatars: company avatars + default avatars
-        total_avatars = len(session.exec(
-            select(Avatar).where(
-                (Avatar.company_id == current_user.company_id) | 
-                (Avatar.is_default == True)
-            )
-        ).all())
-    
-    return {
-        "totalUsers": total_users,
-        "totalTrainings": total_trainings,
-        "totalAssets": total_assets,
-        "totalStyles": total_styles,
-        "totalAvatars": total_avatars
-    }
+        return dashboard_stats.get_dashboard_statistics(session)
+    
+    # Admin can only see their company's statistics
+    if not current_user.company_id:
+        return {
+            "totalUsers": 0,
+            "totalTrainings": 0,
+            "totalAssets": 0,
+            "totalStyles": 0,
+            "totalAvatars": 0
+        }
+    
+    return dashboard_stats.get_dashboard_statistics(session, current_user.company_id)
@@ -321,6 +321,7 @@ class InteractionMessageCreate(BaseModel):
 class InteractionMessageResponse(BaseModel):
     id: str
     session_id: str
+    section_id: Optional[str] = None
     message: str
     message_type: str
     llm_context_json: Optional[str] = None
@@ -0,0 +1,35 @@
+"""
+Batch Loader Service - liste endpoint'leri için toplu (IN / GROUP BY) ilişkili kayıt yükleme
+
+List endpoints first load their page of rows, then resolve every related table
+with one `WHERE id IN (...)` query (and per-parent counts with one `GROUP BY`)
+and join in memory, so the number of queries does not grow with the page size.
+"""
+
+from typing import Any, Dict, Iterable, Optional, Type, TypeVar
+
+from sqlmodel import Session, SQLModel, func, select
+
+ModelT = TypeVar("ModelT", bound=SQLModel)
+
+
+def load_by_ids(session: Session, model: Type[ModelT], ids: Iterable[Optional[str]]) -> Dict[str, ModelT]:
+    """Rows of `model` with the given primary keys, keyed by id (None ids are ignored)"""
+    wanted = {row_id for row_id in ids if row_id}
+    if not wanted:
+        return {}
+    return {row.id: row for row in session.exec(select(model).where(model.id.in_(wanted))).all()}
+
+
+def count_by(session: Session, column, keys: Iterable[Optional[Any]]) -> Dict[Any, int]:
+    """COUNT(*) of the rows of `column`'s table per value of `column`, restricted to `keys`
+
+    Keys without rows are absent from the result; read it with `.get(key, 0)`.
+    """
+    wanted = {key for key in keys if key is not None}
+    if not wanted:
+        return {}
+    rows = session.exec(
+        select(column, func.count()).where(column.in_(wanted)).group_by(column)
+    ).all()
+    return {key: count for key, count in rows}
@@ -0,0 +1,131 @@
+"""
+Cache Invalidation Service - process içi cache'lerin süreçler arası geçersiz kılınması (Redis pub/sub)
+
+In-process caches (e.g. the player manifest) are invalidated locally by the process
+that made the write, which is not the process serving reads when the write happens
+in another API worker or in the `app.worker` job process. Invalidations are
+therefore also published on CACHE_INVALIDATION_CHANNEL; every API process runs a
+listener that applies them to its own caches through the registered handlers.
+
+Publishing is best-effort: when Redis is unreachable the caches' TTLs still bound
+how long another process can serve stale data.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import time
+from typing import Any, Callable, Dict, Optional
+
+import redis
+import redis.asyncio as aioredis
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+CACHE_INVALIDATION_ENABLED = os.getenv("CACHE_INVALIDATION_ENABLED", "true").lower() == "true"
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "lxplayer:cache-invalidation")
+# After a failed publish, skip Redis for this long instead of blocking every write
+CACHE_INVALIDATION_RETRY_AFTER = float(os.getenv("CACHE_INVALIDATION_RETRY_AFTER", "30"))
+
+ORIGIN = f"{socket.gethostname()}-{os.getpid()}"
+
+InvalidationHandler = Callable[..., None]
+
+_handlers: Dict[str, InvalidationHandler] = {}
+_sync_redis: Optional[redis.Redis] = None
+_redis_unavailable_until = 0.0
+_listener_task: Optional[asyncio.Task] = None
+
+
+def register_invalidation_handler(cache: str, handler: InvalidationHandler) -> None:
+    """`handler(**keys)` drops the local entries of `cache` (must not publish again)"""
+    _handlers[cache] = handler
+
+
+def _get_sync_redis() -> redis.Redis:
+    global _sync_redis
+    if _sync_redis is None:
+        _sync_redis = redis.Redis.from_url(REDIS_URL, socket_connect_timeout=1, socket_timeout=2)
+    return _sync_redis
+
+
+def _publish(message: str) -> None:
+    global _redis_unavailable_until
+    try:
+        _get_sync_redis().publish(CACHE_INVALIDATION_CHANNEL, message)
+    except redis.RedisError as e:
+        _redis_unavailable_until = time.monotonic() + CACHE_INVALIDATION_RETRY_AFTER
+        print(f"⚠️  Cache invalidation publish failed, other workers rely on cache TTLs: {e}")
+
+
+def publish_invalidation(cache: str, **keys: Any) -> None:
+    """Tell the other processes to drop the entries of `cache` matching `keys`
+
+    Called from `async def` endpoints, the blocking publish runs in the default
+    executor (fire-and-forget) so a slow Redis never stalls the event loop.
+    """
+    if not CACHE_INVALIDATION_ENABLED or time.monotonic() < _redis_unavailable_until:
+        return
+    message = json.dumps({"origin": ORIGIN, "cache": cache, "keys": keys})
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _publish(message)  # threadpool endpoints and the job worker
+        return
+    loop.run_in_executor(None, _publish, message)
+
+
+def _apply(raw: str) -> None:
+    message = json.loads(raw)
+    if message.get("origin") == ORIGIN:
+        return  # Bu süreç kendi cache'ini zaten temizledi
+    handler = _handlers.get(message.get("cache"))
+    if handler is not None:
+        handler(**message.get("keys", {}))
+
+
+async def run_invalidation_listener() -> None:
+    """Apply invalidations published by other processes until cancelled"""
+    backoff = 1.0
+    while True:
+        client = aioredis.from_url(REDIS_URL, decode_responses=True, socket_connect_timeout=1)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+            backoff = 1.0
+            while True:
+                message = await pubsub.get_message(timeout=5.0)
+                if message is None:
+                    continue
+                try:
+                    _apply(message["data"])
+                except Exception as e:
+                    print(f"⚠️  Ignoring cache invalidation message: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Bağlantı koptuysa araya kaçan mesajlar için TTL'ler devrede
+            print(f"❌ Cache invalidation listener error, retrying in {backoff:.0f}s: {e}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+def start_invalidation_listener() -> None:
+    """Start the listener in this API process (application startup)"""
+    global _listener_task
+    if CACHE_INVALIDATION_ENABLED and _listener_task is None:
+        _listener_task = asyncio.create_task(run_invalidation_listener())
+
+
+async def stop_invalidation_listener() -> None:
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
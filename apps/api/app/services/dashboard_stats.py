@@ -0,0 +1,111 @@
+"""
+Dashboard Stats Service - yönetim paneli sayaçları için toplu COUNT sorgusu ve kısa süreli cache
+
+All five dashboard counters are computed for every company at once with a single
+UNION ALL of `COUNT(*) ... GROUP BY company_id` queries (one round trip, no rows
+loaded into Python). The per-company result is cached for DASHBOARD_STATS_CACHE_TTL
+seconds and serves both the SuperAdmin totals and each company admin's view.
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+from sqlalchemy import false, literal, union_all
+from sqlmodel import Session, func, select
+
+from app.models import Asset, Avatar, Style, Training, User
+
+DASHBOARD_STATS_CACHE_TTL = int(os.getenv("DASHBOARD_STATS_CACHE_TTL", "30"))
+
+_COUNTED_MODELS = {
+    "totalUsers": User,
+    "totalTrainings": Training,
+    "totalAssets": Asset,
+    "totalStyles": Style,
+}
+
+
+class CompanyCounts:
+    """COUNT(*) per company for each dashboard counter"""
+
+    def __init__(self):
+        # counter -> company_id (None for rows without a company) -> count
+        self.by_company: Dict[str, Dict[Optional[str], int]] = defaultdict(dict)
+        # avatars are split further by is_default: (company_id, is_default) -> count
+        self.avatars: Dict[tuple, int] = {}
+        self.created_at = time.monotonic()
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() - self.created_at < DASHBOARD_STATS_CACHE_TTL
+
+    def totals(self) -> Dict[str, int]:
+        stats = {name: sum(counts.values()) for name, counts in self.by_company.items()}
+        stats["totalAvatars"] = sum(self.avatars.values())
+        return stats
+
+    def for_company(self, company_id: str) -> Dict[str, int]:
+        stats = {name: counts.get(company_id, 0) for name, counts in self.by_company.items()}
+        # Company avatars + default avatars
+        stats["totalAvatars"] = sum(
+            count for (avatar_company_id, is_default), count in self.avatars.items()
+            if is_default or avatar_company_id == company_id
+        )
+        return stats
+
+
+_lock = threading.Lock()
+_cached: Optional[CompanyCounts] = None
+
+
+def _load_company_counts(session: Session) -> CompanyCounts:
+    queries = [
+        select(
+            literal(name).label("counter"),
+            model.company_id.label("company_id"),
+            false().label("is_default"),
+            func.count().label("total"),
+        ).group_by(model.company_id)
+        for name, model in _COUNTED_MODELS.items()
+    ]
+    queries.append(
+        select(
+            literal("totalAvatars").label("counter"),
+            Avatar.company_id.label("company_id"),
+            Avatar.is_default.label("is_default"),
+            func.count().label("total"),
+        ).group_by(Avatar.company_id, Avatar.is_default)
+    )
+
+    counts = CompanyCounts()
+    for name in _COUNTED_MODELS:
+        counts.by_company[name] = {}
+    for counter, company_id, is_default, total in session.execute(union_all(*queries)).all():
+        if counter == "totalAvatars":
+            counts.avatars[(company_id, bool(is_default))] = total
+        else:
+            counts.by_company[counter][company_id] = total
+    return counts
+
+
+def get_company_counts(session: Session) -> CompanyCounts:
+    """Per-company counters, served from cache while fresh"""
+    global _cached
+    with _lock:
+        cached = _cached
+    if cached is not None and cached.is_fresh():
+        return cached
+
+    counts = _load_company_counts(session)
+    with _lock:
+        _cached = counts
+    return counts
+
+
+def get_dashboard_statistics(session: Session, company_id: Optional[str] = None) -> Dict[str, int]:
+    """Dashboard counters for one company, or for the whole database when company_id is None"""
+    counts = get_company_counts(session)
+    return counts.totals() if company_id is None else counts.for_company(company_id)
+
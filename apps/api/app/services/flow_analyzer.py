@@ -3,7 +3,10 @@ Flow Analyzer Service - LLM'nin eğitim akışına karar vermesi için
 """
 
 import json
-from typing import Dict, List, Any, Optional
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Any, Optional, Set, FrozenSet
 from datetime import datetime
 from sqlmodel import Session, select
 
@@ -11,121 +14,133 @@ from app.models import Training, TrainingSection, InteractionSession, Interactio
 from app.schemas import LLMMessageResponse
 
 
-class FlowAnalyzer:
-    """Flow data'sını analiz ederek LLM'ye eğitim akışı önerileri sunar"""
+FLOW_CACHE_SIZE = int(os.getenv("FLOW_CACHE_SIZE", "256"))
+
+
+class CompiledFlow:
+    """ai_flow JSON'unun bir kez derlenmiş, indekslenmiş graf temsili
     
-    def __init__(self, db: Session):
-        self.db = db
+    Node/section indexes, adjacency lists, the priority-sorted outgoing paths of
+    every node, reachability sets and shortest distance (in edges) to the nearest
+    end node are all computed at compile time, so per-turn analysis is O(1)
+    lookups instead of scans over nodes and edges.
+    """
     
-    def analyze_flow(self, training_id: str, session_id: str) -> Dict[str, Any]:
-        """Flow data'sını analiz ederek mevcut durum ve önerileri döndürür"""
-        
-        # Training ve flow data'sını al
-        training = self.db.get(Training, training_id)
-        if not training or not training.ai_flow:
-            return self._get_default_flow()
-        
-        try:
-            flow_data = json.loads(training.ai_flow)
-        except json.JSONDecodeError:
-            return self._get_default_flow()
-        
-        # Session ve mevcut durumu al
-        session = self.db.get(InteractionSession, session_id)
-        if not session:
-            return self._get_default_flow()
-        
-        # Flow nodes ve edges'leri analiz et
-        nodes = flow_data.get('nodes', [])
-        edges = flow_data.get('edges', [])
-        
-        # Mevcut section'ı bul
-        current_section_id = session.current_section_id
-        current_node = self._find_current_node(nodes, current_section_id)
-        
-        # Olası sonraki adımları belirle
-        possible_paths = self._analyze_possible_paths(nodes, edges, current_node)
-        
-        # Kullanıcı progress'ini analiz et
-        user_progress = self._analyze_user_progress(session)
-        
-        # LLM önerileri oluştur
-        flow_recommendations = self._generate_flow_recommendations(
-            current_node, possible_paths, user_progress
-        )
-        
-        return {
-            "current_node": current_node,
-            "possible_paths": possible_paths,
-            "user_progress": user_progress,
-            "recommendations": flow_recommendations,
-            "flow_data": flow_data,
-            "session_context": {
-                "session_id": session_id,
-                "current_section_id": current_section_id,
-                "status": session.status,
-                "phase": session.current_phase,
-                "interactions_count": session.interactions_count,
-                "completion_percentage": session.completion_percentage
-            }
-        }
-    
-    def _find_current_node(self, nodes: List[Dict], current_section_id: Optional[str]) -> Optional[Dict]:
-        """Mevcut section'a karşılık gelen node'u bulur"""
-        if not current_section_id:
-            return self._find_start_node(nodes)
-        
-        for node in nodes:
-            if node.get('type') == 'sectionNode':
+    def __init__(self, flow_data: Dict[str, Any], source: Optional[str] = None):
+        self.flow_data = flow_data
+        self.source = source
+        self.nodes: List[Dict] = flow_data.get('nodes', []) or []
+        self.edges: List[Dict] = flow_data.get('edges', []) or []
+        
+        self.node_by_id: Dict[str, Dict] = {}
+        self.section_to_node: Dict[str, Dict] = {}
+        self.start_node: Optional[Dict] = None
+        self.end_node_ids: Set[str] = set()
+        for node in self.nodes:
+            node_id = node.get('id')
+            self.node_by_id.setdefault(node_id, node)
+            node_type = node.get('type')
+            if node_type == 'sectionNode':
                 data = node.get('data', {})
-                if data.get('sectionId') == current_section_id or data.get('section_id') == current_section_id:
-                    return node
-        
-        return self._find_start_node(nodes)
-    
-    def _find_start_node(self, nodes: List[Dict]) -> Optional[Dict]:
-        """Start node'u bulur"""
-        for node in nodes:
-            if node.get('type') == 'startNode':
-                return node
-        return None
+                for key in ('sectionId', 'section_id'):
+                    if data.get(key):
+                        self.section_to_node.setdefault(data[key], node)
+            elif node_type == 'startNode' and self.start_node is None:
+                self.start_node = node
+            elif node_type == 'endNode':
+                self.end_node_ids.add(node_id)
+        
+        # Adjacency lists (edge order korunur)
+        self.outgoing: Dict[str, List[Dict]] = {}
+        self.incoming: Dict[str, List[str]] = {}
+        for edge in self.edges:
+            source_id = edge.get('source')
+            target_id = edge.get('target')
+            self.outgoing.setdefault(source_id, []).append(edge)
+            self.incoming.setdefault(target_id, []).append(source_id)
+        
+        self.paths_by_node: Dict[str, List[Dict]] = {
+            node_id: self._build_paths(node_id) for node_id in self.node_by_id
+        }
+        self.distance_to_end: Dict[str, int] = self._build_distance_to_end()
+        self.reachable: Dict[str, FrozenSet[str]] = {
+            node_id: self._build_reachable(node_id) for node_id in self.node_by_id
+        }
     
-    def _analyze_possible_paths(self, nodes: List[Dict], edges: List[Dict], current_node: Optional[Dict]) -> List[Dict]:
-        """Mevcut node'dan gidilebilecek olası yolları analiz eder"""
-        if not current_node:
-            return []
-        
-        current_id = current_node.get('id')
+    def _build_paths(self, node_id: str) -> List[Dict]:
+        """Node'dan çıkan yolları priority'ye göre sıralı döndürür"""
         possible_paths = []
-        
-        # Mevcut node'dan çıkan edge'leri bul
-        for edge in edges:
-            if edge.get('source') == current_id:
-                target_id = edge.get('target')
-                target_node = self._find_node_by_id(nodes, target_id)
-                
-                if target_node:
-                    path_info = {
-                        "target_node": target_node,
-                        "edge": edge,
-                        "priority": self._calculate_path_priority(target_node, edge),
-                        "conditions": self._extract_conditions(edge)
-                    }
-                    possible_paths.append(path_info)
+        for edge in self.outgoing.get(node_id, []):
+            target_node = self.node_by_id.get(edge.get('target'))
+            if target_node:
+                possible_paths.append({
+                    "target_node": target_node,
+                    "edge": edge,
+                    "priority": self._calculate_path_priority(target_node, edge),
+                    "conditions": self._extract_conditions(edge)
+                })
         
         # Priority'ye göre sırala
         possible_paths.sort(key=lambda x: x['priority'], reverse=True)
-        
         return possible_paths
     
-    def _find_node_by_id(self, nodes: List[Dict], node_id: str) -> Optional[Dict]:
-        """ID'ye göre node bulur"""
-        for node in nodes:
-            if node.get('id') == node_id:
-                return node
-        return None
+    def _build_distance_to_end(self) -> Dict[str, int]:
+        """Tüm end node'lardan geriye doğru BFS ile en kısa mesafe"""
+        distances = {node_id: 0 for node_id in self.end_node_ids}
+        queue = deque(self.end_node_ids)
+        while queue:
+            node_id = queue.popleft()
+            for source_id in self.incoming.get(node_id, []):
+                if source_id not in distances and source_id in self.node_by_id:
+                    distances[source_id] = distances[node_id] + 1
+                    queue.append(source_id)
+        return distances
+    
+    def _build_reachable(self, node_id: str) -> FrozenSet[str]:
+        seen: Set[str] = set()
+        queue = deque([node_id])
+        while queue:
+            current_id = queue.popleft()
+            for edge in self.outgoing.get(current_id, []):
+                target_id = edge.get('target')
+                if target_id in self.node_by_id and target_id not in seen:
+                    seen.add(target_id)
+                    queue.append(target_id)
+        return frozenset(seen)
+    
+    def find_current_node(self, current_section_id: Optional[str]) -> Optional[Dict]:
+        """Mevcut section'a karşılık gelen node'u, yoksa start node'u döndürür"""
+        if current_section_id and current_section_id in self.section_to_node:
+            return self.section_to_node[current_section_id]
+        return self.start_node
+    
+    def possible_paths(self, node: Optional[Dict]) -> List[Dict]:
+        if not node:
+            return []
+        return list(self.paths_by_node.get(node.get('id'), []))
     
-    def _calculate_path_priority(self, target_node: Dict, edge: Dict) -> int:
+    def flow_position(self, node: Optional[Dict]) -> Dict[str, Any]:
+        """Node'un graf üzerindeki konumu ve mesafeye dayalı tamamlanma tahmini"""
+        node_id = node.get('id') if node else None
+        distance = self.distance_to_end.get(node_id)
+        start_id = self.start_node.get('id') if self.start_node else None
+        start_distance = self.distance_to_end.get(start_id)
+        
+        estimated_completion = None
+        if distance is not None and start_distance:
+            estimated_completion = round(max(0.0, 1 - distance / start_distance) * 100, 1)
+        
+        return {
+            "node_id": node_id,
+            "distance_to_end": distance,
+            "start_distance_to_end": start_distance,
+            "reachable_nodes": len(self.reachable.get(node_id, ())),
+            "can_reach_end": distance is not None,
+            "estimated_completion_percentage": estimated_completion
+        }
+    
+    @staticmethod
+    def _calculate_path_priority(target_node: Dict, edge: Dict) -> int:
         """Path priority'sini hesaplar"""
         priority = 50  # Base priority
         
@@ -149,7 +164,8 @@ class FlowAnalyzer:
         
         return priority
     
-    def _extract_conditions(self, edge: Dict) -> List[str]:
+    @staticmethod
+    def _extract_conditions(edge: Dict) -> List[str]:
         """Edge'den condition'ları çıkarır"""
         conditions = []
         edge_data = edge.get('data', {})
@@ -161,6 +177,99 @@ class FlowAnalyzer:
             conditions.append(f"Label: {edge_data['label']}")
         
         return conditions
+
+
+_compiled_lock = threading.Lock()
+_compiled_flows: "OrderedDict[str, CompiledFlow]" = OrderedDict()
+
+
+def compile_training_flow(training: Optional[Training]) -> Optional[CompiledFlow]:
+    """Training'in ai_flow'unu derler; sonuç ai_flow içeriği değişene kadar önbellekte tutulur"""
+    if not training or not training.ai_flow:
+        return None
+    
+    with _compiled_lock:
+        cached = _compiled_flows.get(training.id)
+        if cached is not None and cached.source == training.ai_flow:
+            _compiled_flows.move_to_end(training.id)
+            return cached
+    
+    try:
+        flow_data = json.loads(training.ai_flow)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(flow_data, dict):
+        return None
+    
+    compiled = CompiledFlow(flow_data, source=training.ai_flow)
+    with _compiled_lock:
+        _compiled_flows[training.id] = compiled
+        _compiled_flows.move_to_end(training.id)
+        while len(_compiled_flows) > FLOW_CACHE_SIZE:
+            _compiled_flows.popitem(last=False)
+    return compiled
+
+
+class FlowAnalyzer:
+    """Flow data'sını analiz ederek LLM'ye eğitim akışı önerileri sunar"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def analyze_flow(self, training_id: str, session_id: str) -> Dict[str, Any]:
+        """Flow data'sını analiz ederek mevcut durum ve önerileri döndürür"""
+        
+        # Training ve derlenmiş flow'u al
+        training = self.db.get(Training, training_id)
+        flow = compile_training_flow(training)
+        if flow is None:
+            return self._get_default_flow()
+        
+        # Session ve mevcut durumu al
+        session = self.db.get(InteractionSession, session_id)
+        if not session:
+            return self._get_default_flow()
+        
+        return self.analyze_session_flow(flow, session)
+    
+    def analyze_session_flow(self, flow: Optional[CompiledFlow], session: InteractionSession) -> Dict[str, Any]:
+        """Derlenmiş flow ile session için flow analizi yapar"""
+        if flow is None:
+            return self._get_default_flow()
+        
+        session_id = session.id
+        
+        # Mevcut section'ı bul
+        current_section_id = session.current_section_id
+        current_node = flow.find_current_node(current_section_id)
+        
+        # Olası sonraki adımları belirle
+        possible_paths = flow.possible_paths(current_node)
+        
+        # Kullanıcı progress'ini analiz et
+        user_progress = self._analyze_user_progress(session)
+        
+        # LLM önerileri oluştur
+        flow_recommendations = self._generate_flow_recommendations(
+            current_node, possible_paths, user_progress
+        )
+        
+        return {
+            "current_node": current_node,
+            "possible_paths": possible_paths,
+            "user_progress": user_progress,
+            "recommendations": flow_recommendations,
+            "flow_data": flow.flow_data,
+            "flow_position": flow.flow_position(current_node),
+            "session_context": {
+                "session_id": session_id,
+                "current_section_id": current_section_id,
+                "status": session.status,
+                "phase": session.current_phase,
+                "interactions_count": session.interactions_count,
+                "completion_percentage": session.completion_percentage
+            }
+        }
     
     def _analyze_user_progress(self, session: InteractionSession) -> Dict[str, Any]:
         """Kullanıcı progress'ini analiz eder"""
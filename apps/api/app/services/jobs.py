@@ -0,0 +1,281 @@
+"""
+Jobs Service - uzun süren medya/AI işleri için Postgres tabanlı arka plan iş kuyruğu
+
+Endpoints that used to run multi-minute work (transcription, dubbing, video
+generation) inside the HTTP request now validate their input, insert a Job row and
+return its id immediately. Worker tasks claim queued jobs with
+`FOR UPDATE SKIP LOCKED`, run the registered handler in a thread (handlers are
+plain sync functions: ffmpeg, provider SDKs, sync HTTP clients) and store the
+result or error on the row. Clients poll GET /jobs/{id} or follow
+GET /jobs/{id}/events (SSE).
+
+Workers run in the dedicated `python -m app.worker` process, so API workers stay
+free for interactive traffic (JOB_WORKER_IN_API=true also runs them inside the API,
+e.g. for local development). Running jobs send heartbeats; a job whose worker died
+is re-queued after JOB_STALE_AFTER seconds, up to JOB_MAX_ATTEMPTS attempts.
+"""
+
+import asyncio
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import text, update
+from sqlmodel import Session
+
+from app.db import async_session_maker, engine
+from app.models import Job
+
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))
+JOB_WORKER_IN_API = os.getenv("JOB_WORKER_IN_API", "false").lower() == "true"
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "15"))
+JOB_STALE_AFTER = int(os.getenv("JOB_STALE_AFTER", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+# On shutdown, running jobs get this long to finish before their workers are cancelled
+JOB_SHUTDOWN_GRACE = float(os.getenv("JOB_SHUTDOWN_GRACE", "60"))
+
+TERMINAL_STATUSES = {"succeeded", "failed"}
+
+JOB_HANDLERS: Dict[str, Callable[["JobContext", Dict[str, Any]], Any]] = {}
+
+_worker_tasks: List[asyncio.Task] = []
+_stopping = False
+
+
+def job_handler(kind: str):
+    """Register a sync function `(ctx, payload) -> result` as the handler of a job kind"""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+class JobContext:
+    """Handler'a verilen bağlam: veritabanı oturumu ve ilerleme bildirimi"""
+
+    def __init__(self, job_id: str, attempt: int = 0):
+        self.job_id = job_id
+        self.attempt = attempt
+
+    @contextmanager
+    def session(self) -> Iterator[Session]:
+        with Session(engine) as session:
+            yield session
+
+    def report_progress(self, progress: float, message: Optional[str] = None) -> None:
+        with Session(engine) as session:
+            session.execute(
+                _claimed_by(update(Job), self.job_id, self.attempt)
+                .values(
+                    progress=max(0.0, min(progress, 1.0)),
+                    progress_message=message,
+                    heartbeat_at=datetime.utcnow()
+                )
+            )
+            session.commit()
+
+
+def enqueue_job(session: Session, kind: str, payload: Dict[str, Any], user_id: Optional[str] = None) -> Job:
+    """Queue a job and return its row (commits)"""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = Job(kind=kind, payload_json=json.dumps(jsonable_encoder(payload)), user_id=user_id)
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    print(f"📥 Job queued: {kind} ({job.id})")
+    return job
+
+
+def record_completed_job(session: Session, kind: str, payload: Dict[str, Any], result: Any, user_id: Optional[str] = None) -> Job:
+    """Store an already-known result (e.g. a cache hit) as a succeeded job, so clients get it without waiting"""
+    now = datetime.utcnow()
+    job = Job(
+        kind=kind,
+        status="succeeded",
+        payload_json=json.dumps(jsonable_encoder(payload)),
+        result_json=json.dumps(jsonable_encoder(result), ensure_ascii=False),
+        progress=1.0,
+        user_id=user_id,
+        started_at=now,
+        finished_at=now
+    )
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def job_status(job: Job) -> Dict[str, Any]:
+    """Public representation of a job (GET /jobs/{id}, SSE events, enqueue responses)"""
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "progress_message": job.progress_message,
+        "result": json.loads(job.result_json) if job.result_json else None,
+        "error": job.error,
+        "error_status": job.error_status,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+# Worker
+
+CLAIM_SQL = text("""
+    UPDATE job
+    SET status = 'running', attempts = attempts + 1, started_at = :now, heartbeat_at = :now
+    WHERE id = (
+        SELECT id FROM job
+        WHERE status = 'queued'
+        ORDER BY created_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, kind, payload_json, attempts
+""")
+
+REQUEUE_STALE_SQL = text("""
+    UPDATE job
+    SET status = CASE WHEN attempts < :max_attempts THEN 'queued' ELSE 'failed' END,
+        error = CASE WHEN attempts < :max_attempts THEN error ELSE 'Job worker stopped responding' END,
+        error_status = CASE WHEN attempts < :max_attempts THEN error_status ELSE 500 END,
+        finished_at = CASE WHEN attempts < :max_attempts THEN NULL ELSE :now END
+    WHERE status = 'running' AND heartbeat_at < :stale_before
+    RETURNING id, status
+""")
+
+
+def _claimed_by(stmt, job_id: str, attempt: int):
+    """Restrict a job UPDATE to our claim: once the stale monitor re-queued the job (and
+    another worker may have re-run it), this worker's writes must not land"""
+    return stmt.where(Job.id == job_id, Job.status == "running", Job.attempts == attempt)
+
+
+async def _update_job(job_id: str, attempt: int, **values) -> bool:
+    async with async_session_maker() as db:
+        result = await db.execute(_claimed_by(update(Job), job_id, attempt).values(**values))
+        await db.commit()
+    return result.rowcount > 0
+
+
+async def _heartbeat(job_id: str, attempt: int) -> None:
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+        try:
+            await _update_job(job_id, attempt, heartbeat_at=datetime.utcnow())
+        except Exception as e:
+            print(f"⚠️  Job heartbeat failed ({job_id}): {e}")
+
+
+async def execute_job(job_id: str, kind: str, payload_json: str, attempt: int) -> None:
+    """Run a claimed job's handler in a thread and store its outcome"""
+    heartbeat = asyncio.create_task(_heartbeat(job_id, attempt))
+    try:
+        handler = JOB_HANDLERS.get(kind)
+        if handler is None:
+            raise RuntimeError(f"No handler registered for job kind '{kind}'")
+        result = await asyncio.to_thread(handler, JobContext(job_id, attempt), json.loads(payload_json))
+        outcome = {
+            "status": "succeeded",
+            "progress": 1.0,
+            "result_json": json.dumps(jsonable_encoder(result), ensure_ascii=False),
+        }
+        print(f"✅ Job succeeded: {kind} ({job_id})")
+    except HTTPException as e:
+        outcome = {"status": "failed", "error": str(e.detail), "error_status": e.status_code}
+        print(f"❌ Job failed: {kind} ({job_id}): {e.detail}")
+    except Exception as e:
+        outcome = {"status": "failed", "error": str(e), "error_status": 500}
+        print(f"❌ Job failed: {kind} ({job_id}): {e}")
+    finally:
+        heartbeat.cancel()
+
+    if not await _update_job(job_id, attempt, finished_at=datetime.utcnow(), **outcome):
+        print(f"⚠️  Job {job_id} was re-queued while attempt {attempt} ran; its outcome is discarded")
+
+
+async def claim_next_job() -> Optional[tuple]:
+    async with async_session_maker() as db:
+        claimed = (await db.execute(CLAIM_SQL, {"now": datetime.utcnow()})).first()
+        await db.commit()
+    return tuple(claimed) if claimed else None
+
+
+async def run_job_worker() -> None:
+    """Claim and execute queued jobs one at a time until stopped"""
+    while not _stopping:
+        try:
+            claimed = await claim_next_job()
+            if claimed is None:
+                await asyncio.sleep(JOB_POLL_INTERVAL)
+                continue
+            job_id, kind, payload_json, attempt = claimed
+            print(f"⚙️  Job started: {kind} ({job_id}, attempt {attempt})")
+            await execute_job(job_id, kind, payload_json, attempt)
+        except asyncio.CancelledError:
+            # A job interrupted here stays 'running' and is re-queued once its heartbeat is stale
+            raise
+        except Exception as e:
+            print(f"❌ Job worker error: {e}")
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+
+async def requeue_stale_jobs() -> List[tuple]:
+    now = datetime.utcnow()
+    async with async_session_maker() as db:
+        rows = (await db.execute(REQUEUE_STALE_SQL, {
+            "max_attempts": JOB_MAX_ATTEMPTS,
+            "now": now,
+            "stale_before": now - timedelta(seconds=JOB_STALE_AFTER),
+        })).all()
+        await db.commit()
+    return [tuple(row) for row in rows]
+
+
+async def run_stale_job_monitor() -> None:
+    while True:
+        await asyncio.sleep(max(JOB_STALE_AFTER / 2, 1))
+        try:
+            for job_id, status in await requeue_stale_jobs():
+                print(f"🔁 Stale job {job_id} -> {status}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Stale job check failed: {e}")
+
+
+def start_job_workers(concurrency: int = JOB_WORKER_CONCURRENCY) -> None:
+    """Start `concurrency` worker tasks plus the stale job monitor in this process"""
+    global _stopping
+    if _worker_tasks or concurrency <= 0:
+        return
+    _stopping = False
+    _worker_tasks.append(asyncio.create_task(run_stale_job_monitor()))
+    for _ in range(concurrency):
+        _worker_tasks.append(asyncio.create_task(run_job_worker()))
+    print(f"⚙️  Job workers started: {concurrency}")
+
+
+async def stop_job_workers() -> None:
+    """Stop claiming jobs, let running ones finish within JOB_SHUTDOWN_GRACE, then cancel"""
+    global _stopping
+    _stopping = True
+    if _worker_tasks:
+        await asyncio.wait(_worker_tasks[1:] or _worker_tasks, timeout=JOB_SHUTDOWN_GRACE)
+    for task in _worker_tasks:
+        task.cancel()
+    for task in _worker_tasks:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    _worker_tasks.clear()
@@ -0,0 +1,109 @@
+"""
+LLM Context Cache Service - etkileşim oturumları için statik LLM context önbelleği
+
+The training, its sections, the avatar and the compiled ai_flow do not change
+between chat turns, so they are built once per (session, content version) and
+reused; only the message window and session progress are read per turn.
+
+The content version comes from the database: Training.content_version, bumped
+with `bump_training_content_version` in the same transaction as every edit of
+the training or its sections, plus the avatar's updated_at. Each turn reads it
+with one primary-key query, so an edit made through any worker or process is
+seen on the next turn. `invalidate_llm_contexts` only frees local entries early;
+LLM_CONTEXT_CACHE_TTL bounds how long an idle entry is kept.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlmodel import Session
+
+from app.models import Training
+from app.services.flow_analyzer import CompiledFlow
+
+LLM_CONTEXT_CACHE_TTL = int(os.getenv("LLM_CONTEXT_CACHE_TTL", "600"))
+LLM_CONTEXT_CACHE_SIZE = int(os.getenv("LLM_CONTEXT_CACHE_SIZE", "1024"))
+
+
+class StaticLLMContext:
+    """Turn-independent part of an interaction session's LLM context"""
+
+    def __init__(
+        self,
+        training: Dict[str, Any],
+        avatar: Dict[str, Any],
+        sections: List[Dict[str, Any]],
+        flow: Optional[CompiledFlow],
+        avatar_id: Optional[str] = None,
+    ):
+        self.training = training
+        self.avatar = avatar
+        self.sections = sections
+        self.sections_by_id = {section["id"]: section for section in sections}
+        self.flow = flow
+        self.avatar_id = avatar_id
+        self.created_at = time.monotonic()
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() - self.created_at < LLM_CONTEXT_CACHE_TTL
+
+
+ContentVersion = Tuple[Any, ...]
+
+_lock = threading.Lock()
+# session_id -> (training_id, content_version, context)
+_contexts: "OrderedDict[str, Tuple[str, ContentVersion, StaticLLMContext]]" = OrderedDict()
+
+
+def bump_training_content_version(session: Session, training_id: str) -> None:
+    """Mark the training's LLM context stale in every process (caller commits)"""
+    session.execute(
+        update(Training)
+        .where(Training.id == training_id)
+        .values(content_version=Training.content_version + 1)
+    )
+
+
+def get_cached_llm_context(session_id: str, training_id: str, version: ContentVersion) -> Optional[StaticLLMContext]:
+    """Return the cached static context if it was built against `version`"""
+    with _lock:
+        entry = _contexts.get(session_id)
+        if entry is None:
+            return None
+        cached_training_id, cached_version, context = entry
+        if cached_training_id != training_id or cached_version != version or not context.is_fresh():
+            del _contexts[session_id]
+            return None
+        _contexts.move_to_end(session_id)
+        return context
+
+
+def store_llm_context(session_id: str, training_id: str, version: ContentVersion, context: StaticLLMContext) -> None:
+    """Cache a static context built against `version` of the training"""
+    with _lock:
+        _contexts[session_id] = (training_id, version, context)
+        _contexts.move_to_end(session_id)
+        while len(_contexts) > LLM_CONTEXT_CACHE_SIZE:
+            _contexts.popitem(last=False)
+
+
+def invalidate_llm_contexts(
+    *,
+    training_id: Optional[str] = None,
+    avatar_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> None:
+    """Drop this process's cached contexts affected by an edit to a training, avatar or session"""
+    with _lock:
+        stale = [
+            key for key, (cached_training_id, _, context) in _contexts.items()
+            if key == session_id
+            or cached_training_id == training_id
+            or (avatar_id and context.avatar_id == avatar_id)
+        ]
+        for key in stale:
+            del _contexts[key]
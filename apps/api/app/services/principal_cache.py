@@ -0,0 +1,79 @@
+"""
+Principal Cache Service - doğrulanmış kullanıcı (principal) için kısa süreli process içi cache
+
+`get_current_user` resolves the token subject to the User row (role, company_id)
+and its Company once per PRINCIPAL_CACHE_TTL seconds instead of on every request.
+Entries are snapshots: every hit returns fresh, detached model instances, so an
+endpoint that mutates `current_user` cannot corrupt the cache. Writes to a user
+(users.update_user / delete_user) or a company drop the affected entries.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.models import Company, User
+
+# Explicit invalidation only reaches the worker that handled the write, so the TTL
+# bounds how long other workers may keep an outdated role or company.
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
+
+class CachedPrincipal:
+    """Serialize edilmiş kullanıcı ve şirket kaydı"""
+
+    def __init__(self, user: User, company: Optional[Company]):
+        self.user_data = user.model_dump()
+        self.company_data = company.model_dump() if company else None
+        self.cached_at = time.monotonic()
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() - self.cached_at < PRINCIPAL_CACHE_TTL
+
+    def user(self) -> User:
+        return User.model_validate(self.user_data)
+
+    def company(self) -> Optional[Company]:
+        return Company.model_validate(self.company_data) if self.company_data else None
+
+
+_lock = threading.Lock()
+_principals: Dict[str, CachedPrincipal] = {}  # token subject (user id) -> principal
+
+
+def get_principal(user_id: str) -> Optional[Tuple[User, Optional[Company]]]:
+    """Cached (user, company) for a token subject, None on a miss"""
+    with _lock:
+        cached = _principals.get(user_id)
+    if cached is None or not cached.is_fresh():
+        return None
+    return cached.user(), cached.company()
+
+
+def store_principal(user: User, company: Optional[Company]) -> None:
+    if PRINCIPAL_CACHE_TTL <= 0:
+        return
+    principal = CachedPrincipal(user, company)
+    with _lock:
+        if len(_principals) >= PRINCIPAL_CACHE_MAX_ENTRIES:
+            # Drop expired entries first, then the oldest ones
+            for key in [key for key, value in _principals.items() if not value.is_fresh()]:
+                del _principals[key]
+            while len(_principals) >= PRINCIPAL_CACHE_MAX_ENTRIES:
+                del _principals[next(iter(_principals))]
+        _principals[user.id] = principal
+
+
+def invalidate_principal(user_id: str) -> None:
+    """Kullanıcı güncellendi/silindi: cache'ten çıkar"""
+    with _lock:
+        _principals.pop(user_id, None)
+
+
+def invalidate_company_principals(company_id: str) -> None:
+    """Şirket güncellendi/silindi: o şirketin tüm kullanıcılarını cache'ten çıkar"""
+    with _lock:
+        for key in [key for key, value in _principals.items() if value.user_data.get("company_id") == company_id]:
+            del _principals[key]
@@ -0,0 +1,263 @@
+"""
+Provider Clients Service - dış sağlayıcılar (OpenAI, ElevenLabs, Luma, HeyGen) için paylaşılan HTTP istemcileri
+
+Each provider gets one long-lived httpx client per flavour (async for `async def`
+endpoints, sync for threadpool endpoints) so TCP/TLS connections are reused across
+requests. Each client's transport holds a semaphore of `max_concurrency` slots: a
+request takes a slot before it is sent and returns it when its response body is
+closed, so once `max_concurrency` requests are in flight further calls wait (up to
+the pool timeout) instead of opening new ones. The cap is enforced per request rather
+than through the connection limit because HTTP/2 multiplexes any number of requests
+over a single connection.
+
+Clients are created lazily and closed from the application shutdown hook.
+"""
+
+import asyncio
+import importlib.util
+import os
+import threading
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional
+
+import httpx
+
+
+@dataclass(frozen=True)
+class ProviderConfig:
+    timeout: float
+    connect_timeout: float
+    max_concurrency: int
+
+
+def _provider_config(name: str, timeout: float, max_concurrency: int) -> ProviderConfig:
+    prefix = name.upper()
+    return ProviderConfig(
+        timeout=float(os.getenv(f"{prefix}_HTTP_TIMEOUT", str(timeout))),
+        connect_timeout=float(os.getenv(f"{prefix}_HTTP_CONNECT_TIMEOUT", "10")),
+        max_concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", str(max_concurrency))),
+    )
+
+
+PROVIDERS: Dict[str, ProviderConfig] = {
+    "openai": _provider_config("openai", timeout=120, max_concurrency=16),
+    "elevenlabs": _provider_config("elevenlabs", timeout=60, max_concurrency=8),
+    "luma": _provider_config("luma", timeout=120, max_concurrency=4),
+    "heygen": _provider_config("heygen", timeout=120, max_concurrency=4),
+}
+
+PROVIDER_POOL_TIMEOUT = float(os.getenv("PROVIDER_POOL_TIMEOUT", "30"))
+PROVIDER_KEEPALIVE_EXPIRY = float(os.getenv("PROVIDER_KEEPALIVE_EXPIRY", "60"))
+
+# HTTP/2 needs the optional `h2` package (httpx[http2]); fall back to HTTP/1.1 without it
+HTTP2_ENABLED = (
+    os.getenv("PROVIDER_HTTP2", "true").lower() == "true"
+    and importlib.util.find_spec("h2") is not None
+)
+
+_lock = threading.Lock()
+_async_clients: Dict[str, httpx.AsyncClient] = {}
+_sync_clients: Dict[str, httpx.Client] = {}
+_openai_clients: Dict[tuple, object] = {}
+
+
+# Concurrency limiting transports
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body that gives the request's slot back when it is closed"""
+
+    def __init__(self, stream: httpx.SyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+def _once(func: Callable[[], None]) -> Callable[[], None]:
+    called = threading.Event()
+
+    def wrapper() -> None:
+        if not called.is_set():
+            called.set()
+            func()
+    return wrapper
+
+
+class LimitedTransport(httpx.BaseTransport):
+    """Caps in-flight requests of a sync client at `max_concurrency`"""
+
+    def __init__(self, transport: httpx.BaseTransport, max_concurrency: int):
+        self._transport = transport
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not self._slots.acquire(timeout=PROVIDER_POOL_TIMEOUT):
+            raise httpx.PoolTimeout("Provider concurrency limit reached", request=request)
+        release = _once(self._slots.release)
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            release()
+            raise
+        response.stream = _ReleasingStream(response.stream, release)
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class AsyncLimitedTransport(httpx.AsyncBaseTransport):
+    """Caps in-flight requests of an async client at `max_concurrency`"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_concurrency: int):
+        self._transport = transport
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=PROVIDER_POOL_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise httpx.PoolTimeout("Provider concurrency limit reached", request=request)
+        release = _once(self._slots.release)
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            release()
+            raise
+        response.stream = _AsyncReleasingStream(response.stream, release)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def _client_options(provider: str) -> dict:
+    config = PROVIDERS[provider]
+    return {
+        "timeout": httpx.Timeout(
+            config.timeout,
+            connect=config.connect_timeout,
+            pool=PROVIDER_POOL_TIMEOUT,
+        ),
+        "follow_redirects": True,
+    }
+
+
+def _transport_options(provider: str) -> dict:
+    config = PROVIDERS[provider]
+    return {
+        "limits": httpx.Limits(
+            max_connections=config.max_concurrency,
+            max_keepalive_connections=config.max_concurrency,
+            keepalive_expiry=PROVIDER_KEEPALIVE_EXPIRY,
+        ),
+        "http2": HTTP2_ENABLED,
+    }
+
+
+def get_async_http_client(provider: str) -> httpx.AsyncClient:
+    """Shared async client for `provider`; do not close it at the call site"""
+    client = _async_clients.get(provider)
+    if client is None or client.is_closed:
+        with _lock:
+            client = _async_clients.get(provider)
+            if client is None or client.is_closed:
+                transport = AsyncLimitedTransport(
+                    httpx.AsyncHTTPTransport(**_transport_options(provider)),
+                    PROVIDERS[provider].max_concurrency,
+                )
+                client = httpx.AsyncClient(transport=transport, **_client_options(provider))
+                _async_clients[provider] = client
+    return client
+
+
+def get_sync_http_client(provider: str) -> httpx.Client:
+    """Shared sync client for `provider`, for use from threadpool (`def`) endpoints"""
+    client = _sync_clients.get(provider)
+    if client is None or client.is_closed:
+        with _lock:
+            client = _sync_clients.get(provider)
+            if client is None or client.is_closed:
+                transport = LimitedTransport(
+                    httpx.HTTPTransport(**_transport_options(provider)),
+                    PROVIDERS[provider].max_concurrency,
+                )
+                client = httpx.Client(transport=transport, **_client_options(provider))
+                _sync_clients[provider] = client
+    return client
+
+
+def get_async_openai(api_key: Optional[str] = None):
+    """AsyncOpenAI bound to the shared OpenAI pool, or None when no API key is configured"""
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+
+    key = ("async", api_key)
+    client = _openai_clients.get(key)
+    if client is None:
+        from openai import AsyncOpenAI
+
+        with _lock:
+            client = _openai_clients.get(key)
+            if client is None:
+                client = AsyncOpenAI(api_key=api_key, http_client=get_async_http_client("openai"))
+                _openai_clients[key] = client
+    return client
+
+
+def get_openai(api_key: Optional[str] = None):
+    """Sync OpenAI client bound to the shared OpenAI pool, or None when no API key is configured"""
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+
+    key = ("sync", api_key)
+    client = _openai_clients.get(key)
+    if client is None:
+        from openai import OpenAI
+
+        with _lock:
+            client = _openai_clients.get(key)
+            if client is None:
+                client = OpenAI(api_key=api_key, http_client=get_sync_http_client("openai"))
+                _openai_clients[key] = client
+    return client
+
+
+async def close_provider_clients() -> None:
+    """Close every pooled provider connection (application shutdown)"""
+    with _lock:
+        async_clients = list(_async_clients.values())
+        sync_clients = list(_sync_clients.values())
+        _async_clients.clear()
+        _sync_clients.clear()
+        _openai_clients.clear()
+
+    for client in async_clients:
+        await client.aclose()
+    for client in sync_clients:
+        client.close()
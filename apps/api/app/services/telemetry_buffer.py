@@ -0,0 +1,364 @@
+"""
+Telemetry Buffer Service - oyuncu telemetrisi için Redis stream tabanlı write-behind tamponu
+
+UserInteraction, ChatMessage and InteractionLog rows are appended to a Redis stream
+on the request path and written to Postgres later by a background flusher that
+drains the stream in large batches. Delivery is at-least-once: entries are only
+acknowledged after their batch commits, entries left pending by a failed flush or a
+dead worker are re-claimed after TELEMETRY_CLAIM_IDLE_MS, and redelivered events are
+deduplicated on their event id (the row primary key, fixed when the event is queued)
+with INSERT ... ON CONFLICT DO NOTHING. Side effects (training progress counters,
+session last activity) are applied only for rows that were actually inserted.
+
+When Redis is disabled or unreachable, `enqueue_records` returns False and callers
+write through `persist_records` on the request path instead.
+
+Every buffered table references interactionsession.id, so events for unknown sessions
+(e.g. ids of the legacy `session` table) are rejected when they are queued, and any
+that still reach the stream are dead-lettered before their batch is inserted.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple, Type
+
+import redis
+import redis.asyncio as aioredis
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlmodel import Session, SQLModel, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db import async_session_maker
+from app.models import ChatMessage, InteractionLog, InteractionSession, UserInteraction
+from app.services.training_analytics import mark_rollups_dirty
+from app.services.training_progress import apply_events_to_progress
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+TELEMETRY_WRITE_BEHIND = os.getenv("TELEMETRY_WRITE_BEHIND", "true").lower() == "true"
+TELEMETRY_STREAM = os.getenv("TELEMETRY_STREAM", "lxplayer:telemetry")
+TELEMETRY_DEAD_LETTER_STREAM = f"{TELEMETRY_STREAM}:dead"
+TELEMETRY_CONSUMER_GROUP = os.getenv("TELEMETRY_CONSUMER_GROUP", "telemetry-flusher")
+TELEMETRY_FLUSH_BATCH_SIZE = int(os.getenv("TELEMETRY_FLUSH_BATCH_SIZE", "1000"))
+TELEMETRY_FLUSH_BLOCK_MS = int(os.getenv("TELEMETRY_FLUSH_BLOCK_MS", "1000"))
+TELEMETRY_CLAIM_IDLE_MS = int(os.getenv("TELEMETRY_CLAIM_IDLE_MS", "60000"))
+# After a failed Redis call, write directly to Postgres for this long before retrying Redis
+TELEMETRY_REDIS_RETRY_AFTER = float(os.getenv("TELEMETRY_REDIS_RETRY_AFTER", "30"))
+
+EVENT_MODELS: Dict[str, Type[SQLModel]] = {
+    "user_interaction": UserInteraction,
+    "chat_message": ChatMessage,
+    "interaction_log": InteractionLog,
+}
+EVENT_KINDS = {model: kind for kind, model in EVENT_MODELS.items()}
+
+CONSUMER_NAME = f"{socket.gethostname()}-{os.getpid()}"
+
+_async_redis: Optional[aioredis.Redis] = None
+_sync_redis: Optional[redis.Redis] = None
+_redis_unavailable_until = 0.0
+_flusher_task: Optional[asyncio.Task] = None
+
+
+def _redis_options() -> dict:
+    return {"decode_responses": True, "socket_connect_timeout": 1, "socket_timeout": 5}
+
+
+def get_async_redis() -> aioredis.Redis:
+    global _async_redis
+    if _async_redis is None:
+        _async_redis = aioredis.from_url(REDIS_URL, **_redis_options())
+    return _async_redis
+
+
+def get_sync_redis() -> redis.Redis:
+    global _sync_redis
+    if _sync_redis is None:
+        _sync_redis = redis.Redis.from_url(REDIS_URL, **_redis_options())
+    return _sync_redis
+
+
+def _buffer_available() -> bool:
+    return TELEMETRY_WRITE_BEHIND and time.monotonic() >= _redis_unavailable_until
+
+
+def _mark_redis_unavailable(error: Exception) -> None:
+    global _redis_unavailable_until
+    _redis_unavailable_until = time.monotonic() + TELEMETRY_REDIS_RETRY_AFTER
+    print(f"⚠️  Telemetry buffer unavailable, writing directly to Postgres for {TELEMETRY_REDIS_RETRY_AFTER:.0f}s: {error}")
+
+
+class UnknownSessionError(ValueError):
+    """Telemetry rows reference session ids that are not InteractionSession rows"""
+
+    def __init__(self, session_ids: Sequence[str]):
+        self.session_ids = sorted(session_ids)
+        super().__init__(f"Interaction session not found: {', '.join(self.session_ids)}")
+
+
+def _known_sessions_query(records: Sequence[SQLModel]):
+    session_ids = {record.session_id for record in records}
+    return session_ids, select(InteractionSession.id).where(InteractionSession.id.in_(session_ids))
+
+
+async def unknown_session_ids(db: AsyncSession, records: Sequence[SQLModel]) -> set:
+    """Session ids of `records` that have no InteractionSession row (one query)"""
+    if not records:
+        return set()
+    session_ids, query = _known_sessions_query(records)
+    return session_ids - set((await db.exec(query)).all())
+
+
+def require_known_sessions_sync(session: Session, records: Sequence[SQLModel]) -> None:
+    """Raise UnknownSessionError before `enqueue_records_sync` queues rows that can never be written"""
+    if not records:
+        return
+    session_ids, query = _known_sessions_query(records)
+    missing = session_ids - set(session.exec(query).all())
+    if missing:
+        raise UnknownSessionError(missing)
+
+
+def _stream_fields(record: SQLModel) -> Dict[str, str]:
+    return {
+        "id": record.id,
+        "kind": EVENT_KINDS[type(record)],
+        "payload": record.model_dump_json(),
+    }
+
+
+async def enqueue_records(records: Sequence[SQLModel]) -> bool:
+    """Queue rows for write-behind; False means the caller must persist them itself"""
+    if not records or not _buffer_available():
+        return False
+    try:
+        async with get_async_redis().pipeline(transaction=False) as pipe:
+            for record in records:
+                pipe.xadd(TELEMETRY_STREAM, _stream_fields(record))
+            await pipe.execute()
+        return True
+    except redis.RedisError as e:
+        _mark_redis_unavailable(e)
+        return False
+
+
+def enqueue_records_sync(records: Sequence[SQLModel]) -> bool:
+    """`enqueue_records` for threadpool (`def`) endpoints"""
+    if not records or not _buffer_available():
+        return False
+    try:
+        with get_sync_redis().pipeline(transaction=False) as pipe:
+            for record in records:
+                pipe.xadd(TELEMETRY_STREAM, _stream_fields(record))
+            pipe.execute()
+        return True
+    except redis.RedisError as e:
+        _mark_redis_unavailable(e)
+        return False
+
+
+# Persistence
+
+async def _insert_new(db: AsyncSession, model: Type[SQLModel], records: List[SQLModel]) -> set:
+    """Multi-row INSERT skipping already stored event ids; returns the ids actually inserted"""
+    table = model.__table__
+    stmt = pg_insert(table).on_conflict_do_nothing(index_elements=["id"]).returning(table.c.id)
+    result = await db.execute(stmt, [record.model_dump() for record in records])
+    return set(result.scalars().all())
+
+
+async def _touch_sessions(db: AsyncSession, records: List[SQLModel]) -> None:
+    """Move InteractionSession.last_activity_at forward to the newest event per session"""
+    latest: Dict[str, datetime] = {}
+    for record in records:
+        if record.session_id not in latest or record.timestamp > latest[record.session_id]:
+            latest[record.session_id] = record.timestamp
+
+    for session_id, timestamp in latest.items():
+        await db.execute(
+            update(InteractionSession)
+            .where(InteractionSession.id == session_id)
+            .values(last_activity_at=func.greatest(InteractionSession.last_activity_at, timestamp))
+        )
+
+
+async def persist_records(db: AsyncSession, records: Sequence[SQLModel]) -> None:
+    """Write telemetry rows and their side effects in one transaction (idempotent per event id)"""
+    by_model: Dict[Type[SQLModel], List[SQLModel]] = defaultdict(list)
+    for record in records:
+        by_model[type(record)].append(record)
+
+    inserted: List[SQLModel] = []
+    for model, model_records in by_model.items():
+        new_ids = await _insert_new(db, model, model_records)
+        inserted.extend(record for record in model_records if record.id in new_ids)
+
+    await apply_events_to_progress(db, [
+        record for record in inserted if isinstance(record, (UserInteraction, ChatMessage))
+    ])
+    await mark_rollups_dirty(db, [record for record in inserted if isinstance(record, UserInteraction)])
+    await _touch_sessions(db, inserted)
+    await db.commit()
+
+
+async def record_telemetry(
+    records: Sequence[SQLModel],
+    db: Optional[AsyncSession] = None,
+    sessions_verified: bool = False,
+) -> bool:
+    """Queue rows on the write-behind buffer, or write them now if it is unavailable
+
+    Every UserInteraction / ChatMessage / InteractionLog writer goes through here (or
+    `enqueue_records_sync`), so progress counters, rollups and session activity are
+    updated the same way for all of them. Without `db` a short-lived session is used.
+    Raises UnknownSessionError (nothing is queued) if a row's session does not exist;
+    callers that already loaded the InteractionSession pass `sessions_verified` to
+    skip that lookup.
+    """
+    if db is None:
+        async with async_session_maker() as own_db:
+            return await _record_telemetry(own_db, records, sessions_verified)
+    return await _record_telemetry(db, records, sessions_verified)
+
+
+async def _record_telemetry(db: AsyncSession, records: Sequence[SQLModel], sessions_verified: bool) -> bool:
+    if not sessions_verified:
+        missing = await unknown_session_ids(db, records)
+        if missing:
+            raise UnknownSessionError(missing)
+    if await enqueue_records(records):
+        return True
+    await persist_records(db, records)
+    return False
+
+
+# Background flusher
+
+def _decode_entry(fields: Dict[str, str]) -> SQLModel:
+    model = EVENT_MODELS[fields["kind"]]
+    return model.model_validate(json.loads(fields["payload"]))
+
+
+async def _dead_letter(client: aioredis.Redis, entry_id: str, fields: Dict[str, str], error: Exception) -> None:
+    print(f"❌ Telemetry event {fields.get('id', entry_id)} moved to {TELEMETRY_DEAD_LETTER_STREAM}: {error}")
+    await client.xadd(TELEMETRY_DEAD_LETTER_STREAM, {**fields, "stream_id": entry_id, "error": str(error)[:1000]})
+
+
+async def flush_entries(client: aioredis.Redis, entries: List[Tuple[str, Dict[str, str]]]) -> int:
+    """Persist one batch of stream entries, then acknowledge and delete them"""
+    decoded: List[Tuple[str, Dict[str, str], SQLModel]] = []
+    for entry_id, fields in entries:
+        try:
+            decoded.append((entry_id, fields, _decode_entry(fields)))
+        except Exception as e:
+            await _dead_letter(client, entry_id, fields, e)
+
+    if decoded:
+        # Rows of unknown sessions would fail the batch's multi-row INSERT; drop them first
+        async with async_session_maker() as db:
+            missing = await unknown_session_ids(db, [record for _, _, record in decoded])
+        if missing:
+            for entry_id, fields, record in decoded:
+                if record.session_id in missing:
+                    await _dead_letter(client, entry_id, fields, UnknownSessionError([record.session_id]))
+            decoded = [item for item in decoded if item[2].session_id not in missing]
+
+    if decoded:
+        try:
+            async with async_session_maker() as db:
+                await persist_records(db, [record for _, _, record in decoded])
+        except (IntegrityError, DataError):
+            # A bad row (e.g. a deleted session) fails the whole batch; isolate it so the
+            # rest is written. Connection errors propagate and leave the batch pending.
+            for entry_id, fields, record in decoded:
+                try:
+                    async with async_session_maker() as db:
+                        await persist_records(db, [record])
+                except (IntegrityError, DataError) as e:
+                    await _dead_letter(client, entry_id, fields, e)
+
+    entry_ids = [entry_id for entry_id, _ in entries]
+    await client.xack(TELEMETRY_STREAM, TELEMETRY_CONSUMER_GROUP, *entry_ids)
+    await client.xdel(TELEMETRY_STREAM, *entry_ids)
+    return len(decoded)
+
+
+async def _ensure_consumer_group(client: aioredis.Redis) -> None:
+    try:
+        await client.xgroup_create(TELEMETRY_STREAM, TELEMETRY_CONSUMER_GROUP, id="0", mkstream=True)
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def run_telemetry_flusher() -> None:
+    """Drain the telemetry stream into Postgres until cancelled"""
+    client = get_async_redis()
+    group_ready = False
+    last_claim = 0.0
+    backoff = 1.0
+
+    while True:
+        try:
+            if not group_ready:
+                await _ensure_consumer_group(client)
+                group_ready = True
+
+            entries: List[Tuple[str, Dict[str, str]]] = []
+            if time.monotonic() - last_claim >= TELEMETRY_CLAIM_IDLE_MS / 1000:
+                # Entries a dead worker (or our own failed flush) left unacknowledged
+                claimed = await client.xautoclaim(
+                    TELEMETRY_STREAM, TELEMETRY_CONSUMER_GROUP, CONSUMER_NAME,
+                    min_idle_time=TELEMETRY_CLAIM_IDLE_MS, start_id="0-0", count=TELEMETRY_FLUSH_BATCH_SIZE
+                )
+                entries = [(entry_id, fields) for entry_id, fields in claimed[1] if fields]
+                last_claim = time.monotonic()
+
+            if not entries:
+                response = await client.xreadgroup(
+                    TELEMETRY_CONSUMER_GROUP, CONSUMER_NAME, {TELEMETRY_STREAM: ">"},
+                    count=TELEMETRY_FLUSH_BATCH_SIZE, block=TELEMETRY_FLUSH_BLOCK_MS
+                )
+                entries = response[0][1] if response else []
+
+            if entries:
+                flushed = await flush_entries(client, entries)
+                print(f"📝 Telemetry flushed: {flushed} events")
+            backoff = 1.0
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if isinstance(e, redis.ResponseError) and "NOGROUP" in str(e):
+                group_ready = False
+            print(f"❌ Telemetry flush error, retrying in {backoff:.0f}s: {e}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+
+def start_telemetry_flusher() -> None:
+    """Start the background flusher in this worker (application startup)"""
+    global _flusher_task
+    if TELEMETRY_WRITE_BEHIND and _flusher_task is None:
+        _flusher_task = asyncio.create_task(run_telemetry_flusher())
+
+
+async def stop_telemetry_flusher() -> None:
+    """Stop the flusher; unflushed entries stay in the stream for the next worker"""
+    global _flusher_task, _async_redis
+    if _flusher_task is not None:
+        _flusher_task.cancel()
+        try:
+            await _flusher_task
+        except asyncio.CancelledError:
+            pass
+        _flusher_task = None
+    if _async_redis is not None:
+        await _async_redis.aclose()
+        _async_redis = None
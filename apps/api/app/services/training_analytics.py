@@ -0,0 +1,320 @@
+"""
+Training Analytics Service - eğitim bazlı günlük analitik özetleri (rollup) ve arka plan toplayıcısı
+
+Admin analytics read per-training, per-day rows from TrainingDailyStats instead of
+aggregating UserInteraction / EvaluationReport on every request. Writers mark the
+(training, day) pairs they touch in TrainingDailyStatsDirty, in the same transaction
+as the write; the background aggregator recomputes exactly those days from the raw
+tables (one indexed range scan per day) and upserts the rollup rows. All-time unique
+users and sessions come from TrainingAnalyticsMember, which the aggregator fills
+(and prunes, when a day's interactions were deleted) as it processes days. Each day
+is recomputed in its own short transaction.
+
+Rollups trail the raw tables by up to ANALYTICS_ROLLUP_INTERVAL seconds.
+"""
+
+import asyncio
+import json
+import os
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db import async_session_maker
+from app.models import (
+    EvaluationReport,
+    Training,
+    TrainingAnalyticsMember,
+    TrainingDailyStats,
+    TrainingDailyStatsDirty,
+    UserInteraction,
+    gen_uuid,
+)
+
+ANALYTICS_ROLLUP_INTERVAL = int(os.getenv("ANALYTICS_ROLLUP_INTERVAL", "60"))
+ANALYTICS_ROLLUP_BATCH_SIZE = int(os.getenv("ANALYTICS_ROLLUP_BATCH_SIZE", "200"))
+
+# Same buckets as the evaluation analytics response; 100 belongs to the last bucket
+SCORE_BUCKETS = [("0-20", 0, 20), ("20-40", 20, 40), ("40-60", 40, 60), ("60-80", 60, 80), ("80-100", 80, 100)]
+
+_aggregator_task: Optional[asyncio.Task] = None
+
+
+# Dirty marking (writers)
+
+def _dirty_insert(pairs: Set[Tuple[str, date]]):
+    return pg_insert(TrainingDailyStatsDirty).values([
+        {"id": gen_uuid(), "training_id": training_id, "day": day, "marked_at": datetime.utcnow()}
+        for training_id, day in pairs
+    ]).on_conflict_do_nothing(index_elements=["training_id", "day"])
+
+
+def _rollup_days(records: Iterable[Any], timestamp_field: str) -> Set[Tuple[str, date]]:
+    return {
+        (record.training_id, getattr(record, timestamp_field).date())
+        for record in records
+        if record.training_id and getattr(record, timestamp_field)
+    }
+
+
+async def mark_rollups_dirty(db: AsyncSession, records: Iterable[Any], timestamp_field: str = "timestamp") -> None:
+    """Queue the (training, day) rollups affected by `records` for recomputation (caller commits)"""
+    pairs = _rollup_days(records, timestamp_field)
+    if pairs:
+        await db.execute(_dirty_insert(pairs))
+
+
+def mark_rollups_dirty_sync(session: Session, records: Iterable[Any], timestamp_field: str = "timestamp") -> None:
+    """`mark_rollups_dirty` for threadpool (`def`) endpoints"""
+    pairs = _rollup_days(records, timestamp_field)
+    if pairs:
+        session.execute(_dirty_insert(pairs))
+
+
+# Aggregation
+
+def _day_bounds(day: date) -> Tuple[datetime, datetime]:
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+async def _recompute_day(db: AsyncSession, training_id: str, day: date) -> None:
+    start, end = _day_bounds(day)
+    in_day = (
+        (UserInteraction.training_id == training_id)
+        & (UserInteraction.timestamp >= start)
+        & (UserInteraction.timestamp < end)
+    )
+
+    by_type = (await db.execute(
+        select(
+            UserInteraction.interaction_type,
+            func.count(),
+            func.count().filter(UserInteraction.success == True),
+            func.coalesce(func.sum(UserInteraction.response_time), 0.0),
+            func.count(UserInteraction.response_time),
+        ).where(in_day).group_by(UserInteraction.interaction_type)
+    )).all()
+    unique_users, unique_sessions = (await db.execute(
+        select(
+            func.count(func.distinct(UserInteraction.user_id)),
+            func.count(func.distinct(UserInteraction.session_id)),
+        ).where(in_day)
+    )).one()
+
+    score = EvaluationReport.overall_score
+    report_rows = (await db.execute(
+        select(
+            EvaluationReport.status,
+            func.count(),
+            func.coalesce(func.sum(score), 0.0),
+            func.count(score),
+            *[
+                func.count().filter(
+                    (score >= low) & ((score <= high) if high == 100 else (score < high))
+                )
+                for _, low, high in SCORE_BUCKETS
+            ],
+        ).where(
+            (EvaluationReport.training_id == training_id)
+            & (EvaluationReport.generated_at >= start)
+            & (EvaluationReport.generated_at < end)
+        ).group_by(EvaluationReport.status)
+    )).all()
+
+    histogram: Counter = Counter()
+    for row in report_rows:
+        for (bucket, _, _), count in zip(SCORE_BUCKETS, row[4:]):
+            histogram[bucket] += count
+
+    values = {
+        "interaction_count": sum(row[1] for row in by_type),
+        "interaction_types_json": json.dumps({row[0]: row[1] for row in by_type}),
+        "success_count": sum(row[2] for row in by_type),
+        "response_time_sum": float(sum(row[3] for row in by_type)),
+        "response_time_count": sum(row[4] for row in by_type),
+        "unique_users": unique_users,
+        "unique_sessions": unique_sessions,
+        "completions": sum(row[1] for row in by_type if row[0] == "training_end"),
+        "report_count": sum(row[1] for row in report_rows),
+        "report_score_sum": float(sum(row[2] for row in report_rows)),
+        "report_score_count": sum(row[3] for row in report_rows),
+        "score_histogram_json": json.dumps({bucket: histogram[bucket] for bucket, _, _ in SCORE_BUCKETS}),
+        "report_status_json": json.dumps({row[0]: row[1] for row in report_rows}),
+        "updated_at": datetime.utcnow(),
+    }
+    await db.execute(
+        pg_insert(TrainingDailyStats)
+        .values(id=gen_uuid(), training_id=training_id, day=day, **values)
+        .on_conflict_do_update(index_elements=["training_id", "day"], set_=values)
+    )
+
+    # All-time unique users/sessions of the training
+    for kind, column in (("user", "user_id"), ("session", "session_id")):
+        params = {"training_id": training_id, "kind": kind, "day": day, "start": start, "end": end}
+        await db.execute(text(f"""
+            INSERT INTO traininganalyticsmember (training_id, kind, member_id, first_day)
+            SELECT DISTINCT CAST(:training_id AS VARCHAR), CAST(:kind AS VARCHAR), {column}, CAST(:day AS DATE)
+            FROM userinteraction
+            WHERE training_id = :training_id
+              AND "timestamp" >= :start AND "timestamp" < :end
+              AND {column} IS NOT NULL
+            ON CONFLICT (training_id, kind, member_id)
+            DO UPDATE SET first_day = LEAST(traininganalyticsmember.first_day, EXCLUDED.first_day)
+        """), params)
+        await _prune_members(db, column, params)
+
+
+async def _prune_members(db: AsyncSession, column: str, params: Dict[str, Any]) -> None:
+    """Members first seen on this day whose interactions of that day were deleted
+    move to their next day, or are dropped when none are left (member counts go down)"""
+    no_interaction_on_day = f"""
+        training_id = :training_id AND kind = :kind AND first_day = :day
+        AND NOT EXISTS (
+            SELECT 1 FROM userinteraction ui
+            WHERE ui.training_id = :training_id AND ui.{column} = traininganalyticsmember.member_id
+              AND ui."timestamp" >= :start AND ui."timestamp" < :end
+        )
+    """
+    await db.execute(text(f"""
+        DELETE FROM traininganalyticsmember
+        WHERE {no_interaction_on_day}
+          AND NOT EXISTS (
+            SELECT 1 FROM userinteraction ui
+            WHERE ui.training_id = :training_id AND ui.{column} = traininganalyticsmember.member_id
+          )
+    """), params)
+    await db.execute(text(f"""
+        UPDATE traininganalyticsmember
+        SET first_day = (
+            SELECT CAST(min(ui."timestamp") AS DATE) FROM userinteraction ui
+            WHERE ui.training_id = :training_id AND ui.{column} = traininganalyticsmember.member_id
+        )
+        WHERE {no_interaction_on_day}
+    """), params)
+
+
+async def process_dirty_rollups(db: AsyncSession, limit: int = ANALYTICS_ROLLUP_BATCH_SIZE) -> int:
+    """Recompute up to `limit` queued (training, day) rollups, one day per transaction
+
+    Each day's dirty row is claimed, recomputed and committed on its own, so the
+    locks (and the DELETE of the dirty row) never outlive a single day's recompute
+    and writers marking other days are not held up by a long batch.
+    """
+    processed = 0
+    while processed < limit:
+        claimed = (await db.execute(text("""
+            DELETE FROM trainingdailystatsdirty
+            WHERE id = (
+                SELECT id FROM trainingdailystatsdirty
+                ORDER BY marked_at
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING training_id, day
+        """))).first()
+        if claimed is None:
+            await db.commit()
+            break
+
+        training_id, day = claimed
+        # Days of trainings deleted since they were queued are dropped
+        if await db.scalar(select(Training.id).where(Training.id == training_id)) is not None:
+            await _recompute_day(db, training_id, day)
+        await db.commit()
+        processed += 1
+    return processed
+
+
+async def run_analytics_aggregator() -> None:
+    """Drain the rollup queue every ANALYTICS_ROLLUP_INTERVAL seconds"""
+    while True:
+        try:
+            while True:
+                async with async_session_maker() as db:
+                    processed = await process_dirty_rollups(db)
+                if processed:
+                    print(f"📊 Training analytics rollups refreshed: {processed} days")
+                if processed < ANALYTICS_ROLLUP_BATCH_SIZE:
+                    break
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Training analytics aggregation failed: {e}")
+        await asyncio.sleep(ANALYTICS_ROLLUP_INTERVAL)
+
+
+def start_analytics_aggregator() -> None:
+    """Start the rollup aggregator in this worker (application startup)"""
+    global _aggregator_task
+    if ANALYTICS_ROLLUP_INTERVAL > 0 and _aggregator_task is None:
+        _aggregator_task = asyncio.create_task(run_analytics_aggregator())
+
+
+async def stop_analytics_aggregator() -> None:
+    global _aggregator_task
+    if _aggregator_task is not None:
+        _aggregator_task.cancel()
+        try:
+            await _aggregator_task
+        except asyncio.CancelledError:
+            pass
+        _aggregator_task = None
+
+
+# Reading
+
+def daily_stats_query(training_id: str, since: Optional[date] = None):
+    query = select(TrainingDailyStats).where(TrainingDailyStats.training_id == training_id)
+    if since is not None:
+        query = query.where(TrainingDailyStats.day >= since)
+    return query
+
+
+def member_counts_query(training_id: str):
+    return (
+        select(TrainingAnalyticsMember.kind, func.count())
+        .where(TrainingAnalyticsMember.training_id == training_id)
+        .group_by(TrainingAnalyticsMember.kind)
+    )
+
+
+def summarize_daily_stats(rows: Iterable[TrainingDailyStats]) -> Dict[str, Any]:
+    """Add up daily rollup rows into totals for a period"""
+    interaction_types: Counter = Counter()
+    score_histogram: Counter = Counter({bucket: 0 for bucket, _, _ in SCORE_BUCKETS})
+    report_statuses: Counter = Counter()
+    totals = Counter()
+
+    for row in rows:
+        interaction_types.update(json.loads(row.interaction_types_json or "{}"))
+        score_histogram.update(json.loads(row.score_histogram_json or "{}"))
+        report_statuses.update(json.loads(row.report_status_json or "{}"))
+        for field in (
+            "interaction_count", "success_count", "response_time_sum", "response_time_count",
+            "completions", "report_count", "report_score_sum", "report_score_count",
+        ):
+            totals[field] += getattr(row, field)
+
+    return {
+        "total_interactions": totals["interaction_count"],
+        "interaction_types": dict(interaction_types),
+        "average_response_time": (
+            totals["response_time_sum"] / totals["response_time_count"] if totals["response_time_count"] else 0
+        ),
+        "success_percentage": (
+            totals["success_count"] / totals["interaction_count"] * 100 if totals["interaction_count"] else 0
+        ),
+        "completions": totals["completions"],
+        "total_reports": totals["report_count"],
+        "average_score": (
+            totals["report_score_sum"] / totals["report_score_count"] if totals["report_score_count"] else None
+        ),
+        "score_distribution": {bucket: score_histogram[bucket] for bucket, _, _ in SCORE_BUCKETS},
+        "status_distribution": dict(report_statuses),
+    }
@@ -0,0 +1,202 @@
+"""
+Training Manifest Service - Public player için derlenmiş ve cache'lenmiş eğitim paketi
+
+Access code ile açılan eğitimin tamamı (training, bölümler, overlay'ler, asset'ler,
+avatar ve şirket) birkaç toplu sorgu ile tek bir JSON blob'a derlenir, strong ETag ile
+birlikte process içinde saklanır ve ilgili kayıtlar yazıldığında açıkça geçersiz kılınır.
+Derleme sürerken gelen bir geçersiz kılma (generation sayacı) derlenen manifest'in
+saklanmasını engeller; istek yine de derlenen veriyi alır.
+Geçersiz kılma Redis pub/sub ile diğer API süreçlerine de iletilir (job worker'ından
+yapılan yazmalar dahil).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+from sqlmodel import Session, select
+
+from app.models import Training, TrainingSection, Overlay, Asset, Avatar, Company
+from app.services.cache_invalidation import publish_invalidation, register_invalidation_handler
+
+# Invalidations reach other processes over Redis pub/sub (cache_invalidation); the TTL
+# only bounds staleness when Redis is unreachable.
+MANIFEST_CACHE_TTL = int(os.getenv("MANIFEST_CACHE_TTL", "300"))
+
+
+class CompiledManifest:
+    """Serialize edilmiş manifest, ETag'i ve bağımlı olduğu kayıtlar"""
+
+    def __init__(self, training_id: str, body: bytes, dependencies: Set[str]):
+        self.training_id = training_id
+        self.body = body
+        self.etag = f'"{hashlib.sha256(body).hexdigest()}"'
+        self.dependencies = dependencies
+        self.built_at = time.monotonic()
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() - self.built_at < MANIFEST_CACHE_TTL
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """If-None-Match header'ı bu manifest'in ETag'i ile eşleşiyor mu"""
+        if not if_none_match:
+            return False
+        candidates = [value.strip() for value in if_none_match.split(",")]
+        return "*" in candidates or self.etag in candidates
+
+
+_lock = threading.Lock()
+_manifests: Dict[str, CompiledManifest] = {}  # access_code -> manifest
+# Bumped by every invalidation; a manifest built across one is not stored
+_generation = 0
+
+
+def build_training_manifest(session: Session, training: Training) -> Dict[str, Any]:
+    """Eğitimi bölümleri, overlay'leri ve asset'leri ile birlikte toplu sorgularla derler"""
+    sections = session.exec(
+        select(TrainingSection)
+        .where(TrainingSection.training_id == training.id)
+        .order_by(TrainingSection.order_index)
+    ).all()
+
+    section_ids = [section.id for section in sections]
+    overlays: List[Overlay] = []
+    if section_ids:
+        overlays = session.exec(
+            select(Overlay)
+            .where(Overlay.training_section_id.in_(section_ids))
+            .order_by(Overlay.time_stamp)
+        ).all()
+
+    asset_ids = {section.asset_id for section in sections if section.asset_id}
+    asset_ids.update(overlay.content_id for overlay in overlays if overlay.content_id)
+    assets: Dict[str, Asset] = {}
+    if asset_ids:
+        assets = {
+            asset.id: asset
+            for asset in session.exec(select(Asset).where(Asset.id.in_(asset_ids))).all()
+        }
+
+    overlays_by_section: Dict[str, List[Dict[str, Any]]] = {section_id: [] for section_id in section_ids}
+    for overlay in overlays:
+        overlay_dict = overlay.model_dump()
+        content_asset = assets.get(overlay.content_id) if overlay.content_id else None
+        if content_asset:
+            overlay_dict['content_asset'] = content_asset.model_dump()
+        overlays_by_section[overlay.training_section_id].append(overlay_dict)
+
+    sections_data = []
+    for section in sections:
+        section_dict = section.model_dump()
+        asset = assets.get(section.asset_id) if section.asset_id else None
+        if asset:
+            section_dict['asset'] = asset.model_dump()
+        section_dict['overlays'] = overlays_by_section[section.id]
+        sections_data.append(section_dict)
+
+    training_dict = training.model_dump()
+    training_dict['sections'] = sections_data
+
+    if training.avatar_id:
+        avatar = session.get(Avatar, training.avatar_id)
+        if avatar:
+            training_dict['avatar'] = avatar.model_dump()
+
+    if training.company_id:
+        company = session.get(Company, training.company_id)
+        if company:
+            training_dict['company'] = {
+                'id': company.id,
+                'name': company.name,
+                'display_name': company.name
+            }
+    else:
+        # Sistem eğitimi (SuperAdmin)
+        training_dict['company'] = {
+            'id': None,
+            'name': 'System',
+            'display_name': 'Sistem Eğitimi'
+        }
+
+    return training_dict
+
+
+def _manifest_dependencies(manifest: Dict[str, Any]) -> Set[str]:
+    dependencies = {f"training:{manifest['id']}"}
+    if manifest.get('avatar_id'):
+        dependencies.add(f"avatar:{manifest['avatar_id']}")
+    if manifest.get('company_id'):
+        dependencies.add(f"company:{manifest['company_id']}")
+    for section in manifest['sections']:
+        if section.get('asset_id'):
+            dependencies.add(f"asset:{section['asset_id']}")
+        for overlay in section['overlays']:
+            if overlay.get('content_id'):
+                dependencies.add(f"asset:{overlay['content_id']}")
+    return dependencies
+
+
+def get_training_manifest(session: Session, access_code: str) -> Optional[CompiledManifest]:
+    """Access code için derlenmiş manifest'i döndürür; cache'te yoksa derleyip saklar"""
+    with _lock:
+        cached = _manifests.get(access_code)
+        generation = _generation
+    if cached and cached.is_fresh():
+        return cached
+
+    training = session.exec(
+        select(Training).where(Training.access_code == access_code)
+    ).first()
+    if not training:
+        return None
+
+    manifest = build_training_manifest(session, training)
+    body = json.dumps(jsonable_encoder(manifest), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    compiled = CompiledManifest(training.id, body, _manifest_dependencies(manifest))
+
+    with _lock:
+        # Derleme sırasında bir yazma geçersiz kıldıysa eski veriyi cache'leme
+        if _generation == generation:
+            _manifests[access_code] = compiled
+    return compiled
+
+
+def invalidate_training_manifests(
+    *,
+    training_id: Optional[str] = None,
+    asset_id: Optional[str] = None,
+    avatar_id: Optional[str] = None,
+    company_id: Optional[str] = None,
+) -> None:
+    """Verilen kayıtlara bağımlı tüm cache'lenmiş manifest'leri siler"""
+    keys = set()
+    if training_id:
+        keys.add(f"training:{training_id}")
+    if asset_id:
+        keys.add(f"asset:{asset_id}")
+    if avatar_id:
+        keys.add(f"avatar:{avatar_id}")
+    if company_id:
+        keys.add(f"company:{company_id}")
+    if not keys:
+        return
+
+    _drop_manifests(keys)
+    # Diğer API worker'ları (ve job worker'ı yazdıysa tüm API süreçleri)
+    publish_invalidation("training_manifest", keys=sorted(keys))
+
+
+def _drop_manifests(keys: Set[str]) -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        stale = [code for code, compiled in _manifests.items() if compiled.dependencies & keys]
+        for code in stale:
+            del _manifests[code]
+
+
+register_invalidation_handler("training_manifest", lambda keys: _drop_manifests(set(keys)))
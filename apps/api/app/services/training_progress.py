@@ -0,0 +1,227 @@
+"""
+Training Progress Service - TrainingProgress sayaçlarının artımlı güncellenmesi ve mutabakatı
+
+total_interactions, chat_messages_count and sections_attempted are maintained on
+ingest with a single `INSERT ... ON CONFLICT (user_id, training_id) DO UPDATE SET
+x = x + n` per learner, so neither reads nor writes have to recount a learner's
+history and concurrent events cannot create duplicate progress rows. A periodic
+reconciliation job recomputes the counters (and total_time_spent, from recorded
+Session durations) set-based and corrects rows that drifted, e.g. after a failed
+write or rows deleted outside the API.
+
+Every UserInteraction / ChatMessage writer goes through the telemetry write-behind
+(`record_telemetry`), whose flush calls `apply_events_to_progress`, so counters only
+trail ingest by the flush delay; reconciliation is a safety net, not the update path.
+"""
+
+import asyncio
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import case, func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db import async_session_maker
+from app.models import TrainingProgress, UserInteraction, gen_uuid
+
+TRAINING_PROGRESS_RECONCILE_INTERVAL = int(os.getenv("TRAINING_PROGRESS_RECONCILE_INTERVAL", "3600"))
+# Transaction-scoped advisory lock so only one worker reconciles at a time
+RECONCILE_LOCK_KEY = 720_412_001
+
+_reconcile_task: Optional[asyncio.Task] = None
+
+
+def _insert_progress(user_id: str, training_id: str, company_id: Optional[str], now: datetime, **values):
+    return pg_insert(TrainingProgress).values(
+        id=gen_uuid(),
+        user_id=user_id,
+        training_id=training_id,
+        company_id=company_id,
+        first_accessed_at=now,
+        last_accessed_at=now,
+        **values
+    )
+
+
+async def get_or_create_training_progress(
+    db: AsyncSession,
+    user_id: str,
+    training_id: str,
+    company_id: Optional[str] = None
+) -> TrainingProgress:
+    """Learner's progress row, created if missing, in one INSERT ... ON CONFLICT ... RETURNING (caller commits)"""
+    stmt = (
+        _insert_progress(user_id, training_id, company_id, datetime.utcnow())
+        .on_conflict_do_update(
+            index_elements=["user_id", "training_id"],
+            # No-op update so RETURNING also yields the existing row
+            set_={"training_id": TrainingProgress.training_id}
+        )
+        .returning(TrainingProgress)
+        .execution_options(populate_existing=True)
+    )
+    return (await db.execute(stmt)).scalar_one()
+
+
+async def find_training_progress(
+    db: AsyncSession,
+    user_id: str,
+    training_id: str,
+    company_id: Optional[str] = None
+) -> TrainingProgress:
+    """Learner's progress row for reads: a plain SELECT, and an unsaved zeroed row when
+    the learner has none yet (GETs never write; the row is created by the first event)"""
+    progress = (await db.exec(
+        select(TrainingProgress).where(
+            TrainingProgress.user_id == user_id,
+            TrainingProgress.training_id == training_id
+        )
+    )).first()
+    if progress is not None:
+        return progress
+    return TrainingProgress(user_id=user_id, training_id=training_id, company_id=company_id)
+
+
+async def apply_events_to_progress(db: AsyncSession, records: Sequence[SQLModel]) -> None:
+    """Progress side effects of newly stored interactions/chat messages: one upsert per (user, training)"""
+    batches: Dict[tuple, List[SQLModel]] = defaultdict(list)
+    for record in sorted(records, key=lambda r: r.timestamp):
+        if record.user_id:
+            batches[(record.user_id, record.training_id)].append(record)
+
+    now = datetime.utcnow()
+    for (user_id, training_id), events in batches.items():
+        interactions = [event for event in events if isinstance(event, UserInteraction)]
+        section_changes = [
+            event.section_id for event in interactions
+            if event.interaction_type == "section_change" and event.section_id
+        ]
+        completed = any(event.interaction_type == "training_end" for event in interactions)
+
+        stmt = _insert_progress(
+            user_id, training_id, events[0].company_id, now,
+            total_interactions=len(interactions),
+            chat_messages_count=len(events) - len(interactions),
+            sections_attempted=len(section_changes),
+            current_section_id=section_changes[-1] if section_changes else None,
+            is_completed=completed,
+            completed_at=now if completed else None,
+            status="completed" if completed else "not_started"
+        )
+        table = TrainingProgress.__table__.c
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=["user_id", "training_id"],
+            set_={
+                "total_interactions": table.total_interactions + stmt.excluded.total_interactions,
+                "chat_messages_count": table.chat_messages_count + stmt.excluded.chat_messages_count,
+                "sections_attempted": table.sections_attempted + stmt.excluded.sections_attempted,
+                "current_section_id": func.coalesce(stmt.excluded.current_section_id, table.current_section_id),
+                "is_completed": table.is_completed | stmt.excluded.is_completed,
+                "completed_at": func.coalesce(stmt.excluded.completed_at, table.completed_at),
+                "status": case((stmt.excluded.is_completed, "completed"), else_=table.status),
+                "last_accessed_at": stmt.excluded.last_accessed_at,
+            }
+        ))
+
+
+# The recount reads a snapshot, but concurrent flushes keep incrementing the rows while
+# it runs. Counters are therefore corrected by the drift seen in the snapshot
+# (x = x + expected - seen): UPDATE re-reads the newest row version, so increments
+# committed after the snapshot are kept. total_time_spent is an absolute value, so it
+# is only replaced when nobody changed it in the meantime.
+RECONCILE_SQL = text("""
+    WITH interactions AS (
+        SELECT
+            user_id,
+            training_id,
+            count(*) AS total,
+            count(*) FILTER (WHERE interaction_type = 'section_change' AND section_id IS NOT NULL) AS sections
+        FROM userinteraction
+        GROUP BY user_id, training_id
+    ), chat_messages AS (
+        SELECT user_id, training_id, count(*) AS total
+        FROM chatmessage
+        GROUP BY user_id, training_id
+    ), session_time AS (
+        SELECT user_id, training_id, sum(total_duration) AS total
+        FROM "session"
+        WHERE total_duration IS NOT NULL
+        GROUP BY user_id, training_id
+    ), expected AS (
+        SELECT
+            p.id,
+            p.total_interactions AS seen_interactions,
+            p.chat_messages_count AS seen_chat_messages,
+            p.sections_attempted AS seen_sections,
+            p.total_time_spent AS seen_time_spent,
+            COALESCE(i.total, 0) AS total_interactions,
+            COALESCE(c.total, 0) AS chat_messages_count,
+            COALESCE(i.sections, 0) AS sections_attempted,
+            COALESCE(s.total, p.total_time_spent) AS total_time_spent
+        FROM trainingprogress p
+        LEFT JOIN interactions i ON i.user_id = p.user_id AND i.training_id = p.training_id
+        LEFT JOIN chat_messages c ON c.user_id = p.user_id AND c.training_id = p.training_id
+        LEFT JOIN session_time s ON s.user_id = p.user_id AND s.training_id = p.training_id
+    )
+    UPDATE trainingprogress AS tp
+    SET total_interactions = tp.total_interactions + (e.total_interactions - e.seen_interactions),
+        chat_messages_count = tp.chat_messages_count + (e.chat_messages_count - e.seen_chat_messages),
+        sections_attempted = tp.sections_attempted + (e.sections_attempted - e.seen_sections),
+        total_time_spent = CASE
+            WHEN tp.total_time_spent IS NOT DISTINCT FROM e.seen_time_spent THEN e.total_time_spent
+            ELSE tp.total_time_spent
+        END
+    FROM expected e
+    WHERE tp.id = e.id
+      AND (e.seen_interactions, e.seen_chat_messages, e.seen_sections, e.seen_time_spent)
+          IS DISTINCT FROM (e.total_interactions, e.chat_messages_count, e.sections_attempted, e.total_time_spent)
+    RETURNING tp.id
+""")
+
+
+
+async def reconcile_training_progress(db: AsyncSession) -> List[str]:
+    """Recount every learner's counters set-based and fix drifted rows; returns their ids"""
+    locked = (await db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": RECONCILE_LOCK_KEY})).scalar()
+    if not locked:
+        return []
+    corrected = list((await db.execute(RECONCILE_SQL)).scalars().all())
+    await db.commit()
+    return corrected
+
+
+async def run_progress_reconciler() -> None:
+    """Reconcile TrainingProgress counters every TRAINING_PROGRESS_RECONCILE_INTERVAL seconds"""
+    while True:
+        await asyncio.sleep(TRAINING_PROGRESS_RECONCILE_INTERVAL)
+        try:
+            async with async_session_maker() as db:
+                corrected = await reconcile_training_progress(db)
+            if corrected:
+                print(f"🔧 TrainingProgress reconciliation corrected {len(corrected)} rows")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ TrainingProgress reconciliation failed: {e}")
+
+
+def start_progress_reconciler() -> None:
+    """Start the periodic reconciliation job in this worker (application startup)"""
+    global _reconcile_task
+    if TRAINING_PROGRESS_RECONCILE_INTERVAL > 0 and _reconcile_task is None:
+        _reconcile_task = asyncio.create_task(run_progress_reconciler())
+
+
+async def stop_progress_reconciler() -> None:
+    global _reconcile_task
+    if _reconcile_task is not None:
+        _reconcile_task.cancel()
+        try:
+            await _reconcile_task
+        except asyncio.CancelledError:
+            pass
+        _reconcile_task = None
@@ -0,0 +1,118 @@
+"""
+Transcript Cache Service - video içeriğine göre transkript ve SRT önbelleği
+
+Transcripts are stored in Postgres keyed by the video's content fingerprint (the
+object's ETag and size from MinIO, or the normalized URL, strong ETag and size from
+an HTTP HEAD for external videos), the transcript language and
+the transcription backend/model. The same video reused in another section, or
+shared by trainings cloned with copy_training / import_assigned_training (same
+asset uri), is transcribed once; later requests return the stored text, segments
+and SRT without downloading the video or calling the provider.
+
+Fingerprinting is best-effort: when the source has no (strong) ETag the cache is skipped.
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, NamedTuple, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import Session
+
+from app.models import TranscriptCache
+from app.storage import MINIO_BUCKET, get_minio
+from app.services.transcription import TRANSCRIPT_LANGUAGE, asset_source_url, transcription_backend_identity
+
+
+class TranscriptCacheKey(NamedTuple):
+    fingerprint: str
+    language: str
+    model: str
+
+    @property
+    def id(self) -> str:
+        return hashlib.sha256(f"{self.fingerprint}|{self.language}|{self.model}".encode()).hexdigest()
+
+
+def normalize_source_url(url: str) -> str:
+    """Scheme/host lower-cased, default port, fragment and trailing slash dropped"""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        netloc = f"{netloc}:{parts.port}"
+    return urlunsplit((scheme, netloc, parts.path.rstrip("/") or "/", parts.query, ""))
+
+
+def source_fingerprint(uri: str) -> Optional[str]:
+    """ETag + size of the video behind an asset uri, None when it cannot be determined
+
+    ETags are only unique per resource, so for external (http) sources the normalized
+    URL is part of the fingerprint. Weak ETags (W/"...") only promise semantic
+    equivalence, not identical bytes, and are not cached.
+    """
+    try:
+        if not uri.startswith('http'):
+            stat = get_minio().stat_object(MINIO_BUCKET, uri)
+            etag, size, scope = stat.etag, stat.size, ""
+        else:
+            response = httpx.head(asset_source_url(uri), timeout=10, follow_redirects=True)
+            response.raise_for_status()
+            etag, size = response.headers.get("etag"), response.headers.get("content-length")
+            scope = normalize_source_url(str(response.url))
+    except Exception as e:
+        print(f"⚠️  Transcript cache: could not fingerprint {uri}: {e}")
+        return None
+
+    if not etag or etag.startswith(("W/", "w/")):
+        return None
+    etag = etag.strip('"')
+    if scope:
+        return f"url:{scope}:etag:{etag}:{size or ''}"
+    return f"etag:{etag}:{size or ''}"
+
+
+def transcript_cache_key(uri: str, language: str = TRANSCRIPT_LANGUAGE) -> Optional[TranscriptCacheKey]:
+    fingerprint = source_fingerprint(uri)
+    if fingerprint is None:
+        return None
+    return TranscriptCacheKey(fingerprint, language, transcription_backend_identity())
+
+
+def get_cached_transcript(session: Session, key: Optional[TranscriptCacheKey]) -> Optional[Dict[str, Any]]:
+    """Stored {"transcript", "srt", "segments"} for `key`, None on a miss"""
+    if key is None:
+        return None
+    cached = session.get(TranscriptCache, key.id)
+    if cached is None:
+        return None
+    print(f"✅ Transcript cache hit: {key.fingerprint} ({key.language}, {key.model})")
+    return {
+        "transcript": cached.transcript,
+        "srt": cached.srt,
+        "segments": json.loads(cached.segments_json),
+    }
+
+
+def store_transcript(session: Session, key: Optional[TranscriptCacheKey], result: Dict[str, Any]) -> None:
+    """Save a job result (transcript, srt, segments); an existing entry for the key is kept"""
+    if key is None:
+        return
+    session.execute(
+        pg_insert(TranscriptCache)
+        .values(
+            id=key.id,
+            source_fingerprint=key.fingerprint,
+            language=key.language,
+            model=key.model,
+            transcript=result.get("transcript", ""),
+            srt=result.get("srt", ""),
+            segments_json=json.dumps(result.get("segments", []), ensure_ascii=False),
+            created_at=datetime.utcnow(),
+        )
+        .on_conflict_do_nothing(index_elements=["id"])
+    )
+    session.commit()
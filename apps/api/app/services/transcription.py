@@ -0,0 +1,358 @@
+"""
+Transcription Service - eğitim videolarından ses çıkarma ve (parçalı) transkript
+
+ffmpeg reads the video straight from object storage over HTTP (range requests,
+so MP4s with a trailing moov atom work too) and writes only a small, compressed
+16 kHz mono audio file. Download and extraction overlap, nothing video-sized is
+written to disk, and the upload to the transcription provider is roughly a tenth
+of the old PCM WAV.
+
+TRANSCRIPT_AUDIO_FORMAT selects the output: "opus" (Ogg/Opus, default) or "flac".
+Opus at 24 kbit/s keeps an hour of speech around 11 MB, below Whisper's 25 MB limit;
+FLAC is lossless but several times larger.
+
+Audio longer than TRANSCRIPT_CHUNK_SECONDS is split at silences into overlapping
+chunks that are transcribed concurrently (TRANSCRIPT_CHUNK_CONCURRENCY at a time).
+Each chunk owns the span between its two cut points; segments are shifted back to
+video time and kept only by the chunk owning their midpoint, so the overlap never
+produces duplicate cues. The provider is a pluggable `TranscriptionBackend`
+(TRANSCRIPTION_BACKEND, default "whisper"); register a local stand-in with
+`register_transcription_backend` or pass one to `transcribe_audio` directly.
+"""
+
+import os
+import re
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.services.provider_clients import get_sync_http_client
+
+TRANSCRIPT_AUDIO_FORMAT = os.getenv("TRANSCRIPT_AUDIO_FORMAT", "opus").lower()
+TRANSCRIPT_OPUS_BITRATE = os.getenv("TRANSCRIPT_OPUS_BITRATE", "24k")
+TRANSCRIPT_LANGUAGE = os.getenv("TRANSCRIPT_LANGUAGE", "tr")
+
+# 0 disables chunking (always one request)
+TRANSCRIPT_CHUNK_SECONDS = float(os.getenv("TRANSCRIPT_CHUNK_SECONDS", "600"))
+TRANSCRIPT_CHUNK_OVERLAP = float(os.getenv("TRANSCRIPT_CHUNK_OVERLAP", "2"))
+TRANSCRIPT_CHUNK_CONCURRENCY = int(os.getenv("TRANSCRIPT_CHUNK_CONCURRENCY", "4"))
+TRANSCRIPT_SILENCE_NOISE = os.getenv("TRANSCRIPT_SILENCE_NOISE", "-35dB")
+TRANSCRIPT_SILENCE_MIN_DURATION = float(os.getenv("TRANSCRIPT_SILENCE_MIN_DURATION", "0.4"))
+
+# format -> (ffmpeg codec arguments, file suffix, mime type)
+AUDIO_FORMATS = {
+    "opus": (["-c:a", "libopus", "-b:a", TRANSCRIPT_OPUS_BITRATE, "-application", "voip"], ".ogg", "audio/ogg"),
+    "flac": (["-c:a", "flac"], ".flac", "audio/flac"),
+}
+
+FFMPEG_PATHS = [
+    'ffmpeg',  # PATH'te varsa
+    r'C:\ffmpeg\bin\ffmpeg.exe',  # Tam yol
+    r'C:\Program Files\ffmpeg\bin\ffmpeg.exe',  # Program Files
+]
+
+_ffmpeg_cmd: Optional[str] = None
+
+ProgressCallback = Callable[[float, str], None]
+
+
+def find_ffmpeg() -> str:
+    """İlk çalışan ffmpeg yolunu bul (process başına bir kez)"""
+    global _ffmpeg_cmd
+    if _ffmpeg_cmd:
+        return _ffmpeg_cmd
+    for path in FFMPEG_PATHS:
+        try:
+            subprocess.run([path, '-version'], capture_output=True, text=True, check=True)
+            print(f"FFmpeg found at: {path}")  # Debug log
+            _ffmpeg_cmd = path
+            return path
+        except (subprocess.CalledProcessError, FileNotFoundError) as e:
+            print(f"FFmpeg not found at: {path} - {e}")  # Debug log
+    raise HTTPException(500, "FFmpeg is not installed or not in PATH. Please install FFmpeg and restart the server.")
+
+
+def asset_source_url(uri: str) -> str:
+    """Asset uri'sini worker'ın erişebildiği bir URL'e çevir (object key ise CDN_URL üzerinden)"""
+    if uri.startswith('http'):
+        return uri
+    cdn_url = os.getenv('CDN_URL', 'http://minio:9000/lxplayer')
+    return f"{cdn_url}/{uri}"
+
+
+def _audio_format(audio_format: str) -> Tuple[List[str], str, str]:
+    if audio_format not in AUDIO_FORMATS:
+        raise HTTPException(500, f"Unsupported TRANSCRIPT_AUDIO_FORMAT: {audio_format}")
+    return AUDIO_FORMATS[audio_format]
+
+
+def _encode_audio(input_args: List[str], source: str, audio_format: str, output_args: List[str] = ()) -> str:
+    """Run ffmpeg from `source` into a new 16 kHz mono temp file, return its path"""
+    codec_args, suffix, _ = _audio_format(audio_format)
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_audio:
+        audio_path = temp_audio.name
+
+    try:
+        subprocess.run([
+            find_ffmpeg(), '-hide_banner', '-loglevel', 'error',
+            *input_args, '-i', source, *output_args,
+            '-vn', '-ac', '1', '-ar', '16000',
+            *codec_args,
+            audio_path, '-y'
+        ], check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        os.unlink(audio_path)
+        raise HTTPException(500, f"Error extracting audio: {(e.stderr or str(e)).strip()}")
+    return audio_path
+
+
+def extract_audio(source_url: str, audio_format: str = TRANSCRIPT_AUDIO_FORMAT) -> str:
+    """Stream the video from `source_url` through ffmpeg into a compressed 16 kHz mono file
+
+    Returns the file's path; the caller deletes it.
+    """
+    input_args = []
+    if source_url.startswith('http'):
+        # Geçici ağ kesintilerinde baştan indirmek yerine kaldığı yerden devam et
+        input_args = ['-reconnect', '1', '-reconnect_streamed', '1', '-reconnect_delay_max', '5']
+
+    audio_path = _encode_audio(input_args, source_url, audio_format)
+    print(f"🎧 Audio extracted: {os.path.getsize(audio_path) / 1024 / 1024:.1f} MB ({audio_format})")
+    return audio_path
+
+
+# Backends
+
+class TranscriptionBackend:
+    """Bir ses dosyasını zaman etiketli segmentlere çeviren sağlayıcı
+
+    `transcribe` returns {"text": str, "segments": [{"start", "end", "text", ...}]}
+    with times in seconds relative to the start of the given file.
+    """
+
+    name = "base"
+    model = ""
+
+    def transcribe(self, audio_path: str, filename: str, mime_type: str, language: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class WhisperBackend(TranscriptionBackend):
+    name = "whisper"
+    model = os.getenv("WHISPER_MODEL", "whisper-1")
+
+    def __init__(self):
+        self.api_key = os.getenv('OPENAI_API_KEY')
+        if not self.api_key:
+            raise HTTPException(500, "OpenAI API key not configured")
+
+    def transcribe(self, audio_path: str, filename: str, mime_type: str, language: str) -> Dict[str, Any]:
+        with open(audio_path, 'rb') as audio_file:
+            response = get_sync_http_client("openai").post(
+                'https://api.openai.com/v1/audio/transcriptions',
+                headers={'Authorization': f'Bearer {self.api_key}'},
+                files={'file': (filename, audio_file, mime_type)},
+                data={
+                    'model': self.model,
+                    'language': language,
+                    'response_format': 'verbose_json'  # Zaman etiketli çıktı için
+                },
+                timeout=600  # Uzun ses dosyaları için
+            )
+        response.raise_for_status()
+        result = response.json()
+        return {"text": result.get('text', ''), "segments": result.get('segments', [])}
+
+
+TRANSCRIPTION_BACKENDS: Dict[str, Callable[[], TranscriptionBackend]] = {
+    "whisper": WhisperBackend,
+}
+
+
+def register_transcription_backend(name: str, factory: Callable[[], TranscriptionBackend]) -> None:
+    TRANSCRIPTION_BACKENDS[name] = factory
+
+
+def _backend_factory(name: Optional[str]) -> Callable[[], TranscriptionBackend]:
+    name = name or os.getenv("TRANSCRIPTION_BACKEND", "whisper")
+    factory = TRANSCRIPTION_BACKENDS.get(name)
+    if factory is None:
+        raise HTTPException(500, f"Unknown transcription backend: {name}")
+    return factory
+
+
+def get_transcription_backend(name: Optional[str] = None) -> TranscriptionBackend:
+    return _backend_factory(name)()
+
+
+def transcription_backend_identity(name: Optional[str] = None) -> str:
+    """"<backend>:<model>" of the configured backend, without instantiating it (no API key needed)"""
+    factory = _backend_factory(name)
+    return f"{getattr(factory, 'name', name)}:{getattr(factory, 'model', '')}"
+
+
+# Chunking
+
+_SILENCE_START_RE = re.compile(r"silence_start: (-?[\d.]+)")
+_SILENCE_END_RE = re.compile(r"silence_end: (-?[\d.]+)")
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):([\d.]+)")
+
+
+def detect_silences(audio_path: str) -> Tuple[float, List[Tuple[float, float]]]:
+    """(duration, [(silence_start, silence_end), ...]) of an audio file via ffmpeg silencedetect"""
+    result = subprocess.run([
+        find_ffmpeg(), '-hide_banner', '-nostats', '-i', audio_path,
+        '-af', f'silencedetect=noise={TRANSCRIPT_SILENCE_NOISE}:d={TRANSCRIPT_SILENCE_MIN_DURATION}',
+        '-f', 'null', '-'
+    ], capture_output=True, text=True, check=True)
+
+    duration = 0.0
+    match = _DURATION_RE.search(result.stderr)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    silences = []
+    silence_start = None
+    for line in result.stderr.splitlines():
+        start_match = _SILENCE_START_RE.search(line)
+        if start_match:
+            silence_start = max(float(start_match.group(1)), 0.0)
+            continue
+        end_match = _SILENCE_END_RE.search(line)
+        if end_match and silence_start is not None:
+            silences.append((silence_start, float(end_match.group(1))))
+            silence_start = None
+    return duration, silences
+
+
+def plan_chunks(duration: float, silences: List[Tuple[float, float]], chunk_seconds: float) -> List[Tuple[float, float]]:
+    """Cut points at silence midpoints, at most `chunk_seconds` apart: [(own_start, own_end), ...]
+
+    Each cut is the latest silence in the second half of the window; without one the
+    audio is cut hard at `chunk_seconds`.
+    """
+    midpoints = sorted((start + end) / 2 for start, end in silences)
+    cuts = [0.0]
+    while duration - cuts[-1] > chunk_seconds:
+        window_start = cuts[-1] + chunk_seconds / 2
+        window_end = cuts[-1] + chunk_seconds
+        candidates = [point for point in midpoints if window_start <= point <= window_end]
+        cuts.append(candidates[-1] if candidates else window_end)
+    cuts.append(duration)
+    return list(zip(cuts, cuts[1:]))
+
+
+def _transcribe_chunk(
+    backend: TranscriptionBackend,
+    audio_path: str,
+    audio_format: str,
+    language: str,
+    audio_start: float,
+    audio_end: float
+) -> Dict[str, Any]:
+    _, suffix, mime_type = _audio_format(audio_format)
+    chunk_path = _encode_audio(
+        ['-ss', f"{audio_start:.3f}"], audio_path, audio_format,
+        output_args=['-t', f"{audio_end - audio_start:.3f}"]
+    )
+    try:
+        return backend.transcribe(chunk_path, f"chunk{suffix}", mime_type, language)
+    finally:
+        os.unlink(chunk_path)
+
+
+def stitch_segments(chunk_results: List[Tuple[float, float, float, Dict[str, Any]]], last_end: float) -> List[Dict[str, Any]]:
+    """Shift chunk segments to absolute time and drop the ones owned by a neighbouring chunk
+
+    `chunk_results` items are (audio_start, own_start, own_end, result).
+    """
+    segments = []
+    for audio_start, own_start, own_end, result in chunk_results:
+        for segment in result.get('segments', []):
+            start = segment.get('start', 0) + audio_start
+            end = segment.get('end', 0) + audio_start
+            midpoint = (start + end) / 2
+            if midpoint < own_start or (midpoint >= own_end and own_end < last_end):
+                continue  # Bu segment örtüşme bölgesinde, komşu chunk'a ait
+            segments.append({**segment, 'start': start, 'end': end})
+
+    segments.sort(key=lambda segment: segment['start'])
+    for index, segment in enumerate(segments):
+        segment['id'] = index
+    return segments
+
+
+def transcribe_audio(
+    audio_path: str,
+    audio_format: str = TRANSCRIPT_AUDIO_FORMAT,
+    language: str = TRANSCRIPT_LANGUAGE,
+    backend: Optional[TranscriptionBackend] = None,
+    progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
+    """Transcribe a file from `extract_audio`, in concurrent chunks when it is long
+
+    Returns {"text", "segments"} in the backend's format with absolute timestamps.
+    """
+    backend = backend or get_transcription_backend()
+    _, suffix, mime_type = _audio_format(audio_format)
+
+    duration, silences = (0.0, [])
+    if TRANSCRIPT_CHUNK_SECONDS > 0:
+        duration, silences = detect_silences(audio_path)
+
+    if TRANSCRIPT_CHUNK_SECONDS <= 0 or duration <= TRANSCRIPT_CHUNK_SECONDS:
+        if progress:
+            progress(0.0, "Transcribing")
+        return backend.transcribe(audio_path, f"audio{suffix}", mime_type, language)
+
+    chunks = plan_chunks(duration, silences, TRANSCRIPT_CHUNK_SECONDS)
+    print(f"🧩 Transcribing {duration:.0f}s of audio in {len(chunks)} chunks ({len(silences)} silences)")
+    if progress:
+        progress(0.0, f"Transcribing 0/{len(chunks)} chunks")
+
+    chunk_results = []
+    with ThreadPoolExecutor(max_workers=max(TRANSCRIPT_CHUNK_CONCURRENCY, 1)) as pool:
+        futures = {}
+        for own_start, own_end in chunks:
+            audio_start = max(own_start - TRANSCRIPT_CHUNK_OVERLAP, 0.0)
+            audio_end = min(own_end + TRANSCRIPT_CHUNK_OVERLAP, duration)
+            future = pool.submit(_transcribe_chunk, backend, audio_path, audio_format, language, audio_start, audio_end)
+            futures[future] = (audio_start, own_start, own_end)
+
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                chunk_results.append((*futures[future], future.result()))
+                if progress:
+                    progress(done / len(chunks), f"Transcribing {done}/{len(chunks)} chunks")
+        except Exception:
+            # Bir chunk başarısız: henüz başlamamış olanları gönderme
+            for pending in futures:
+                pending.cancel()
+            raise
+
+    segments = stitch_segments(chunk_results, duration)
+    text = " ".join(segment.get('text', '').strip() for segment in segments if segment.get('text', '').strip())
+    return {"text": text, "segments": segments}
+
+
+def format_srt_time(seconds: float) -> str:
+    """Saniyeyi SRT formatına çevir (HH:MM:SS,mmm)"""
+    milliseconds = int(round(max(seconds, 0) * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{milliseconds:03d}"
+
+
+def build_srt(segments: List[Dict[str, Any]]) -> str:
+    srt_content = ""
+    for i, segment in enumerate(segments, 1):
+        start_srt = format_srt_time(segment.get('start', 0))
+        end_srt = format_srt_time(segment.get('end', 0))
+        text = segment.get('text', '').strip()
+        srt_content += f"{i}\n{start_srt} --> {end_srt}\n{text}\n\n"
+    return srt_content
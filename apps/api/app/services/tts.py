@@ -0,0 +1,191 @@
+"""
+TTS Service - dublaj için segment bazlı, paralel ve önbellekli ElevenLabs ses sentezi
+
+`dub_audio` synthesizes one clip per SRT cue. Cues are sent TTS_CONCURRENCY at a
+time per job, and a request that fails with 429, a 5xx or a network error is
+retried with exponential backoff and jitter, honouring Retry-After (seconds or
+HTTP-date) up to TTS_RETRY_MAX_DELAY.
+
+Every clip is cached in object storage under tts-cache/, keyed by the sha256 of
+(text, voice_id, model_id, voice_settings). Re-dubbing a section after editing a
+few cues only pays for the changed ones; the cache is best-effort, so storage
+errors fall back to calling the provider.
+"""
+
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+from app.storage import MINIO_BUCKET, get_minio
+from app.services.provider_clients import get_sync_http_client
+
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "4"))
+TTS_MAX_RETRIES = int(os.getenv("TTS_MAX_RETRIES", "3"))
+TTS_RETRY_BASE_DELAY = float(os.getenv("TTS_RETRY_BASE_DELAY", "1"))
+# Upper bound on a server-requested Retry-After wait (a job thread sleeps meanwhile)
+TTS_RETRY_MAX_DELAY = float(os.getenv("TTS_RETRY_MAX_DELAY", "30"))
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+TTS_CACHE_PREFIX = "tts-cache"
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+ProgressCallback = Callable[[float, str], None]
+
+
+def tts_cache_key(text: str, voice_id: str, model_id: str, voice_settings: Dict[str, Any]) -> str:
+    canonical = json.dumps(
+        {"text": text, "voice_id": voice_id, "model_id": model_id, "voice_settings": voice_settings},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _parse_retry_after(value: str) -> Optional[float]:
+    """Retry-After as seconds: delta-seconds or an HTTP-date"""
+    try:
+        seconds = float(value)
+        return max(seconds, 0.0) if math.isfinite(seconds) else None
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _retry_delay(attempt: int, response: Optional[httpx.Response]) -> float:
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        delay = _parse_retry_after(retry_after)
+        if delay is not None:
+            return min(delay, TTS_RETRY_MAX_DELAY)
+    return TTS_RETRY_BASE_DELAY * (2 ** attempt) + random.uniform(0, TTS_RETRY_BASE_DELAY)
+
+
+def _request_speech(url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> bytes:
+    """POST a TTS request, retrying transient failures with backoff"""
+    for attempt in range(TTS_MAX_RETRIES + 1):
+        response = None
+        try:
+            response = get_sync_http_client("elevenlabs").post(url, json=payload, headers=headers)
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                response.raise_for_status()
+                return response.content
+            error: Exception = httpx.HTTPStatusError(
+                f"ElevenLabs returned {response.status_code}", request=response.request, response=response
+            )
+        except httpx.TransportError as e:
+            error = e
+
+        if attempt == TTS_MAX_RETRIES:
+            raise error
+        delay = _retry_delay(attempt, response)
+        print(f"🔁 TTS retry {attempt + 1}/{TTS_MAX_RETRIES} in {delay:.1f}s: {error}")
+        time.sleep(delay)
+
+
+class SpeechSynthesizer:
+    """Tek bir ses/model/ayar kombinasyonu için segment sentezleyici"""
+
+    def __init__(self, voice_id: str, model_id: str, voice_settings: Dict[str, Any]):
+        api_key = os.getenv("ELEVENLABS_API_KEY")
+        if not api_key:
+            raise HTTPException(500, "ELEVENLABS_API_KEY is not set")
+        self.voice_id = voice_id
+        self.model_id = model_id
+        self.voice_settings = voice_settings
+        self.url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+        self.headers = {"xi-api-key": api_key, "Content-Type": "application/json"}
+        self.minio = None
+        if TTS_CACHE_ENABLED:
+            try:
+                self.minio = get_minio()
+            except Exception as e:
+                print(f"⚠️  TTS cache disabled: {e}")
+
+    def _read_cache(self, object_name: str, file_path: str) -> bool:
+        if self.minio is None:
+            return False
+        try:
+            self.minio.fget_object(MINIO_BUCKET, object_name, file_path)
+            return True
+        except Exception:
+            return False
+
+    def _write_cache(self, object_name: str, audio_bytes: bytes) -> None:
+        if self.minio is None:
+            return
+        try:
+            self.minio.put_object(
+                MINIO_BUCKET, object_name, io.BytesIO(audio_bytes),
+                length=len(audio_bytes), content_type="audio/mpeg"
+            )
+        except Exception as e:
+            print(f"⚠️  TTS cache write failed ({object_name}): {e}")
+
+    def synthesize(self, text: str) -> Tuple[str, bool]:
+        """Write the clip for `text` to a new temp .mp3, return (path, cache_hit)"""
+        key = tts_cache_key(text, self.voice_id, self.model_id, self.voice_settings)
+        object_name = f"{TTS_CACHE_PREFIX}/{key}.mp3"
+        with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_audio:
+            file_path = temp_audio.name
+
+        if self._read_cache(object_name, file_path):
+            return file_path, True
+
+        try:
+            audio_bytes = _request_speech(self.url, self.headers, {
+                "text": text,
+                "model_id": self.model_id,
+                "voice_settings": self.voice_settings,
+            })
+        except Exception:
+            os.unlink(file_path)
+            raise
+        with open(file_path, 'wb') as audio_file:
+            audio_file.write(audio_bytes)
+        self._write_cache(object_name, audio_bytes)
+        return file_path, False
+
+    def synthesize_all(self, texts: List[str], progress: Optional[ProgressCallback] = None) -> List[str]:
+        """Clip paths for `texts` (same order), synthesized TTS_CONCURRENCY at a time
+
+        On failure the clips already written are deleted before the error propagates.
+        """
+        paths: List[Optional[str]] = [None] * len(texts)
+        cache_hits = 0
+        with ThreadPoolExecutor(max_workers=max(TTS_CONCURRENCY, 1)) as pool:
+            futures = {pool.submit(self.synthesize, text): index for index, text in enumerate(texts)}
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    paths[futures[future]], cache_hit = future.result()
+                    cache_hits += cache_hit
+                    if progress:
+                        progress(done / len(texts), f"Generating speech {done}/{len(texts)}")
+            except Exception:
+                for pending in futures:
+                    pending.cancel()
+                pool.shutdown(wait=True)
+                for future in futures:
+                    if future.done() and not future.cancelled() and future.exception() is None:
+                        os.unlink(future.result()[0])
+                raise
+
+        print(f"🗣️  TTS: {len(texts)} segments, {cache_hits} from cache")
+        return paths
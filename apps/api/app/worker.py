@@ -0,0 +1,39 @@
+"""
+Background job worker process.
+
+Runs JOB_WORKER_CONCURRENCY job workers (see app/services/jobs.py) until it
+receives SIGINT/SIGTERM. Scale by running more worker processes; jobs are
+claimed with FOR UPDATE SKIP LOCKED, so workers never pick the same job.
+
+Usage: python -m app.worker
+"""
+import asyncio
+import signal
+
+from dotenv import load_dotenv, find_dotenv
+
+load_dotenv(find_dotenv(usecwd=True))
+
+# Importing the routers registers their job handlers
+from .routers import generate, trainings  # noqa: E402,F401
+from .services.jobs import JOB_HANDLERS, start_job_workers, stop_job_workers  # noqa: E402
+from .services.provider_clients import close_provider_clients  # noqa: E402
+
+
+async def main() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    print(f"Job worker starting, handlers: {', '.join(sorted(JOB_HANDLERS))}")
+    start_job_workers()
+    await stop.wait()
+
+    print("Job worker stopping...")
+    await stop_job_workers()
+    await close_provider_clients()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+Run EXPLAIN ANALYZE for the main router queries against a seeded database.
+
+Sample ids are taken from existing rows, so seed the database first
+(scripts/seed.py, scripts/seed_interactive.py or a production-sized copy).
+Queries whose plan contains a sequential scan on the filtered table are
+flagged so missing index coverage stands out. On tiny tables the planner may
+still prefer a sequential scan, so judge the flags against realistic row counts.
+
+Usage: python scripts/explain_hot_queries.py [--verbose]
+"""
+import os
+import sys
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session, select
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, os.pardir))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.db import engine
+from app.models import (
+    Training,
+    TrainingSection,
+    Overlay,
+    UserInteraction,
+    ChatMessage,
+    EvaluationResult,
+    TrainingProgress,
+    InteractionMessage,
+)
+
+
+def _first(session: Session, model):
+    return session.exec(select(model).limit(1)).first()
+
+
+def build_queries(session: Session) -> List[Tuple[str, str, Optional[Callable]]]:
+    """(router, description, statement factory) for each hot query"""
+    training = _first(session, Training)
+    section = _first(session, TrainingSection)
+    interaction = _first(session, UserInteraction)
+    chat_message = _first(session, ChatMessage)
+    evaluation = _first(session, EvaluationResult)
+    progress = _first(session, TrainingProgress)
+    message = _first(session, InteractionMessage)
+
+    return [
+        ("trainings", "training by access code", training and (lambda: select(Training).where(
+            Training.access_code == (training.access_code or "")
+        ))),
+        ("trainings", "sections of a training", training and (lambda: select(TrainingSection).where(
+            TrainingSection.training_id == training.id
+        ).order_by(TrainingSection.order_index))),
+        ("trainings", "overlays of a section", section and (lambda: select(Overlay).where(
+            Overlay.training_section_id == section.id
+        ).order_by(Overlay.time_stamp))),
+        ("user_interactions", "latest interactions of a training", interaction and (lambda: select(UserInteraction).where(
+            UserInteraction.training_id == interaction.training_id
+        ).order_by(UserInteraction.timestamp.desc()).limit(100))),
+        ("chat", "chat history of a session", chat_message and (lambda: select(ChatMessage).where(
+            ChatMessage.session_id == chat_message.session_id
+        ).order_by(ChatMessage.timestamp.desc()).limit(10))),
+        ("evaluation_results", "results of a session", evaluation and (lambda: select(EvaluationResult).where(
+            EvaluationResult.session_id == evaluation.session_id
+        ))),
+        ("interactions", "progress of a user in a training", progress and (lambda: select(TrainingProgress).where(
+            TrainingProgress.user_id == progress.user_id,
+            TrainingProgress.training_id == progress.training_id
+        ))),
+        ("interaction_sessions", "section chat history", message and (lambda: select(InteractionMessage).where(
+            InteractionMessage.session_id == message.session_id,
+            InteractionMessage.section_id == message.section_id
+        ).order_by(InteractionMessage.timestamp.asc()))),
+    ]
+
+
+def explain(session: Session, statement) -> List[str]:
+    sql = str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    rows = session.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}")).all()
+    return [row[0] for row in rows]
+
+
+def run(verbose: bool = False) -> int:
+    flagged = 0
+    with Session(engine) as session:
+        for router, description, factory in build_queries(session):
+            label = f"[{router}] {description}"
+            if not factory:
+                print(f"⏭️  {label}: no sample rows, skipped")
+                continue
+
+            statement = factory()
+            table = statement.get_final_froms()[0].name
+            plan = explain(session, statement)
+            seq_scan = any(f"Seq Scan on {table}" in line for line in plan)
+            execution = next((line.strip() for line in plan if line.strip().startswith("Execution Time")), "")
+
+            if seq_scan:
+                flagged += 1
+                print(f"⚠️  {label}: sequential scan on {table} ({execution})")
+            else:
+                print(f"✅ {label}: index-backed ({execution})")
+
+            if verbose or seq_scan:
+                for line in plan:
+                    print(f"      {line}")
+
+    print(f"\n{flagged} quer{'y' if flagged == 1 else 'ies'} without index coverage")
+    return flagged
+
+
+if __name__ == "__main__":
+    sys.exit(1 if run(verbose="--verbose" in sys.argv) else 0)
@@ -119,7 +119,7 @@ export default function UserInteractionsPage() {
       setTrainings(trainingsData);
       
       // Fetch all interactions (backend zaten access control yapıyor)
-      const interactionsData = await api.getUserInteractions({ limit: 1000 });
+      const interactionsData = await api.getUserInteractions();
       setInteractions(interactionsData);
       
     } catch (error) {
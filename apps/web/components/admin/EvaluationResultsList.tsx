@@ -2,6 +2,7 @@
 
 import React, { useState, useEffect } from 'react';
 import { Button } from '@lxplayer/ui';
+import { api } from '@/lib/api';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@lxplayer/ui';
 import { Badge } from '@lxplayer/ui';
 import { Alert, AlertDescription } from '@lxplayer/ui';
@@ -24,13 +25,13 @@ interface EvaluationResult {
   session_id: string;
   user_id: string;
   training_id: string;
-  evaluation_score?: number;
+  evaluation_score?: number | null;
   evaluation_result: string;
   explanation: string;
-  llm_model?: string;
-  processing_time_ms?: number;
-  tokens_used?: number;
-  section_id?: string;
+  llm_model?: string | null;
+  processing_time_ms?: number | null;
+  tokens_used?: number | null;
+  section_id?: string | null;
   evaluated_at: string;
   created_at: string;
   metadata_json: string;
@@ -61,15 +62,13 @@ export default function EvaluationResultsList({
     setLoading(true);
     setError(null);
     try {
-      const params = new URLSearchParams();
-      if (sessionId) params.append('session_id', sessionId);
-      if (userId) params.append('user_id', userId);
-      if (trainingId) params.append('training_id', trainingId);
-      if (criteriaId) params.append('criteria_id', criteriaId);
-
-      const response = await fetch(`/api/evaluation-results?${params}`);
-      if (!response.ok) throw new Error('Sonuçlar yüklenemedi');
-      const data = await response.json();
+      // Sayfalı endpoint: tüm sayfalar X-Next-Cursor ile toplanır
+      const data = await api.getEvaluationResults({
+        session_id: sessionId,
+        user_id: userId,
+        training_id: trainingId,
+        criteria_id: criteriaId
+      });
       setResults(data);
     } catch (err) {
       setError('Sonuçlar yüklenirken hata oluştu');
@@ -100,21 +99,21 @@ export default function EvaluationResultsList({
     }
   }, [sessionId, userId, trainingId, criteriaId]);
 
-  const getScoreColor = (score?: number) => {
+  const getScoreColor = (score?: number | null) => {
     if (score === undefined || score === null) return 'text-gray-500';
     if (score >= 80) return 'text-green-600';
     if (score >= 60) return 'text-yellow-600';
     return 'text-red-600';
   };
 
-  const getScoreIcon = (score?: number) => {
+  const getScoreIcon = (score?: number | null) => {
     if (score === undefined || score === null) return <Minus className="w-4 h-4" />;
     if (score >= 80) return <TrendingUp className="w-4 h-4" />;
     if (score >= 60) return <Minus className="w-4 h-4" />;
     return <TrendingDown className="w-4 h-4" />;
   };
 
-  const getScoreBadge = (score?: number) => {
+  const getScoreBadge = (score?: number | null) => {
     if (score === undefined || score === null) {
       return <Badge variant="outline">Puan Yok</Badge>;
     }
@@ -203,6 +203,62 @@ export const Style = z.object({
 export type Style = z.infer<typeof Style>;
 
 async function request<T>(path: string, schema: z.ZodType<T>, init?: RequestInit): Promise<T> {
+  const { data } = await send(path, init);
+  return schema.parse(data);
+}
+
+// Upper bound on items collected by requestAllPages (admin lists only)
+const MAX_LIST_ITEMS = 2000;
+
+// Cursor-paginated list endpoints return the next page token in X-Next-Cursor.
+// One page of such an endpoint, starting after the `after` token.
+async function requestPage<T>(path: string, schema: z.ZodType<T>, after?: string | null): Promise<{ data: T; nextCursor: string | null }> {
+  const separator = path.includes('?') ? '&' : '?';
+  const pagePath = after ? `${path}${separator}after=${encodeURIComponent(after)}` : path;
+  const { data, headers } = await send(pagePath);
+  return { data: schema.parse(data), nextCursor: headers.get('X-Next-Cursor') };
+}
+
+// Follow the cursor until the last page (or maxItems) and return the items.
+async function requestAllPages<T>(path: string, schema: z.ZodType<T[]>, maxItems = MAX_LIST_ITEMS): Promise<T[]> {
+  const items: T[] = [];
+  let after: string | null = null;
+  do {
+    const page: { data: T[]; nextCursor: string | null } = await requestPage(path, schema, after);
+    items.push(...page.data);
+    after = page.nextCursor;
+  } while (after && items.length < maxItems);
+  if (after) {
+    console.warn(`⚠️ ${path}: list truncated at ${items.length} items`);
+  }
+  return items.slice(0, maxItems);
+}
+
+const JobStatus = z.object({
+  job_id: z.string(),
+  status: z.string(),
+  progress: z.number(),
+  progress_message: z.string().nullable().optional(),
+  result: z.any().nullable().optional(),
+  error: z.string().nullable().optional(),
+  error_status: z.number().nullable().optional(),
+});
+
+// Long-running endpoints queue a background job and answer with its status;
+// poll GET /jobs/{id} until it finishes and return the job result.
+async function runJob<T>(path: string, schema: z.ZodType<T>, init?: RequestInit, pollIntervalMs = 2000): Promise<T> {
+  let job = await request(path, JobStatus, init);
+  while (job.status === 'queued' || job.status === 'running') {
+    await new Promise((resolve) => setTimeout(resolve, pollIntervalMs));
+    job = await request(`/jobs/${job.job_id}`, JobStatus);
+  }
+  if (job.status !== 'succeeded') {
+    throw new Error(`API ${job.error_status || 500}: ${job.error || 'Job failed'}`);
+  }
+  return schema.parse(job.result);
+}
+
+async function send(path: string, init?: RequestInit): Promise<{ data: any; headers: Headers }> {
   const base = process.env.NEXT_PUBLIC_API_URL || 'https://yodea.hexense.ai/api';
   const url = `${base}${path}`;
   console.log('🌐 API Request:', { path, url, method: init?.method || 'GET' });
@@ -276,7 +332,7 @@ async function request<T>(path: string, schema: z.ZodType<T>, init?: RequestInit
     }
   }
   const data = text ? JSON.parse(text) : {};
-  return schema.parse(data);
+  return { data, headers: res.headers };
 }
 
 export const api = {
@@ -311,7 +367,7 @@ export const api = {
   }), { method: 'POST' }),
 
   // users
-  listUsers: () => request('/users', z.array(User)),
+  listUsers: () => requestAllPages('/users', z.array(User)),
   getDashboardStatistics: () => request('/users/statistics/dashboard', z.object({
     totalUsers: z.number(),
     totalTrainings: z.number(),
@@ -356,7 +412,7 @@ export const api = {
     request(`/users/${userId}/trainings/${trainingId}`, z.object({ ok: z.boolean() }), { method: 'DELETE' }),
 
   // assets
-  listAssets: () => request('/assets', z.array(Asset)),
+  listAssets: () => requestAllPages('/assets', z.array(Asset)),
   getAsset: (id: string) => request(`/assets/${id}`, Asset),
   createAsset: (input: { title: string; description?: string; kind: string; uri: string; company_id?: string | null }) =>
     request('/assets', Asset, { method: 'POST', body: JSON.stringify(input) }),
@@ -368,7 +424,7 @@ export const api = {
   generateImage: (input: { provider: string; model: string; prompt: string; tags?: string[]; width?: number; height?: number }) =>
     request('/generate/image', z.object({ uri: z.string(), content_type: z.string() }), { method: 'POST', body: JSON.stringify(input) }),
   generateVideo: (input: { provider: string; model: string; prompt: string; tags?: string[]; width?: number; height?: number; duration_seconds?: number; avatar_id?: string; voice_id?: string }) =>
-    request('/generate/video', z.object({ uri: z.string().optional(), content_type: z.string().optional() }).or(z.object({ detail: z.string() })), { method: 'POST', body: JSON.stringify(input) }),
+    runJob('/generate/video', z.object({ uri: z.string().optional(), content_type: z.string().optional() }).or(z.object({ detail: z.string() })), { method: 'POST', body: JSON.stringify(input) }),
 
   // training sections
   listTrainingSections: (trainingId: string) => request(`/trainings/${trainingId}/sections`, z.array(TrainingSection)),
@@ -380,7 +436,7 @@ export const api = {
   deleteTrainingSection: (trainingId: string, sectionId: string) => request(`/trainings/${trainingId}/sections/${sectionId}`, z.object({ ok: z.boolean() }), { method: 'DELETE' }),
 
   // transcript generation
-  generateTranscript: (trainingId: string, sectionId: string) => request(`/trainings/${trainingId}/sections/${sectionId}/transcript`, z.object({ 
+  generateTranscript: (trainingId: string, sectionId: string) => runJob(`/trainings/${trainingId}/sections/${sectionId}/transcript`, z.object({ 
     transcript: z.string(),
     srt: z.string(),
     segments: z.array(z.object({
@@ -397,7 +453,7 @@ export const api = {
   }), { method: 'POST' }),
 
   // audio dubbing
-  dubAudio: (trainingId: string, sectionId: string) => request(`/trainings/${trainingId}/sections/${sectionId}/dub-audio`, z.object({
+  dubAudio: (trainingId: string, sectionId: string) => runJob(`/trainings/${trainingId}/sections/${sectionId}/dub-audio`, z.object({
     audio_asset_id: z.string(),
     transcript: z.string(),
     audio_url: z.string(),
@@ -464,7 +520,7 @@ export const api = {
   deleteSectionOverlay: (trainingId: string, sectionId: string, overlayId: string) => request(`/trainings/${trainingId}/sections/${sectionId}/overlays/${overlayId}`, z.object({ ok: z.boolean() }), { method: 'DELETE' }),
 
   // styles
-  listStyles: () => request('/styles/', z.array(Style)),
+  listStyles: () => requestAllPages('/styles/', z.array(Style)),
   getStyle: (id: string) => request(`/styles/${id}`, Style),
   createStyle: (input: { name: string; description?: string; style_json: string; company_id?: string | null }) =>
     request('/styles/', Style, { method: 'POST', body: JSON.stringify(input) }),
@@ -647,6 +703,23 @@ export const api = {
     body: JSON.stringify(interaction)
   }),
 
+  createInteractionsBatch: (interactions: Array<{
+    session_id: string;
+    interaction_type: string;
+    section_id?: string;
+    overlay_id?: string;
+    video_time?: number;
+    duration?: number;
+    content?: string;
+    interaction_metadata?: Record<string, any>;
+    response_time?: number;
+    success?: boolean;
+    timestamp?: string;
+  }>) => request('/interactions/interactions/batch', z.object({ ids: z.array(z.string()), count: z.number(), message: z.string() }), {
+    method: 'POST',
+    body: JSON.stringify({ interactions })
+  }),
+
   createChatMessage: (message: {
     session_id: string;
     message_type: string;
@@ -728,24 +801,26 @@ export const api = {
     engagement_score: z.number()
   })),
 
-  getSessionInteractions: (sessionId: string, limit?: number, offset?: number) => request(
-    `/interactions/interactions/${sessionId}?limit=${limit || 100}&offset=${offset || 0}`,
+  // Newest first; pass the returned nextCursor as `after` for the next page
+  getSessionInteractions: (sessionId: string, limit?: number, after?: string | null) => requestPage(
+    `/interactions/interactions/${sessionId}?limit=${limit || 100}`,
     z.object({
       interactions: z.array(z.any()),
       total: z.number(),
-      limit: z.number(),
-      offset: z.number()
-    })
+      limit: z.number()
+    }),
+    after
   ),
 
-  getChatHistory: (sessionId: string, limit?: number, offset?: number) => request(
-    `/interactions/chat-history/${sessionId}?limit=${limit || 100}&offset=${offset || 0}`,
+  // Oldest first; pass the returned nextCursor as `after` for the next page
+  getChatHistory: (sessionId: string, limit?: number, after?: string | null) => requestPage(
+    `/interactions/chat-history/${sessionId}?limit=${limit || 100}`,
     z.object({
       messages: z.array(z.any()),
       total: z.number(),
-      limit: z.number(),
-      offset: z.number()
-    })
+      limit: z.number()
+    }),
+    after
   ),
 
   getTrainingAnalytics: (trainingId: string, days?: number) => request(
@@ -945,8 +1020,9 @@ export const api = {
     }
   ),
 
-  getSessionMessages: (sessionId: string, limit?: number, offset?: number) => request(
-    `/interaction-sessions/${sessionId}/messages?limit=${limit || 50}&offset=${offset || 0}`,
+  // Oldest first; pass the returned nextCursor as `after` for the next page
+  getSessionMessages: (sessionId: string, limit?: number, after?: string | null) => requestPage(
+    `/interaction-sessions/${sessionId}/messages?limit=${limit || 50}`,
     z.array(z.object({
       id: z.string(),
       session_id: z.string(),
@@ -960,7 +1036,8 @@ export const api = {
       actions_json: z.string(),
       timestamp: z.string(),
       metadata_json: z.string()
-    }))
+    })),
+    after
   ),
 
   // Section-specific chat history management
@@ -1154,21 +1231,19 @@ export const api = {
     training_id?: string;
     session_id?: string;
     interaction_type?: string;
+    // Upper bound on interactions collected across pages
     limit?: number;
-    offset?: number;
   }) => {
     const searchParams = new URLSearchParams();
     if (params?.user_id) searchParams.append('user_id', params.user_id);
     if (params?.training_id) searchParams.append('training_id', params.training_id);
     if (params?.session_id) searchParams.append('session_id', params.session_id);
     if (params?.interaction_type) searchParams.append('interaction_type', params.interaction_type);
-    if (params?.limit) searchParams.append('limit', params.limit.toString());
-    if (params?.offset) searchParams.append('offset', params.offset.toString());
     
     const queryString = searchParams.toString();
     const url = `/user-interactions/${queryString ? `?${queryString}` : ''}`;
     
-    return request(url, z.array(z.object({
+    return requestAllPages(url, z.array(z.object({
       id: z.string(),
       user_id: z.string().nullable().optional(),
       training_id: z.string(),
@@ -1216,7 +1291,7 @@ export const api = {
         id: z.string(),
         name: z.string()
       }).nullable().optional()
-    })));
+    })), params?.limit);
   },
 
   getTrainingInteractionSummary: (trainingId: string) => request(
@@ -1468,7 +1543,7 @@ export const api = {
     if (params?.criteria_id) queryString.append('criteria_id', params.criteria_id);
     
     const url = `/evaluation-results${queryString.toString() ? `?${queryString}` : ''}`;
-    return request(url, z.array(z.object({
+    return requestAllPages(url, z.array(z.object({
       id: z.string(),
       criteria_id: z.string(),
       session_id: z.string(),
@@ -1574,7 +1649,7 @@ export const api = {
     if (params?.is_public !== undefined) queryString.append('is_public', params.is_public.toString());
     
     const url = `/evaluation-reports${queryString.toString() ? `?${queryString}` : ''}`;
-    return request(url, z.array(z.object({
+    return requestAllPages(url, z.array(z.object({
       id: z.string(),
       session_id: z.string(),
       user_id: z.string(),
@@ -1869,7 +1944,7 @@ export const api = {
   }), { method: 'POST', body: JSON.stringify(input) }),
 
   getTrainingFeedback: (session_id?: string, training_id?: string) => 
-    request(`/training-feedback?${session_id ? `session_id=${session_id}` : ''}${training_id ? `&training_id=${training_id}` : ''}`, 
+    requestAllPages(`/training-feedback?${session_id ? `session_id=${session_id}` : ''}${training_id ? `&training_id=${training_id}` : ''}`, 
       z.array(z.object({
         id: z.string(),
         session_id: z.string(),